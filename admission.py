@@ -0,0 +1,282 @@
+"""
+Module de contrôle d'admission des analyses IA (exécutants bornés, file équitable par locataire, abandon)
+"""
+
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterator, Optional
+
+# Valeurs par défaut, surchargeables dans la section [admission] de .streamlit/secrets.toml
+CONFIG_ADMISSION_PAR_DEFAUT = {
+    "nb_executants": 8,              # analyses IA menées en même temps par le processus
+    "taille_file": 40,               # analyses en attente au-delà desquelles l'analyse de base est servie
+    "file_par_locataire": 2,         # analyses en attente par navigateur (ou session)
+    "delai_abandon": 45,             # secondes sans lecture au-delà desquelles une analyse est annulée
+    "duree_initiale": 12.0           # durée d'une analyse supposée avant les premières mesures (s)
+}
+
+# Poids d'une nouvelle mesure dans la durée moyenne d'une analyse
+LISSAGE_DUREE = 0.2
+
+EN_ATTENTE = "en_attente"
+EN_COURS = "en_cours"
+TERMINEE = "terminee"
+ANNULEE = "annulee"
+REFUSEE = "refusee"
+
+_FIN = object()
+
+
+class FileSaturee(Exception):
+    """Trop d'analyses en attente (pour tous ou pour ce locataire) : l'analyse de base est servie"""
+
+
+class Tache:
+    """Analyse admise : itérable sur les morceaux produits par son exécutant"""
+
+    def __init__(self, controle: "ControleAdmission", locataire: str, source: Iterator[str]):
+        self.controle = controle
+        self.locataire = locataire
+        self.source = source
+        self.etat = EN_ATTENTE
+        self.soumise_le = time.monotonic()
+        self.demarree_le: Optional[float] = None
+        self.derniere_lecture = self.soumise_le
+        self.motif_refus: Optional[str] = None
+        self._lue = False
+        self._morceaux: "queue.Queue" = queue.Queue()
+
+    def position(self) -> int:
+        """Analyses servies avant celle-ci (0 : la prochaine) ; 0 une fois démarrée"""
+        return self.controle.position(self)
+
+    def attente_estimee(self) -> float:
+        """Attente estimée avant le démarrage, en secondes"""
+        return self.controle.attente_estimee(self)
+
+    def attendre_demarrage(self, delai: float) -> bool:
+        """Attend au plus delai secondes que l'analyse quitte la file ; vrai si elle l'a quittée"""
+        self.derniere_lecture = time.monotonic()
+        with self.controle._condition:
+            if self.etat == EN_ATTENTE:
+                self.controle._condition.wait(delai)
+            return self.etat != EN_ATTENTE
+
+    def annuler(self) -> None:
+        """Retire l'analyse de la file, ou interrompt son exécution (sans effet si elle est finie)"""
+        if not self._lue:
+            self.controle._annuler(self, ANNULEE)
+
+    def __iter__(self) -> Iterator[str]:
+        if self.etat == REFUSEE:
+            raise FileSaturee(self.motif_refus)
+        while True:
+            self.derniere_lecture = time.monotonic()
+            try:
+                element = self._morceaux.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if element is _FIN:
+                self._lue = True
+                return
+            if isinstance(element, Exception):
+                self._lue = True
+                raise element
+            yield element
+
+
+class ControleAdmission:
+    """Exécutants bornés servis à tour de rôle par locataire, avec file maximale et annulation"""
+
+    def __init__(self, nb_executants: int = 8, taille_file: int = 40, file_par_locataire: int = 2,
+                 delai_abandon: float = 45, duree_initiale: float = 12.0):
+        self.nb_executants = nb_executants
+        self.taille_file = taille_file
+        self.file_par_locataire = file_par_locataire
+        self.delai_abandon = delai_abandon
+
+        self._condition = threading.Condition()
+        # Locataire -> analyses en attente ; l'ordre des locataires est celui du tour de rôle
+        self._files: "OrderedDict[str, Deque[Tache]]" = OrderedDict()
+        self._en_attente = 0
+        self._en_cours = 0
+        self._duree_moyenne = duree_initiale
+        self._attentes: Deque[float] = deque(maxlen=500)
+        self._compteurs = {"admises": 0, "refusees": 0, "annulees": 0, "abandonnees": 0, "terminees": 0}
+        self._cree_le = time.monotonic()
+        self._occupation_depuis = self._cree_le
+        self._occupation_cumulee = 0.0
+
+        for numero in range(nb_executants):
+            threading.Thread(target=self._executer, name=f"analyse-{numero}", daemon=True).start()
+
+    def soumettre(self, locataire: str, source: Iterator[str]) -> Tache:
+        """Place l'analyse en file ; si la file est pleine, la tâche est refusée (FileSaturee à la lecture)"""
+        tache = Tache(self, locataire, source)
+        with self._condition:
+            file_locataire = self._files.get(locataire)
+            if self._en_attente >= self.taille_file:
+                tache.motif_refus = "Forte affluence"
+            elif file_locataire and len(file_locataire) >= self.file_par_locataire:
+                tache.motif_refus = "Analyses déjà en attente pour cette session"
+            if tache.motif_refus:
+                tache.etat = REFUSEE
+                self._compteurs["refusees"] += 1
+                return tache
+
+            self._files.setdefault(locataire, deque()).append(tache)
+            self._en_attente += 1
+            self._compteurs["admises"] += 1
+            self._condition.notify_all()
+        return tache
+
+    def _suivante(self) -> Tache:
+        """Retire la prochaine analyse : une par locataire à tour de rôle (appelé sous le verrou)"""
+        locataire, file_locataire = next(iter(self._files.items()))
+        tache = file_locataire.popleft()
+        del self._files[locataire]
+        if file_locataire:
+            self._files[locataire] = file_locataire
+        self._en_attente -= 1
+        return tache
+
+    def _noter_occupation(self) -> None:
+        """Cumule le temps-exécutant occupé depuis la dernière variation (appelé sous le verrou)"""
+        maintenant = time.monotonic()
+        self._occupation_cumulee += self._en_cours * (maintenant - self._occupation_depuis)
+        self._occupation_depuis = maintenant
+
+    def _executer(self) -> None:
+        """Boucle d'un exécutant : prend la prochaine analyse et relaie ses morceaux"""
+        while True:
+            with self._condition:
+                while not self._files:
+                    self._condition.wait()
+                tache = self._suivante()
+                if time.monotonic() - tache.derniere_lecture > self.delai_abandon:
+                    # Plus personne n'attend cette analyse (onglet fermé pendant l'attente)
+                    self._terminer(tache, ANNULEE, abandon=True)
+                    continue
+                self._noter_occupation()
+                self._en_cours += 1
+                tache.etat = EN_COURS
+                tache.demarree_le = time.monotonic()
+                self._attentes.append(tache.demarree_le - tache.soumise_le)
+                self._condition.notify_all()
+
+            etat_final = TERMINEE
+            en_erreur = False
+            try:
+                for morceau in tache.source:
+                    if tache.etat == ANNULEE:
+                        break
+                    if time.monotonic() - tache.derniere_lecture > self.delai_abandon:
+                        etat_final = ANNULEE
+                        break
+                    tache._morceaux.put(morceau)
+                tache._morceaux.put(_FIN)
+            except Exception as e:
+                # Relayée au lecteur, qui sert alors l'analyse de base
+                tache._morceaux.put(e)
+                en_erreur = True
+            finally:
+                # Fermeture du flux : la réponse HTTP est libérée si l'analyse est interrompue
+                close = getattr(tache.source, "close", None)
+                if close:
+                    close()
+
+            with self._condition:
+                self._noter_occupation()
+                self._en_cours -= 1
+                if tache.etat == EN_COURS:
+                    self._terminer(tache, etat_final, abandon=etat_final == ANNULEE)
+                    if etat_final == TERMINEE and not en_erreur:
+                        duree = time.monotonic() - tache.demarree_le
+                        self._duree_moyenne += LISSAGE_DUREE * (duree - self._duree_moyenne)
+
+    def _terminer(self, tache: Tache, etat: str, abandon: bool = False) -> None:
+        """Fixe l'état final et les compteurs (appelé sous le verrou)"""
+        tache.etat = etat
+        if etat == TERMINEE:
+            self._compteurs["terminees"] += 1
+        else:
+            self._compteurs["abandonnees" if abandon else "annulees"] += 1
+            tache._morceaux.put(_FIN)
+        self._condition.notify_all()
+
+    def _annuler(self, tache: Tache, etat: str) -> None:
+        with self._condition:
+            if tache.etat == EN_ATTENTE:
+                file_locataire = self._files.get(tache.locataire)
+                if file_locataire and tache in file_locataire:
+                    file_locataire.remove(tache)
+                    self._en_attente -= 1
+                    if not file_locataire:
+                        del self._files[tache.locataire]
+                self._terminer(tache, etat)
+            elif tache.etat == EN_COURS:
+                # L'exécutant s'arrête au prochain morceau
+                self._terminer(tache, etat)
+
+    def position(self, tache: Tache) -> int:
+        """Rang de service dans le tour de rôle : analyses des autres locataires servies avant"""
+        with self._condition:
+            if tache.etat != EN_ATTENTE:
+                return 0
+            locataires = list(self._files)
+            rang = self._files[tache.locataire].index(tache)
+            indice = locataires.index(tache.locataire)
+            return sum(
+                min(len(self._files[autre]), rang) + (1 if j < indice and len(self._files[autre]) > rang else 0)
+                for j, autre in enumerate(locataires)
+            )
+
+    def attente_estimee(self, tache: Tache) -> float:
+        """Vagues d'analyses à terminer avant celle-ci, multipliées par la durée moyenne"""
+        position = self.position(tache)
+        with self._condition:
+            if tache.etat != EN_ATTENTE:
+                return 0.0
+            occupes = self._en_cours >= self.nb_executants
+            return (position // self.nb_executants + (1 if occupes else 0)) * self._duree_moyenne
+
+    def statistiques(self) -> Dict[str, Any]:
+        """Occupation des exécutants, profondeur de la file, attentes observées et compteurs"""
+        with self._condition:
+            self._noter_occupation()
+            attentes = sorted(self._attentes)
+            statistiques: Dict[str, Any] = {
+                "nb_executants": self.nb_executants,
+                "en_cours": self._en_cours,
+                "en_attente": self._en_attente,
+                "locataires_en_attente": len(self._files),
+                "taille_file": self.taille_file,
+                "duree_moyenne_s": round(self._duree_moyenne, 2),
+                **self._compteurs
+            }
+            duree = time.monotonic() - self._cree_le
+            statistiques["utilisation"] = round(self._en_cours / self.nb_executants, 3)
+            statistiques["utilisation_moyenne"] = (
+                round(self._occupation_cumulee / (duree * self.nb_executants), 3) if duree > 0 else 0.0
+            )
+        statistiques["attente_p50_s"] = round(attentes[len(attentes) // 2], 3) if attentes else 0.0
+        statistiques["attente_p95_s"] = round(attentes[int(len(attentes) * 0.95)], 3) if attentes else 0.0
+        soumises = statistiques["admises"] + statistiques["refusees"]
+        statistiques["taux_refus"] = round(statistiques["refusees"] / soumises, 3) if soumises else 0.0
+        return statistiques
+
+
+_controle_partage: Optional[ControleAdmission] = None
+_verrou_controle = threading.Lock()
+
+
+def obtenir_controle_admission(**config) -> ControleAdmission:
+    """Retourne le contrôle d'admission unique du processus (créé au premier appel)"""
+    global _controle_partage
+    if _controle_partage is None:
+        with _verrou_controle:
+            if _controle_partage is None:
+                _controle_partage = ControleAdmission(**{**CONFIG_ADMISSION_PAR_DEFAUT, **config})
+    return _controle_partage
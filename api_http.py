@@ -0,0 +1,322 @@
+"""
+Module d'API HTTP JSON sans interface : recommandations, recherche de métiers et d'universités, analyse IA
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from execution_concurrente import analyser_lot
+from limiteur_debit import PRIORITE_SECONDAIRE
+from profilage import PROFILEUR
+from schema_resultats import compacter
+
+# Valeurs par défaut, surchargeables dans la section [api] de .streamlit/secrets.toml
+CONFIG_API_PAR_DEFAUT = {
+    "hote": "127.0.0.1",
+    "port": 8502,
+    "nb_travailleurs": 8,         # requêtes traitées en parallèle
+    "taille_lot_max": 50,         # profils par requête groupée
+    "concurrence_analyses": 8,    # requêtes IA en vol pour une requête groupée d'analyses
+    "max_age": 3600,              # durée de validité côté client des réponses de la base (s)
+    "cle_api": ""                 # clé exigée (en-tête X-Cle-API) par les routes payantes ; vide : aucune
+}
+
+# Routes déclenchant des appels facturés à l'API IA : protégées par cle_api quand elle est définie
+ROUTES_PROTEGEES = {("POST", "/v1/analyses")}
+ENTETE_CLE_API = "X-Cle-API"
+
+# Corps de requête accepté (octets)
+TAILLE_CORPS_MAX = 1_000_000
+
+STATUTS = ("Élève (Futur Bachelier)", "Étudiant Universitaire")
+
+
+class ErreurRequete(Exception):
+    """Requête invalide : renvoyée au client avec son code HTTP"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def serialiser(objet: Any) -> Any:
+    """Conversion JSON des modèles de la base (métiers des recommandations)"""
+    if hasattr(objet, "dict"):
+        return objet.dict()
+    raise TypeError(f"{type(objet).__name__} non sérialisable")
+
+
+def valider_profil(profil: Any) -> Dict:
+    """Profil complété des champs facultatifs (ErreurRequete 400 s'il est incomplet)"""
+    if not isinstance(profil, dict):
+        raise ErreurRequete(400, "Un profil doit être un objet JSON")
+    if not isinstance(profil.get("carriere_envisagee"), str) or not profil["carriere_envisagee"].strip():
+        raise ErreurRequete(400, "Champ 'carriere_envisagee' manquant")
+    if profil.get("statut", STATUTS[0]) not in STATUTS:
+        raise ErreurRequete(400, f"Champ 'statut' invalide (valeurs : {', '.join(STATUTS)})")
+    return {
+        "statut": profil.get("statut", STATUTS[0]),
+        "serie_bac": profil.get("serie_bac"),
+        "filiere_actuelle": profil.get("filiere_actuelle"),
+        "carriere_envisagee": profil["carriere_envisagee"].strip(),
+        "notes": profil.get("notes") or {}
+    }
+
+
+class ServiceRecommandation:
+    """Traitements exposés par l'API, partagés par tous les travailleurs du processus"""
+
+    def __init__(self, kb_loader, moteur, llm_interface=None, taille_lot_max: int = 50,
+                 concurrence_analyses: int = 8, max_age: int = 3600, cle_api: str = ""):
+        self.kb_loader = kb_loader
+        self.moteur = moteur
+        self.llm_interface = llm_interface
+        self.taille_lot_max = taille_lot_max
+        self.concurrence_analyses = concurrence_analyses
+        self.max_age = max_age
+        self.cle_api = cle_api
+
+    def autoriser(self, cle: Optional[str]) -> bool:
+        """Vrai si aucune clé n'est exigée ou si la clé présentée est la bonne"""
+        if not self.cle_api:
+            return True
+        return cle is not None and hmac.compare_digest(cle.encode("utf-8"), self.cle_api.encode("utf-8"))
+
+    def profils_demandes(self, corps: Any) -> Tuple[List[Dict], bool]:
+        """Profils d'une requête (un profil, ou {"profils": [...]} pour un lot) et indicateur de lot"""
+        lot = isinstance(corps, dict) and "profils" in corps
+        profils = corps["profils"] if lot else [corps]
+        if not isinstance(profils, list) or not profils:
+            raise ErreurRequete(400, "'profils' doit être une liste non vide")
+        if len(profils) > self.taille_lot_max:
+            raise ErreurRequete(413, f"Au plus {self.taille_lot_max} profils par requête")
+        return [valider_profil(profil) for profil in profils], lot
+
+    def sante(self, parametres: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            "statut": "ok",
+            "version_kb": self.kb_loader.version_contenu,
+            "ia": bool(self.llm_interface and self.llm_interface.api_key)
+        }
+
+    def metiers(self, parametres: Dict[str, str]) -> Dict[str, Any]:
+        """Recherche d'un métier (fiche, ou suggestions de métiers proches)"""
+        if not parametres.get("nom"):
+            raise ErreurRequete(400, "Paramètre 'nom' manquant")
+        return self.moteur._analyser_metier_envisage(parametres["nom"])
+
+    def suggestions(self, parametres: Dict[str, str]) -> Dict[str, Any]:
+        """Carrières commençant par la saisie (autocomplétion, insensible aux accents)"""
+        try:
+            limite = min(int(parametres.get("limite", 8)), 50)
+        except ValueError:
+            raise ErreurRequete(400, "Paramètre 'limite' invalide")
+        return {"suggestions": self.kb_loader.index_carrieres.completer(parametres.get("q", ""), limite)}
+
+    def universites(self, parametres: Dict[str, str]) -> Dict[str, Any]:
+        """Universités et filières menant à un métier, filtrées par série de BAC"""
+        if not parametres.get("metier"):
+            raise ErreurRequete(400, "Paramètre 'metier' manquant")
+        return {
+            "universites": self.kb_loader.rechercher_universites_pour_metier(
+                parametres["metier"], parametres.get("serie")
+            )
+        }
+
+    def recommandations(self, parametres: Dict[str, str], corps: Any) -> Any:
+        """Recommandations d'un profil ou d'un lot (format=compact : identifiants de la base)"""
+        profils, lot = self.profils_demandes(corps)
+        resultats = [self.moteur.generer_recommandations(profil) for profil in profils]
+        if parametres.get("format") == "compact":
+            resultats = [compacter(resultat, self.kb_loader) for resultat in resultats]
+        return {"resultats": resultats} if lot else resultats[0]
+
+    def analyses(self, parametres: Dict[str, str], corps: Any) -> Any:
+        """Analyses IA d'un profil ou d'un lot (analyse de base si l'IA est indisponible)"""
+        if self.llm_interface is None:
+            raise ErreurRequete(503, "Interface IA non configurée")
+        # Un client attend la réponse : budget de latence de l'analyse interactive
+        from llm_interface import BUDGET_LATENCE_ANALYSE
+        profils, lot = self.profils_demandes(corps)
+        resultats = asyncio.run(analyser_lot(
+            self.moteur, self.llm_interface, profils, self.concurrence_analyses, priorite=PRIORITE_SECONDAIRE,
+            budget_latence=BUDGET_LATENCE_ANALYSE
+        ))
+        return {"resultats": resultats} if lot else resultats[0]
+
+
+# Routes : (méthode, chemin) -> (nom du traitement, réponse déterminée par la version de la base)
+ROUTES = {
+    ("GET", "/v1/sante"): ("sante", False),
+    ("GET", "/v1/metiers"): ("metiers", True),
+    ("GET", "/v1/suggestions"): ("suggestions", True),
+    ("GET", "/v1/universites"): ("universites", True),
+    ("POST", "/v1/recommandations"): ("recommandations", True),
+    ("POST", "/v1/analyses"): ("analyses", False)
+}
+
+
+class GestionnaireAPI(BaseHTTPRequestHandler):
+    """Décode la requête, applique ETag / Cache-Control et encode la réponse JSON"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "OrientationAPI/1"
+    # Une connexion inactive libère son travailleur après ce délai (s)
+    timeout = 15
+
+    def do_GET(self) -> None:
+        self._traiter("GET")
+
+    def do_POST(self) -> None:
+        self._traiter("POST")
+
+    def _traiter(self, methode: str) -> None:
+        debut = time.perf_counter()
+        url = urlsplit(self.path)
+        route = ROUTES.get((methode, url.path))
+        try:
+            if route is None:
+                existe = any(chemin == url.path for _, chemin in ROUTES)
+                raise ErreurRequete(405 if existe else 404, "Méthode non autorisée" if existe else "Route inconnue")
+
+            nom, determine_par_kb = route
+            service: ServiceRecommandation = self.server.service
+            if (methode, url.path) in ROUTES_PROTEGEES and not service.autoriser(self.headers.get(ENTETE_CLE_API)):
+                raise ErreurRequete(401, f"Clé d'API manquante ou invalide (en-tête {ENTETE_CLE_API})")
+            parametres = {cle: valeurs[0] for cle, valeurs in parse_qs(url.query).items()}
+            corps_brut = self._lire_corps() if methode == "POST" else b""
+
+            # La réponse ne dépend que de la requête et de la version de la base :
+            # l'ETag est connu avant tout calcul et un client à jour reçoit 304 sans traitement
+            etag = None
+            if determine_par_kb:
+                empreinte = hashlib.sha256(self.path.encode("utf-8") + b"\n" + corps_brut).hexdigest()[:16]
+                etag = f'"{service.kb_loader.version_contenu}-{empreinte}"'
+                if etag in (self.headers.get("If-None-Match") or ""):
+                    self._envoyer(304, None, etag, service.max_age)
+                    return
+
+            traitement = getattr(service, nom)
+            if methode == "POST":
+                try:
+                    corps = json.loads(corps_brut or b"null")
+                except ValueError:
+                    raise ErreurRequete(400, "Corps JSON invalide")
+                reponse = traitement(parametres, corps)
+            else:
+                reponse = traitement(parametres)
+            self._envoyer(200, reponse, etag, service.max_age if determine_par_kb else None)
+        except ErreurRequete as e:
+            self._envoyer(e.code, {"erreur": str(e)})
+        except Exception as e:
+            self._envoyer(500, {"erreur": f"Erreur interne : {e}"})
+        finally:
+            PROFILEUR.enregistrer(f"api.{route[0] if route else 'inconnue'}", time.perf_counter() - debut)
+
+    def _lire_corps(self) -> bytes:
+        longueur = int(self.headers.get("Content-Length") or 0)
+        if longueur > TAILLE_CORPS_MAX:
+            # Corps non lu : la connexion ne peut pas être réutilisée
+            self.close_connection = True
+            raise ErreurRequete(413, "Corps de requête trop volumineux")
+        return self.rfile.read(longueur)
+
+    def _envoyer(self, code: int, reponse: Any, etag: Optional[str] = None, max_age: Optional[int] = None) -> None:
+        contenu = b"" if reponse is None else json.dumps(
+            reponse, ensure_ascii=False, separators=(",", ":"), default=serialiser
+        ).encode("utf-8")
+        self.send_response(code)
+        if reponse is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(contenu)))
+        if etag:
+            self.send_header("ETag", etag)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.send_header("Cache-Control", f"public, max-age={max_age}" if max_age is not None else "no-store")
+        self.end_headers()
+        self.wfile.write(contenu)
+
+    def log_message(self, format: str, *args) -> None:
+        # Journal d'accès laissé au proxy ; les durées sont suivies par le profileur
+        pass
+
+
+class ServeurAPI(HTTPServer):
+    """Serveur HTTP dont les connexions sont traitées par un pool borné de travailleurs"""
+
+    def __init__(self, adresse: Tuple[str, int], service: ServiceRecommandation, nb_travailleurs: int = 8):
+        super().__init__(adresse, GestionnaireAPI)
+        self.service = service
+        self.travailleurs = ThreadPoolExecutor(max_workers=nb_travailleurs, thread_name_prefix="api")
+
+    def process_request(self, requete, adresse_client) -> None:
+        self.travailleurs.submit(self._traiter_connexion, requete, adresse_client)
+
+    def _traiter_connexion(self, requete, adresse_client) -> None:
+        try:
+            self.finish_request(requete, adresse_client)
+        except Exception:
+            self.handle_error(requete, adresse_client)
+        finally:
+            self.shutdown_request(requete)
+
+    def handle_error(self, requete, adresse_client) -> None:
+        # Client parti en cours de connexion : rien à signaler
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(requete, adresse_client)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.travailleurs.shutdown(wait=False)
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Lance l'API HTTP (section [api] des secrets, surchargeable en ligne de commande)"""
+    analyseur = argparse.ArgumentParser(description="API HTTP JSON d'orientation")
+    analyseur.add_argument("--hote", default=None)
+    analyseur.add_argument("--port", type=int, default=None)
+    analyseur.add_argument("--travailleurs", type=int, default=None)
+    options = analyseur.parse_args(arguments)
+
+    from knowledge_base_loader import KnowledgeBaseLoader
+    from recommendation_logic_student import RecommendationEngine
+    from llm_interface import LLMInterface
+
+    # Une seule base chargée pour le processus, partagée par tous les travailleurs
+    kb_loader = KnowledgeBaseLoader()
+    moteur = RecommendationEngine(kb_loader)
+    llm_interface = LLMInterface(kb_loader.version_contenu)
+    config = llm_interface.lire_config_secrets("api", CONFIG_API_PAR_DEFAUT)
+    hote = options.hote or config["hote"]
+    port = options.port or config["port"]
+    nb_travailleurs = options.travailleurs or config["nb_travailleurs"]
+    for cle in ("hote", "port", "nb_travailleurs"):
+        config.pop(cle, None)
+
+    if hote not in ("127.0.0.1", "localhost", "::1") and not config["cle_api"]:
+        print(f"⚠️ API exposée sur {hote} sans cle_api : /v1/analyses est ouverte à tous", file=sys.stderr)
+
+    service = ServiceRecommandation(kb_loader, moteur, llm_interface, **config)
+    serveur = ServeurAPI((hote, port), service, nb_travailleurs)
+    print(f"API d'orientation sur http://{hote}:{port}/v1 "
+          f"({nb_travailleurs} travailleurs, base {kb_loader.version_contenu})", flush=True)
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+
+
+if __name__ == "__main__":
+    main()
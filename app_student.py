@@ -5,15 +5,33 @@ Application Streamlit principale
 
 import streamlit as st
 import json
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Union
+import time
 import traceback
+import uuid
 import logging
 from datetime import datetime
 
 # Import des modules personnalisés
-from knowledge_base_loader import KnowledgeBaseLoader
-from recommendation_logic_student import RecommendationEngine
-from llm_interface import LLMInterface
+from demarrage import lancer_chargement, module_differe
+from export_rapports import generer_rapport
+from profilage import PROFILEUR
+from rendu_cartes import obtenir_cache_fragments
+from sessions_partagees import COOKIE_SESSION, CHAMPS_PERSONNELS, obtenir_magasin_sessions
+
+# Modules lourds (pydantic, requests, base) importés après le premier affichage, voir demarrage.py
+knowledge_base_loader = module_differe("knowledge_base_loader")
+recommendation_logic_student = module_differe("recommendation_logic_student")
+llm_interface = module_differe("llm_interface")
+prechauffage = module_differe("prechauffage")
+schema_resultats = module_differe("schema_resultats")
+
+# Analyses conservées par session (les plus anciennes sont oubliées au-delà)
+NB_RESULTATS_SESSION = 5
+
+# Suggestions de carrières affichées, et fréquence de reclassement selon le journal des demandes (s)
+NB_SUGGESTIONS_CARRIERE = 5
+DELAI_POPULARITE = 3600
 
 def main():
     """Application principale Streamlit"""
@@ -57,6 +75,17 @@ def main():
         margin: 0.5rem 0;
         border-left: 3px solid #2E8B57;
     }
+    .university-header {
+        display: flex;
+        justify-content: space-between;
+        margin-bottom: 0.5rem;
+    }
+    details {
+        margin: 0.3rem 0;
+    }
+    details summary {
+        cursor: pointer;
+    }
     </style>
     """, unsafe_allow_html=True)
     
@@ -64,13 +93,31 @@ def main():
     st.markdown('<h1 class="main-title">🎓 Système d\'Orientation Professionnelle du Bénin</h1>', 
                 unsafe_allow_html=True)
     
+    # Base, index et modules lourds chargés en arrière-plan, une fois par processus
+    chargement = lancer_chargement()
+    
     # Initialisation des composants avec gestion d'erreur robuste
     if 'knowledge_base' not in st.session_state:
+        # Pendant le chargement, l'accueil est affiché sans attendre la base
+        accueil = st.empty()
+        if not chargement.pret():
+            with accueil.container():
+                afficher_page_accueil()
         try:
             with st.spinner("Chargement de la base de connaissances..."):
-                st.session_state.knowledge_base = KnowledgeBaseLoader()
-                st.session_state.recommendation_engine = RecommendationEngine(st.session_state.knowledge_base)
-                st.session_state.llm_interface = LLMInterface()
+                # Base et moteur partagés par les sessions (préchargés par lanceur_workers.py)
+                st.session_state.recommendation_engine = chargement.attendre()
+                st.session_state.knowledge_base = st.session_state.recommendation_engine.kb_loader
+                st.session_state.llm_interface = llm_interface.LLMInterface(
+                    st.session_state.knowledge_base.version_contenu
+                )
+                
+                # Préchauffage du cache IA en heures creuses (une seule fois par processus, si activé)
+                prechauffage.demarrer_prechauffage(
+                    st.session_state.recommendation_engine,
+                    st.session_state.llm_interface,
+                    st.session_state.knowledge_base.version_contenu
+                )
                 
                 # Validation de la base de connaissances
                 validation = st.session_state.knowledge_base.valider_base_connaissances()
@@ -88,9 +135,13 @@ def main():
             st.error("❌ Fichier de base de connaissances non trouvé. L'application fonctionne en mode dégradé.")
             st.info("💡 Un fichier exemple va être créé automatiquement.")
             try:
-                st.session_state.knowledge_base = KnowledgeBaseLoader()
-                st.session_state.recommendation_engine = RecommendationEngine(st.session_state.knowledge_base)
-                st.session_state.llm_interface = LLMInterface()
+                st.session_state.knowledge_base = knowledge_base_loader.KnowledgeBaseLoader()
+                st.session_state.recommendation_engine = recommendation_logic_student.RecommendationEngine(
+                    st.session_state.knowledge_base
+                )
+                st.session_state.llm_interface = llm_interface.LLMInterface(
+                    st.session_state.knowledge_base.version_contenu
+                )
             except Exception as e:
                 st.error(f"Impossible d'initialiser l'application : {str(e)}")
                 st.stop()
@@ -100,10 +151,12 @@ def main():
             try:
                 st.session_state.knowledge_base = None
                 st.session_state.recommendation_engine = None
-                st.session_state.llm_interface = LLMInterface()
+                # Sans base : réponses en cache propres à ce mode, celles des autres versions restent intactes
+                st.session_state.llm_interface = llm_interface.LLMInterface(version_kb="")
             except:
                 st.error("Impossible de démarrer l'application.")
                 st.stop()
+        accueil.empty()
     
     # Sidebar pour les informations du profil
     with st.sidebar:
@@ -139,8 +192,16 @@ def main():
             ]
             serie_bac = st.selectbox("Votre série du BAC :", series_bac)
             filiere_actuelle = None
+            
+            # Notes (optionnelles) pour estimer les chances d'admission
+            with st.expander("📝 Vos notes (optionnel)"):
+                notes = {
+                    matiere: st.number_input(matiere, min_value=0.0, max_value=20.0, value=None, step=0.5)
+                    for matiere in ["Maths", "PCT", "SVT", "Français", "Anglais", "Histoire", "Philosophie", "Économie"]
+                }
         else:
             serie_bac = None
+            notes = {}
             filiere_actuelle = st.text_input(
                 "Filière universitaire actuelle :", 
                 placeholder="Ex: Licence en Informatique, Master en Gestion..."
@@ -149,8 +210,14 @@ def main():
         # Carrière envisagée
         carriere_envisagee = st.text_input(
             "Carrière que vous envisagez :",
-            placeholder="Ex: Médecin, Ingénieur en informatique, Avocat..."
+            placeholder="Ex: Médecin, Ingénieur en informatique, Avocat...",
+            key="carriere_envisagee"
         )
+        suggestions = suggestions_carriere(carriere_envisagee)
+        if suggestions:
+            st.caption("Carrières connues de la base :")
+            for suggestion in suggestions:
+                st.button(suggestion, key=f"suggestion_{suggestion}", on_click=_choisir_carriere, args=(suggestion,))
         
         # Bouton d'analyse
         analyser = st.button("🔍 Analyser mon profil", type="primary")
@@ -170,53 +237,107 @@ def main():
                 if st.session_state.knowledge_base:
                     stats = st.session_state.knowledge_base.get_statistics()
                     st.json(stats)
+                    st.caption("Cartes des résultats en cache")
+                    st.json(cache_fragments().statistiques())
                 else:
                     st.error("Base de connaissances non disponible")
+            
+            if st.button("🔌 Connexions HTTP"):
+                st.json(st.session_state.llm_interface.client_http.metriques())
+            
+            if st.button("🗄️ Cache des réponses IA"):
+                if st.session_state.llm_interface.cache:
+                    st.json(st.session_state.llm_interface.cache.statistiques())
+                else:
+                    st.error("Cache des réponses indisponible")
+                st.caption("Requêtes identiques regroupées")
+                st.json(st.session_state.llm_interface.coalesceur.statistiques())
+            
+            if st.button("🚦 File d'attente API"):
+                st.json(st.session_state.llm_interface.limiteur.metriques())
+            
+            if st.button("🧮 File des analyses IA"):
+                st.json(st.session_state.llm_interface.admission.statistiques())
+            
+            if st.button("🪙 Consommation de tokens"):
+                if st.session_state.llm_interface.comptabilite:
+                    st.json(st.session_state.llm_interface.comptabilite.statistiques())
+                else:
+                    st.error("Comptabilité des tokens indisponible")
+            
+            if st.button("🔥 Préchauffage du cache IA"):
+                prechauffeur = prechauffage.obtenir_prechauffeur(
+                    st.session_state.recommendation_engine,
+                    st.session_state.llm_interface,
+                    st.session_state.knowledge_base.version_contenu
+                ) if st.session_state.knowledge_base else None
+                if prechauffeur:
+                    st.json(prechauffeur.statistiques())
+                else:
+                    st.error("Préchauffage indisponible (clé API ou cache des réponses manquant)")
+            
+            st.caption(f"🛡️ Disjoncteur API : {st.session_state.llm_interface.disjoncteur.etat}")
+            if st.button("🛡️ Disjoncteur API"):
+                st.json(st.session_state.llm_interface.disjoncteur.metriques())
+            
+            # Case reflétant l'état du processus ; seul un changement par l'utilisateur le modifie
+            st.session_state.profilage_actif = PROFILEUR.actif
+            st.checkbox("⏱️ Activer le profilage", key="profilage_actif", on_change=basculer_profilage)
+            if st.button("⏱️ Temps par étape"):
+                afficher_profilage()
+            if st.button("🗑️ Réinitialiser les mesures"):
+                PROFILEUR.reinitialiser()
     
     # Zone principale de contenu
-    if analyser and carriere_envisagee:
-        with st.spinner("Analyse de votre profil en cours..."):
-            try:
-                # Création du profil utilisateur
-                profil_utilisateur = {
-                    "nom": nom if nom else None,
-                    "prenom": prenom if prenom else None,
-                    "statut": statut,
-                    "serie_bac": serie_bac,
-                    "filiere_actuelle": filiere_actuelle,
-                    "carriere_envisagee": carriere_envisagee
-                }
-                
-                # Génération des recommandations
-                if st.session_state.recommendation_engine:
-                    recommandations = st.session_state.recommendation_engine.generer_recommandations(profil_utilisateur)
-                else:
-                    st.warning("⚠️ Moteur de recommandation indisponible. Analyse basique uniquement.")
-                    recommandations = {"mode": "degrade"}
-                
-                # Analyse avec l'IA
-                analyse_ia = st.session_state.llm_interface.analyser_profil(
-                    profil_utilisateur, 
-                    recommandations
-                )
-                
-                # Affichage des résultats
-                afficher_resultats(profil_utilisateur, recommandations, analyse_ia)
-                
-                # Option d'export des résultats
-                if st.button("📄 Exporter le rapport d'analyse"):
-                    rapport = generer_rapport_export(profil_utilisateur, recommandations, analyse_ia)
-                    st.download_button(
-                        label="💾 Télécharger le rapport (TXT)",
-                        data=rapport,
-                        file_name=f"rapport_orientation_{datetime.now().strftime('%Y%m%d_%H%M')}.txt",
-                        mime="text/plain"
-                    )
-                
-            except Exception as e:
-                st.error(f"Erreur lors de l'analyse : {str(e)}")
-                with st.expander("Détails de l'erreur"):
-                    st.code(traceback.format_exc())
+    profil_utilisateur = {
+        "nom": nom if nom else None,
+        "prenom": prenom if prenom else None,
+        "statut": statut,
+        "serie_bac": serie_bac,
+        "filiere_actuelle": filiere_actuelle,
+        "carriere_envisagee": carriere_envisagee,
+        "notes": {matiere: note for matiere, note in notes.items() if note is not None}
+    }
+    
+    # Résultats déjà calculés pour ce profil dans la session : réaffichés à chaque réexécution
+    # (export, pagination, autre widget) sans recalcul ni nouvel appel à l'API
+    cle = cle_profil(profil_utilisateur)
+    if "resultats_analyse" not in st.session_state:
+        # Nouvelle session (rechargement, redémarrage d'un worker) : résultats repris du magasin partagé
+        st.session_state.resultats_analyse = restaurer_resultats()
+    resultat = st.session_state.resultats_analyse.get(cle) if carriere_envisagee else None
+    recommandations = recommandations_conservees(cle, resultat) if resultat else None
+    if recommandations is None:
+        # Résultat calculé sur une version précédente de la base : il sera recalculé
+        resultat = None
+    
+    if analyser and carriere_envisagee and (resultat is None or resultat["repli"]):
+        try:
+            resultat = calculer_et_afficher_resultats(profil_utilisateur, cle)
+            afficher_export(resultat)
+        except Exception as e:
+            st.error(f"Erreur lors de l'analyse : {str(e)}")
+            with st.expander("Détails de l'erreur"):
+                st.code(traceback.format_exc())
+    
+    elif resultat is not None:
+        if st.session_state.get("profil_affiche") != cle:
+            st.session_state.profil_affiche = cle
+            st.session_state.page_universites = 0
+        if "pagination" not in resultat:
+            resultat["pagination"] = (
+                st.session_state.recommendation_engine.paginer_universites(profil_utilisateur)
+                if st.session_state.recommendation_engine else None
+            )
+        if "rapport" not in resultat or resultat["profil"] != profil_utilisateur:
+            # Rapport personnalisé (nom compris) : jamais conservé dans le magasin partagé
+            resultat["profil"] = profil_utilisateur
+            resultat["rapport"] = generer_rapport_export(
+                profil_utilisateur, recommandations, resultat["analyse_ia"]
+            ).encode("utf-8")
+        st.session_state.pagination_universites = resultat["pagination"]
+        afficher_resultats(profil_utilisateur, recommandations, resultat["analyse_ia"])
+        afficher_export(resultat)
     
     elif analyser and not carriere_envisagee:
         st.warning("⚠️ Veuillez renseigner la carrière que vous envisagez.")
@@ -225,6 +346,162 @@ def main():
         # Page d'accueil
         afficher_page_accueil()
 
+def suggestions_carriere(saisie: str) -> List[str]:
+    """Carrières de la base commençant par la saisie (aucune si elle en nomme déjà une)"""
+    if not saisie.strip() or not st.session_state.knowledge_base:
+        return []
+    index = st.session_state.knowledge_base.index_carrieres
+    # Classement par popularité : journal des demandes relu au plus une fois par DELAI_POPULARITE
+    journal = prechauffage.obtenir_journal_demande(st.session_state.llm_interface)
+    if journal and (index.popularite_du is None or time.time() - index.popularite_du > DELAI_POPULARITE):
+        demandes = journal.demandes_par_carriere()
+        index.ajuster_popularite(demandes)
+        # Mêmes demandes pour les parcours précalculés du graphe (recalcul en arrière-plan)
+        if st.session_state.recommendation_engine:
+            st.session_state.recommendation_engine.graphe_parcours.ajuster_cibles_frequentes(demandes)
+    suggestions = index.completer(saisie, NB_SUGGESTIONS_CARRIERE)
+    if any(index.normaliser(suggestion) == index.normaliser(saisie) for suggestion in suggestions):
+        return []
+    return suggestions
+
+def _choisir_carriere(carriere: str):
+    """Remplace la saisie de la carrière par la suggestion choisie"""
+    st.session_state.carriere_envisagee = carriere
+
+def cle_profil(profil: Dict) -> str:
+    """Clé du profil normalisé (casse et espaces ignorés, notes triées, sans nom ni prénom)"""
+    normalise = {
+        champ: " ".join(valeur.split()).lower() if isinstance(valeur, str) else valeur
+        for champ, valeur in profil.items() if champ != "notes" and champ not in CHAMPS_PERSONNELS
+    }
+    normalise["notes"] = sorted(profil.get("notes", {}).items())
+    return json.dumps(normalise, sort_keys=True, ensure_ascii=False)
+
+def navigateur() -> Optional[str]:
+    """Identifiant opaque du navigateur posé par le proxy (None hors déploiement multi-workers)"""
+    try:
+        return st.context.cookies.get(COOKIE_SESSION)
+    except Exception:
+        return None
+
+def locataire() -> str:
+    """Locataire pour la file équitable des analyses : le navigateur, à défaut la session"""
+    if "locataire" not in st.session_state:
+        st.session_state.locataire = navigateur() or uuid.uuid4().hex
+    return st.session_state.locataire
+
+def restaurer_resultats() -> Dict:
+    """Résultats conservés pour ce navigateur par n'importe quel worker"""
+    magasin = obtenir_magasin_sessions(st.session_state.llm_interface)
+    identifiant = navigateur()
+    if not magasin or not identifiant:
+        return {}
+    return magasin.lire(identifiant, NB_RESULTATS_SESSION)
+
+def recommandations_conservees(cle: str, resultat: Dict) -> Optional[Dict]:
+    """Recommandations d'un résultat de session, résolues dans la base (None si la base a changé)"""
+    if resultat["recommandations"].get("mode") == "degrade":
+        return resultat["recommandations"]
+    try:
+        return schema_resultats.resoudre(resultat["recommandations"], st.session_state.knowledge_base)
+    except (schema_resultats.ResultatIncompatible, AttributeError, IndexError, KeyError):
+        st.session_state.resultats_analyse.pop(cle, None)
+        return None
+
+def calculer_et_afficher_resultats(profil_utilisateur: Dict, cle: str) -> Dict:
+    """Calcule les recommandations et l'analyse IA, les affiche et les conserve dans la session"""
+    
+    # Génération des recommandations
+    classement = None
+    with st.spinner("Analyse de votre profil en cours..."):
+        if st.session_state.recommendation_engine:
+            # Un seul passage sur les universités candidates, pour les recommandations et la pagination
+            classement = st.session_state.recommendation_engine.classer_candidates(profil_utilisateur)
+            recommandations = st.session_state.recommendation_engine.generer_recommandations(
+                profil_utilisateur, classement
+            )
+            
+            # Demande comptée pour le préchauffage (combinaison du profil uniquement)
+            journal = prechauffage.obtenir_journal_demande(st.session_state.llm_interface)
+            if journal:
+                journal.enregistrer(profil_utilisateur)
+        else:
+            st.warning("⚠️ Moteur de recommandation indisponible. Analyse basique uniquement.")
+            recommandations = {"mode": "degrade"}
+    
+    # Analyse avec l'IA lancée dès que le prompt est connu : elle progresse pendant
+    # l'affichage des résultats de la base et s'affiche au fil de l'eau en dessous
+    flux_analyse = st.session_state.llm_interface.analyser_profil_flux(
+        profil_utilisateur, 
+        recommandations,
+        anticiper=True,
+        locataire=locataire()
+    )
+    
+    if st.session_state.recommendation_engine:
+        st.session_state.pagination_universites = (
+            st.session_state.recommendation_engine.paginer_universites(profil_utilisateur, classement=classement)
+        )
+    else:
+        st.session_state.pagination_universites = None
+    st.session_state.page_universites = 0
+    st.session_state.profil_affiche = cle
+    
+    # Affichage des résultats
+    analyse_ia = afficher_resultats(profil_utilisateur, recommandations, flux_analyse)
+    
+    resultat = {
+        "profil": profil_utilisateur,
+        # Format compact (identifiants dans la base) : quelques centaines d'octets par résultat
+        "recommandations": (
+            recommandations if recommandations.get("mode") == "degrade"
+            else schema_resultats.compacter(recommandations, st.session_state.knowledge_base)
+        ),
+        "analyse_ia": str(analyse_ia),
+        # Analyse de base affichée faute de réponse de l'IA : un nouveau clic sur "Analyser" la redemande
+        "repli": isinstance(analyse_ia, llm_interface.RepliAnalyse),
+        "pagination": st.session_state.pagination_universites,
+        "rapport": generer_rapport_export(profil_utilisateur, recommandations, str(analyse_ia)).encode("utf-8"),
+        "nom_fichier": f"rapport_orientation_{datetime.now().strftime('%Y%m%d_%H%M')}.txt"
+    }
+    
+    magasin = obtenir_magasin_sessions(st.session_state.llm_interface)
+    identifiant = navigateur()
+    if magasin and identifiant:
+        magasin.enregistrer(identifiant, cle, resultat)
+    
+    resultats_session = st.session_state.resultats_analyse
+    resultats_session.pop(cle, None)
+    resultats_session[cle] = resultat
+    while len(resultats_session) > NB_RESULTATS_SESSION:
+        resultats_session.pop(next(iter(resultats_session)))
+    return resultat
+
+def afficher_export(resultat: Dict):
+    """Bouton de téléchargement servi directement depuis le rapport conservé"""
+    st.download_button(
+        label="📄 Exporter le rapport d'analyse (TXT)",
+        data=resultat["rapport"],
+        file_name=resultat["nom_fichier"],
+        mime="text/plain"
+    )
+
+def basculer_profilage():
+    """Active ou désactive le profilage du processus (pour toutes les sessions)"""
+    PROFILEUR.actif = st.session_state.profilage_actif
+
+def afficher_profilage():
+    """Affiche les temps par étape (p50/p95/p99) et les compteurs du processus"""
+    
+    statistiques = PROFILEUR.statistiques()
+    if not statistiques:
+        st.info("Aucune mesure. Activez le profilage puis lancez une analyse.")
+        return
+    
+    st.dataframe(statistiques, hide_index=True)
+    if PROFILEUR.compteurs():
+        st.json(PROFILEUR.compteurs())
+
 def afficher_page_accueil():
     """Affiche la page d'accueil avec les instructions"""
     
@@ -269,8 +546,8 @@ def afficher_page_accueil():
         except:
             pass
 
-def afficher_resultats(profil: Dict, recommandations: Dict, analyse_ia: str):
-    """Affiche les résultats de l'analyse"""
+def afficher_resultats(profil: Dict, recommandations: Dict, analyse_ia: Union[str, Iterator[str]]) -> str:
+    """Affiche les résultats de l'analyse et retourne le texte final de l'analyse IA"""
     
     # En-tête avec le profil
     st.markdown('<div class="section-header">👤 Votre Profil</div>', unsafe_allow_html=True)
@@ -288,153 +565,148 @@ def afficher_resultats(profil: Dict, recommandations: Dict, analyse_ia: str):
             st.write(f"**Filière actuelle :** {profil['filiere_actuelle']}")
         st.write(f"**Carrière envisagée :** {profil['carriere_envisagee']}")
     
-    # Analyse de l'IA
+    # Vérification du mode dégradé
+    if recommandations.get("mode") == "degrade":
+        st.warning("⚠️ Analyse en mode dégradé - Données limitées disponibles")
+    else:
+        afficher_resultats_base(recommandations)
+    
+    # Analyse de l'IA (affichée progressivement si elle arrive en flux)
     st.markdown('<div class="section-header">🤖 Analyse de votre choix</div>', unsafe_allow_html=True)
     st.markdown('<div class="recommendation-card">', unsafe_allow_html=True)
-    st.markdown(analyse_ia)
+    texte_analyse = afficher_analyse_ia(analyse_ia)
     st.markdown('</div>', unsafe_allow_html=True)
     
-    # Vérification du mode dégradé
-    if recommandations.get("mode") == "degrade":
-        st.warning("⚠️ Analyse en mode dégradé - Données limitées disponibles")
-        return
+    return texte_analyse
+
+def afficher_analyse_ia(analyse_ia: Union[str, Iterator[str]]) -> str:
+    """Affiche l'analyse IA, token par token lorsqu'elle est fournie sous forme de flux"""
+    
+    if isinstance(analyse_ia, str):
+        st.markdown(analyse_ia)
+        return analyse_ia
+    
+    zone_analyse = st.empty()
+    zone_analyse.caption("⏳ L'analyse personnalisée arrive...")
+    tache = st.session_state.llm_interface.derniere_tache
+    texte = ""
+    try:
+        # Analyse en file d'attente : position et attente estimée actualisées chaque seconde
+        while tache is not None and not tache.attendre_demarrage(1.0):
+            zone_analyse.caption(
+                f"⏳ Forte affluence : vous êtes {tache.position() + 1}ᵉ dans la file d'attente "
+                f"(environ {tache.attente_estimee():.0f} s). Vos résultats sont déjà affichés ci-dessus."
+            )
+        for morceau in analyse_ia:
+            if isinstance(morceau, llm_interface.RepliAnalyse):
+                # Échec de l'IA : l'analyse de base remplace le texte partiel (type conservé pour l'appelant)
+                texte = morceau
+            else:
+                texte += morceau
+            zone_analyse.markdown(texte + "▌")
+    finally:
+        # Session fermée ou réexécutée pendant l'analyse : l'exécutant est libéré
+        if tache is not None:
+            tache.annuler()
+    zone_analyse.markdown(texte)
+    
+    temps_premier_token = st.session_state.llm_interface.dernier_temps_premier_token
+    if temps_premier_token is not None:
+        st.caption(f"⚡ Premier token reçu en {temps_premier_token * 1000:.0f} ms")
+    
+    return texte
+
+@PROFILEUR.mesurer("rendu.resultats_base")
+def afficher_resultats_base(recommandations: Dict):
+    """Affiche les résultats issus de la base de connaissances (universités, parcours, alternatives)"""
     
     # Universités recommandées
     if recommandations.get('universites_recommandees'):
         st.markdown('<div class="section-header">🏛️ Universités et Filières Recommandées</div>', 
                    unsafe_allow_html=True)
         
-        for universite in recommandations['universites_recommandees']:
-            afficher_carte_universite(universite)
+        if st.session_state.get('pagination_universites'):
+            afficher_universites_paginees()
+        else:
+            for universite in recommandations['universites_recommandees']:
+                afficher_carte_universite(universite)
+    
+    # Parcours suggéré
+    parcours = recommandations.get('parcours_suggere', {})
+    if parcours.get('etapes'):
+        st.markdown('<div class="section-header">🗺️ Parcours Suggéré</div>', unsafe_allow_html=True)
+        st.write(f"**Durée estimée :** {parcours['duree_totale']}")
+        for etape in parcours['etapes']:
+            st.write(etape)
+        
+        for i, alternatif in enumerate(parcours.get('parcours_alternatifs', []), 1):
+            with st.expander(f"Autre parcours possible {i} ({alternatif['duree_totale']})"):
+                for etape in alternatif['etapes']:
+                    st.write(etape)
+    
+    # Combinaisons de choix pour apresmonbac
+    if recommandations.get('choix_optimises'):
+        st.markdown('<div class="section-header">🎯 Stratégie pour vos 3 choix sur apresmonbac</div>', 
+                   unsafe_allow_html=True)
+        legende = ("Combinaisons classées selon vos chances d'admission, l'adéquation avec votre projet "
+                   "et le type de place.")
+        # Contrainte appliquée par l'optimiseur seulement si la règle figure dans la base
+        moteur = st.session_state.get('recommendation_engine')
+        if moteur and moteur.optimiseur_choix.exiger_faculte_classique:
+            legende += " Chaque combinaison inclut au moins une Faculté Classique."
+        st.caption(legende)
+        
+        for i, combinaison in enumerate(recommandations['choix_optimises'], 1):
+            with st.expander(f"Combinaison {i} - score {combinaison['score']:.0%}", expanded=(i == 1)):
+                for rang, choix in enumerate(combinaison['choix'], 1):
+                    st.write(
+                        f"**Choix {rang} :** {choix['nom_filiere']} - {choix['faculte']} "
+                        f"({choix['sigle'] or choix['nom_universite']}, {choix['statut']}) · "
+                        f"admission estimée {choix['probabilite_admission']:.0%}"
+                    )
     
     # Carrières alternatives
     if recommandations.get('carrieres_alternatives'):
         st.markdown('<div class="section-header">💼 Carrières Alternatives à Considérer</div>', 
                    unsafe_allow_html=True)
         
-        for i, carriere in enumerate(recommandations['carrieres_alternatives'][:3], 1):
-            with st.expander(f"{i}. {carriere.nom_metier}"):
-                st.write(f"**Secteur :** {carriere.secteur_activite}")
-                st.write(f"**Description :** {carriere.description}")
-                if carriere.niveau_demande_marche:
-                    st.write(f"**Demande sur le marché :** {carriere.niveau_demande_marche}")
-                if carriere.pertinence_realites_africaines_benin:
-                    st.write(f"**Pertinence au Bénin :** {carriere.pertinence_realites_africaines_benin}")
+        cache = cache_fragments()
+        st.markdown(
+            "".join(cache.carriere(i, carriere)
+                    for i, carriere in enumerate(recommandations['carrieres_alternatives'][:3], 1)),
+            unsafe_allow_html=True
+        )
 
-def afficher_carte_universite(universite_info: Dict):
-    """Affiche les informations d'une université sous forme de carte"""
-    
-    st.markdown('<div class="university-card">', unsafe_allow_html=True)
-    
-    # En-tête de l'université
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        st.markdown(f"**🏛️ {universite_info['nom_universite']}**")
-        if universite_info.get('sigle'):
-            st.markdown(f"*({universite_info['sigle']})*")
-    
-    with col2:
-        statut_color = "🟢" if universite_info['statut'] == "Public" else "🔵"
-        st.markdown(f"{statut_color} {universite_info['statut']}")
+def _afficher_page_universites_suivante():
+    """Passe à la page suivante du classement des universités"""
+    st.session_state.page_universites = st.session_state.get('page_universites', 0) + 1
+
+@st.fragment
+def afficher_universites_paginees():
+    """Affiche les universités page par page (seul ce fragment est réexécuté)"""
     
-    # Informations générales
-    if universite_info.get('localisation'):
-        st.markdown(f"📍 **Localisation :** {universite_info['localisation']}")
+    paginateur = st.session_state.pagination_universites
+    page = st.session_state.get('page_universites', 0)
     
-    # Filières recommandées
-    if universite_info.get('filieres_recommandees'):
-        st.markdown("**📚 Filières adaptées à votre profil :**")
-        
-        for filiere in universite_info['filieres_recommandees']:
-            with st.expander(f"• {filiere['nom_filiere']} ({filiere['diplome_delivre']})"):
-                
-                col_a, col_b = st.columns(2)
-                with col_a:
-                    st.write(f"**Durée :** {filiere['duree_etudes_ans']} ans")
-                    if filiere.get('series_bac_requises'):
-                        st.write(f"**Séries BAC acceptées :** {', '.join(filiere['series_bac_requises'])}")
-                
-                with col_b:
-                    if filiere.get('autres_prerequis'):
-                        st.write(f"**Autres prérequis :** {filiere['autres_prerequis']}")
-                
-                if filiere.get('description_filiere'):
-                    st.write(f"**Description :** {filiere['description_filiere']}")
-                
-                if filiere.get('metiers_vises_typiques'):
-                    st.write(f"**Métiers visés :** {', '.join(filiere['metiers_vises_typiques'])}")
+    # Les pages déjà calculées sont conservées par le paginateur
+    for universite in paginateur.jusqua_page(page):
+        afficher_carte_universite(universite)
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    if paginateur.a_page_suivante(page):
+        st.button("➕ Voir plus d'universités", on_click=_afficher_page_universites_suivante)
 
-def generer_rapport_export(profil: Dict, recommandations: Dict, analyse_ia: str) -> str:
-    """Génère un rapport d'analyse exportable"""
-    
-    rapport = f"""
-RAPPORT D'ORIENTATION PROFESSIONNELLE - BÉNIN
-Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}
-================================================
-
-PROFIL ÉTUDIANT
----------------
-Nom: {profil.get('prenom', '') + ' ' + profil.get('nom', '') if profil.get('nom') else 'Non renseigné'}
-Statut: {profil['statut']}
-Série BAC: {profil.get('serie_bac', 'Non applicable')}
-Filière actuelle: {profil.get('filiere_actuelle', 'Non applicable')}
-Carrière envisagée: {profil['carriere_envisagee']}
-
-ANALYSE PERSONNALISÉE
---------------------
-{analyse_ia}
+def cache_fragments():
+    """Fragments des cartes (HTML) et blocs des rapports partagés par les sessions, pour la version courante de la base"""
+    knowledge_base = st.session_state.get("knowledge_base")
+    return obtenir_cache_fragments(knowledge_base.version_contenu if knowledge_base else "")
 
-"""
-    
-    if recommandations.get("mode") != "degrade":
-        # Universités recommandées
-        if recommandations.get('universites_recommandees'):
-            rapport += "\nUNIVERSITÉS ET FILIÈRES RECOMMANDÉES\n"
-            rapport += "====================================\n"
-            
-            for i, univ in enumerate(recommandations['universites_recommandees'][:5], 1):
-                rapport += f"\n{i}. {univ['nom_universite']} ({univ['statut']})\n"
-                rapport += f"   Localisation: {univ.get('localisation', 'Non spécifiée')}\n"
-                
-                if univ.get('filieres_recommandees'):
-                    rapport += "   Filières adaptées:\n"
-                    for filiere in univ['filieres_recommandees'][:3]:
-                        rapport += f"   • {filiere['nom_filiere']} ({filiere['diplome_delivre']})\n"
-                        rapport += f"     Durée: {filiere['duree_etudes_ans']} ans\n"
-                        if filiere.get('series_bac_requises'):
-                            rapport += f"     Séries BAC: {', '.join(filiere['series_bac_requises'])}\n"
-                rapport += "\n"
-        
-        # Carrières alternatives
-        if recommandations.get('carrieres_alternatives'):
-            rapport += "\nCARRIÈRES ALTERNATIVES À CONSIDÉRER\n"
-            rapport += "==================================\n"
-            
-            for i, carriere in enumerate(recommandations['carrieres_alternatives'][:3], 1):
-                rapport += f"\n{i}. {carriere.nom_metier}\n"
-                rapport += f"   Secteur: {carriere.secteur_activite}\n"
-                rapport += f"   Description: {carriere.description}\n"
-                if carriere.niveau_demande_marche:
-                    rapport += f"   Demande marché: {carriere.niveau_demande_marche}\n"
-    
-    rapport += f"""
-
-CONSEILS POUR LA SUITE
-=====================
-1. Consultez les sites web des universités recommandées
-2. Assistez aux journées portes ouvertes
-3. Rencontrez des professionnels du domaine
-4. Préparez-vous aux concours d'entrée si nécessaire
-5. Gardez des options de carrières alternatives
+def afficher_carte_universite(universite_info: Dict):
+    """Affiche une université et ses filières en un seul élément (fragment HTML en cache)"""
+    st.markdown(cache_fragments().universite(universite_info), unsafe_allow_html=True)
 
----
-Rapport généré par le Système d'Orientation Professionnelle du Bénin
-Pour plus d'informations: contactez votre conseiller d'orientation
-"""
-    
-    return rapport
+def generer_rapport_export(profil: Dict, recommandations: Dict, analyse_ia: str) -> str:
+    """Génère un rapport d'analyse exportable (même modèle que l'export groupé)"""
+    return generer_rapport(profil, recommandations, analyse_ia, cache=cache_fragments())
 
 if __name__ == "__main__":
     main()
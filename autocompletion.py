@@ -0,0 +1,154 @@
+"""
+Module d'autocomplétion des carrières : tableau trié de préfixes (recherche dichotomique), classé par popularité
+"""
+
+import re
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from automate_motifs import normaliser_texte
+
+# Appellations courantes -> métier de la base proposé à leur place
+SYNONYMES_METIERS = {
+    "Docteur": "Médecin",
+    "Généraliste": "Médecin",
+    "Infirmière": "Infirmier",
+    "Maïeuticien": "Sage-femme",
+    "Programmeur": "Développeur d'applications",
+    "Développeur web": "Développeur d'applications",
+    "Développeur mobile": "Développeur d'applications",
+    "Informaticien": "Développeur d'applications",
+    "Data Scientist": "Data Analyst",
+    "Analyste de données": "Data Analyst",
+    "Hacker éthique": "Spécialiste en cybersécurité",
+    "Ingénieur IA": "Ingénieur en Intelligence Artificielle",
+    "Agronome": "Ingénieur Agricole",
+    "Éleveur": "Zootechnicien",
+    "Professeur": "Enseignant",
+    "Instituteur": "Enseignant",
+    "Expert-comptable": "Comptable",
+    "Acteur": "Comédien",
+    "Juriste": "Avocat",
+    "Géomaticien": "Spécialiste en géomatique"
+}
+
+# Mots outils qui ne servent pas de point d'entrée dans un nom (« en », « de »...)
+MOTS_VIDES = {"a", "au", "aux", "d", "de", "des", "du", "en", "et", "l", "la", "le", "les", "ou", "pour"}
+
+# Début d'un mot à l'intérieur d'un nom (après une espace, un tiret, une apostrophe...)
+DEBUT_MOT = re.compile(r"(?<![^\W_])([^\W_]+)")
+
+# Rang du niveau de demande sur le marché (le plus demandé d'abord)
+RANG_DEMANDE = {"Très élevé": 0, "Élevé": 1, "Moyen": 2, "Faible": 3}
+
+
+class IndexAutocompletion:
+    """Libellés de carrières, retrouvés par préfixe du nom ou de l'un de ses mots.
+
+    Les clés (nom normalisé et chacun de ses suffixes commençant à un mot, plus les
+    synonymes) sont rangées dans un tableau trié : les clés commençant par la saisie
+    forment un intervalle trouvé par dichotomie. Dans un petit intervalle, les libellés
+    sont classés directement ; dans un grand, les clés sont parcourues par rang jusqu'à
+    en avoir assez : le coût reste de l'ordre de la racine du nombre de clés.
+    """
+
+    def __init__(self, libelles: Iterable[Tuple[str, str]], synonymes: Optional[Dict[str, str]] = None,
+                 insensible_accents: bool = True):
+        """libelles : couples (libellé, niveau de demande) ; synonymes : appellation -> libellé"""
+        self.insensible_accents = insensible_accents
+        self.libelles: List[str] = []
+        self._cles_libelles: List[str] = []
+        self._demandes: List[int] = []
+        positions: Dict[str, int] = {}
+        for libelle, niveau_demande in libelles:
+            libelle = libelle.strip()
+            cle = self.normaliser(libelle)
+            if not cle:
+                continue
+            position = positions.get(cle)
+            if position is None:
+                positions[cle] = len(self.libelles)
+                self.libelles.append(libelle)
+                self._cles_libelles.append(cle)
+                self._demandes.append(RANG_DEMANDE.get(niveau_demande, len(RANG_DEMANDE)))
+            else:
+                # Même carrière citée par plusieurs sources : le niveau de demande connu l'emporte
+                self._demandes[position] = min(self._demandes[position],
+                                               RANG_DEMANDE.get(niveau_demande, len(RANG_DEMANDE)))
+
+        # (clé, libellé, clé interne au nom ou synonyme) : le nom, puis chaque suffixe commençant à un mot
+        cles = []
+        for position, cle in enumerate(self._cles_libelles):
+            cles.append((cle, position, False))
+            for mot in DEBUT_MOT.finditer(cle, 1):
+                if mot.group(1) not in MOTS_VIDES:
+                    cles.append((cle[mot.start():], position, True))
+        for appellation, libelle in (synonymes or {}).items():
+            position = positions.get(self.normaliser(libelle))
+            if position is not None:
+                cles.append((self.normaliser(appellation), position, True))
+        cles = sorted(set(cles))
+
+        self._cles = [cle for cle, _, _ in cles]
+        self._positions = [position for _, position, _ in cles]
+        self._internes = [interne for _, _, interne in cles]
+        self.popularite: Dict[str, int] = {}
+        self.popularite_du: Optional[float] = None
+        self._classer()
+
+    def normaliser(self, texte: str) -> str:
+        """Clé de recherche : minuscules (et sans accents en mode insensible aux accents)"""
+        texte = " ".join(texte.split())
+        return normaliser_texte(texte) if self.insensible_accents else texte.lower()
+
+    def _classer(self) -> None:
+        """Rang des libellés (popularité, niveau de demande, longueur) et ordre de parcours des clés"""
+        ordre = sorted(
+            range(len(self.libelles)),
+            key=lambda p: (-self.popularite.get(self._cles_libelles[p], 0), self._demandes[p],
+                           len(self.libelles[p]), self.libelles[p])
+        )
+        rangs = [0] * len(self.libelles)
+        for rang, position in enumerate(ordre):
+            rangs[position] = rang
+        par_rang = sorted(range(len(self._cles)), key=lambda i: (rangs[self._positions[i]], self._internes[i]))
+        # Remplacement d'un bloc : les recherches en cours gardent l'ancien classement
+        self._classement = (rangs, par_rang)
+
+    def ajuster_popularite(self, demandes: Dict[str, int]) -> None:
+        """Reclasse selon le nombre de demandes par carrière saisie (journal des demandes)"""
+        popularite: Dict[str, int] = {}
+        for carriere, nombre in demandes.items():
+            cle = self.normaliser(carriere)
+            popularite[cle] = popularite.get(cle, 0) + nombre
+        self.popularite = popularite
+        self.popularite_du = time.time()
+        self._classer()
+
+    def completer(self, saisie: str, limite: int = 8) -> List[str]:
+        """Libellés dont le nom, l'un de ses mots ou un synonyme commence par la saisie, les mieux classés d'abord"""
+        prefixe = self.normaliser(saisie)
+        if not prefixe or limite <= 0:
+            return []
+        debut = bisect_left(self._cles, prefixe)
+        # Fin de l'intervalle : première clé qui ne commence plus par le préfixe
+        fin = bisect_left(self._cles, prefixe + "\U0010ffff", debut)
+        if debut == fin:
+            return []
+
+        rangs, par_rang = self._classement
+        if (fin - debut) ** 2 <= len(self._cles) * limite // 4:
+            retenues = sorted({rangs[self._positions[i]]: self._positions[i] for i in range(debut, fin)}.items())
+            return [self.libelles[position] for _, position in retenues[:limite]]
+
+        trouves: List[int] = []
+        for i in par_rang:
+            if debut <= i < fin and self._positions[i] not in trouves:
+                trouves.append(self._positions[i])
+                if len(trouves) == limite:
+                    break
+        return [self.libelles[position] for position in trouves]
+
+    def __len__(self) -> int:
+        return len(self.libelles)
@@ -0,0 +1,100 @@
+"""
+Module fournissant un automate d'Aho–Corasick pour rechercher de nombreux motifs en une seule passe
+"""
+
+import unicodedata
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+def normaliser_texte(texte: str) -> str:
+    """Met en minuscules et retire les accents (recherche insensible aux accents)"""
+    decompose = unicodedata.normalize("NFD", texte.lower())
+    return "".join(c for c in decompose if not unicodedata.combining(c))
+
+
+class AutomateMotifs:
+    """Automate d'Aho–Corasick : chaque motif est associé à une ou plusieurs valeurs"""
+
+    def __init__(self):
+        """Initialise un automate vide (état 0 = racine)"""
+        self._transitions: List[Dict[str, int]] = [{}]
+        self._echecs: List[int] = [0]
+        self._sorties: List[List[Tuple[int, Any, bool]]] = [[]]
+        self._compile = False
+        self.nb_motifs = 0
+
+    def ajouter(self, motif: str, valeur: Any, mots_entiers: bool = False) -> None:
+        """Ajoute un motif ; avec mots_entiers, il ne correspond qu'à des mots complets"""
+        motif_normalise = normaliser_texte(motif).strip()
+        if not motif_normalise:
+            return
+
+        etat = 0
+        for caractere in motif_normalise:
+            suivant = self._transitions[etat].get(caractere)
+            if suivant is None:
+                suivant = len(self._transitions)
+                self._transitions.append({})
+                self._echecs.append(0)
+                self._sorties.append([])
+                self._transitions[etat][caractere] = suivant
+            etat = suivant
+
+        self._sorties[etat].append((len(motif_normalise), valeur, mots_entiers))
+        self.nb_motifs += 1
+        self._compile = False
+
+    def ajouter_tous(self, motifs: Iterable[Tuple[str, Any]], mots_entiers: bool = False) -> None:
+        """Ajoute plusieurs couples (motif, valeur)"""
+        for motif, valeur in motifs:
+            self.ajouter(motif, valeur, mots_entiers)
+
+    def compiler(self) -> None:
+        """Calcule les liens d'échec (parcours en largeur) et fusionne les sorties"""
+        file = list(self._transitions[0].values())
+        for etat in file:
+            self._echecs[etat] = 0
+
+        position = 0
+        while position < len(file):
+            etat = file[position]
+            position += 1
+            for caractere, suivant in self._transitions[etat].items():
+                file.append(suivant)
+                echec = self._echecs[etat]
+                while echec and caractere not in self._transitions[echec]:
+                    echec = self._echecs[echec]
+                cible = self._transitions[echec].get(caractere, 0)
+                self._echecs[suivant] = cible if cible != suivant else 0
+                self._sorties[suivant] = self._sorties[suivant] + self._sorties[self._echecs[suivant]]
+
+        self._compile = True
+
+    def rechercher(self, texte: str) -> List[Tuple[int, int, Any]]:
+        """Retourne toutes les occurrences (début, fin, valeur) dans le texte normalisé"""
+        if not self._compile:
+            self.compiler()
+
+        texte_normalise = normaliser_texte(texte)
+        occurrences = []
+        etat = 0
+
+        for fin, caractere in enumerate(texte_normalise, 1):
+            while etat and caractere not in self._transitions[etat]:
+                etat = self._echecs[etat]
+            etat = self._transitions[etat].get(caractere, 0)
+
+            for longueur, valeur, mots_entiers in self._sorties[etat]:
+                debut = fin - longueur
+                if mots_entiers and not (
+                    (debut == 0 or not texte_normalise[debut - 1].isalnum()) and
+                    (fin == len(texte_normalise) or not texte_normalise[fin].isalnum())
+                ):
+                    continue
+                occurrences.append((debut, fin, valeur))
+
+        return occurrences
+
+    def valeurs(self, texte: str) -> List[Any]:
+        """Valeurs distinctes trouvées dans le texte, dans l'ordre d'apparition"""
+        return list(dict.fromkeys(valeur for _, _, valeur in self.rechercher(texte)))
@@ -0,0 +1,333 @@
+"""
+Module de banc d'essai : bases synthétiques à l'échelle, temps et mémoire de la base et du moteur, en JSON
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from base_synthetique import ECHELLES_STANDARD, GRAINE_PAR_DEFAUT, ecrire_base
+from llm_interface import LLMInterface
+
+try:
+    import resource
+except ImportError:
+    # Pic mémoire non mesuré (Windows)
+    resource = None
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+
+# Bases générées, réutilisées d'une exécution à l'autre (même graine, même échelle : même base)
+DOSSIER_BASES = os.path.join(DOSSIER, ".cache", "bancs")
+
+# Version du format des résultats : à incrémenter à chaque changement de structure
+VERSION_RESULTATS = 1
+
+# Mesure d'une opération : au moins APPELS_MIN appels, puis jusqu'à DUREE_MESURE secondes ou APPELS_MAX appels
+DUREE_MESURE = 1.0
+APPELS_MIN = 3
+APPELS_MAX = 2000
+
+# Mesure d'une opération interrompue au-delà de ce délai et notée hors délai (comportements quadratiques)
+DELAI_OPERATION_MAX = 60.0
+
+# Requêtes tirées dans la base pour chaque échelle (noms exacts, partiels et inconnus)
+NB_REQUETES = 20
+
+SERIES = ["A1", "A2", "B", "C", "D", "E", "F1", "G2"]
+
+METIERS_INCONNUS = ["Astronaute", "Pilote de drone", "Sommelier", "Océanographe", "Luthier"]
+
+# Ralentissement p50 au-delà duquel --comparer signale une régression
+TOLERANCE_REGRESSION = 1.25
+
+REPONSE_IA_SIMULEE = "**🎯 Évaluation de votre choix**\n\nAnalyse simulée pour le banc d'essai."
+
+
+class InterfaceIASimulee(LLMInterface):
+    """Interface IA sans réseau ni état partagé : prompt et requête construits, réponse fixe"""
+
+    def __init__(self):
+        # Ni secrets, ni cache, ni limiteur : seules les étapes locales de l'analyse sont mesurées
+        self.api_key = "simulee"
+        self.model = "simulee"
+        self.cache = None
+        self.default_config = {"temperature": 0.7, "max_tokens": 2000, "top_p": 0.9}
+
+    def _appeler_api(self, prompt: str, config_custom: Optional[Dict] = None, **options) -> str:
+        self._construire_requete(prompt, config_custom)
+        return REPONSE_IA_SIMULEE
+
+
+class DelaiDepasse(Exception):
+    """Mesure interrompue après DELAI_OPERATION_MAX secondes"""
+
+
+@contextmanager
+def _delai_maximal(delai: float):
+    """Interrompt le bloc après delai secondes (sans effet hors Unix)"""
+    if not hasattr(signal, "setitimer"):
+        yield
+        return
+
+    def interrompre(signum, frame):
+        raise DelaiDepasse()
+
+    precedent = signal.signal(signal.SIGALRM, interrompre)
+    signal.setitimer(signal.ITIMER_REAL, delai)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, precedent)
+
+
+def chronometrer(appel: Callable[[Any], Any], requetes: List[Any], duree: float = DUREE_MESURE,
+                 delai: float = DELAI_OPERATION_MAX) -> Dict[str, Any]:
+    """Durées d'un appel répété sur les requêtes (en boucle) : moyenne, p50, p95 et maximum en ms.
+
+    Au-delà de delai secondes, la mesure est interrompue. Si moins d'APPELS_MIN appels sont terminés,
+    l'appel en cours compte pour sa durée écoulée (minorant) et l'opération est marquée hors délai.
+    """
+    durees = []
+    commences = 0
+    hors_delai = False
+    debut_mesure = time.perf_counter()
+    try:
+        with _delai_maximal(delai):
+            while True:
+                requete = requetes[commences % len(requetes)]
+                debut = time.perf_counter()
+                commences += 1
+                appel(requete)
+                durees.append(time.perf_counter() - debut)
+                ecoule = time.perf_counter() - debut_mesure
+                if len(durees) >= APPELS_MAX or (ecoule >= duree and len(durees) >= APPELS_MIN):
+                    break
+    except DelaiDepasse:
+        # Assez d'appels terminés : la mesure s'arrête simplement là, l'appel interrompu est ignoré
+        if len(durees) < APPELS_MIN:
+            hors_delai = True
+            if len(durees) < commences:
+                durees.append(time.perf_counter() - debut)
+    durees.sort()
+    return {
+        "appels": len(durees),
+        "moyenne_ms": round(sum(durees) / len(durees) * 1000, 3),
+        "p50_ms": round(durees[len(durees) // 2] * 1000, 3),
+        "p95_ms": round(durees[min(len(durees) - 1, int(len(durees) * 0.95))] * 1000, 3),
+        "max_ms": round(durees[-1] * 1000, 3),
+        "hors_delai": hors_delai
+    }
+
+
+def _memoire_max_mo() -> Optional[float]:
+    """Pic de mémoire résidente du processus (Mo)"""
+    if resource is None:
+        return None
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pic / (1024 * 1024) if sys.platform == "darwin" else pic / 1024
+
+
+def tirer_requetes(kb_loader, graine: int) -> Dict[str, List]:
+    """Noms de métiers (exacts, partiels, inconnus) et profils d'élèves tirés dans la base"""
+    alea = random.Random(graine)
+    metiers = [metier.nom_metier for metier in kb_loader.knowledge_base.metiers]
+    exacts = alea.sample(metiers, min(len(metiers), NB_REQUETES * 3 // 5))
+    # Début du nom en minuscules : trouvé par la recherche partielle
+    partiels = [nom.split()[0].lower() for nom in alea.sample(metiers, min(len(metiers), NB_REQUETES // 5))]
+    noms = exacts + partiels + METIERS_INCONNUS[:NB_REQUETES - len(exacts) - len(partiels)]
+    alea.shuffle(noms)
+    profils = [
+        {"statut": "Élève (Futur Bachelier)", "serie_bac": alea.choice(SERIES), "filiere_actuelle": None,
+         "carriere_envisagee": nom, "notes": {}}
+        for nom in exacts + METIERS_INCONNUS[:2]
+    ]
+    return {"noms": noms, "profils": profils}
+
+
+def mesurer_base(chemin: str, graine: int = GRAINE_PAR_DEFAUT, duree: float = DUREE_MESURE,
+                 delai: float = DELAI_OPERATION_MAX) -> Dict[str, Any]:
+    """Chargement, pic mémoire et opérations de la base et du moteur (à exécuter dans un processus neuf)"""
+    from knowledge_base_loader import KnowledgeBaseLoader
+    from recommendation_logic_student import RecommendationEngine
+
+    memoire_avant = _memoire_max_mo()
+    debut = time.perf_counter()
+    kb_loader = KnowledgeBaseLoader(chemin)
+    chargement = time.perf_counter() - debut
+    memoire_apres = _memoire_max_mo()
+
+    # Construction du moteur (classificateur, optimiseur, graphe des parcours) bornée comme une opération
+    debut = time.perf_counter()
+    try:
+        with _delai_maximal(delai):
+            moteur = RecommendationEngine(kb_loader)
+    except DelaiDepasse:
+        moteur = None
+    construction_moteur = time.perf_counter() - debut
+
+    requetes = tirer_requetes(kb_loader, graine)
+    noms, profils = requetes["noms"], requetes["profils"]
+    interface_ia = InterfaceIASimulee()
+
+    def analyse_complete(profil: Dict) -> str:
+        return interface_ia.analyser_profil(profil, moteur.generer_recommandations(profil))
+
+    operations_moteur = {
+        "generer_recommandations": (moteur.generer_recommandations, profils),
+        "analyse_complete_ia_simulee": (analyse_complete, profils)
+    } if moteur else {}
+    operations = {
+        "rechercher_metier": (kb_loader.rechercher_metier, noms),
+        "rechercher_universites_pour_metier": (
+            lambda profil: kb_loader.rechercher_universites_pour_metier(profil["carriere_envisagee"],
+                                                                         profil["serie_bac"]),
+            profils
+        ),
+        "get_metiers_alternatifs": (kb_loader.get_metiers_alternatifs, noms),
+        "valider_base_connaissances": (lambda _: kb_loader.valider_base_connaissances(), [None]),
+        **operations_moteur
+    }
+
+    return {
+        "version_kb": kb_loader.version_contenu,
+        "effectifs": kb_loader.get_statistics(),
+        "fichier_octets": os.path.getsize(chemin),
+        "chargement_s": round(chargement, 3),
+        # Moteur non construit dans le délai : ses opérations ne sont pas mesurées (durée minorée)
+        "construction_moteur_s": round(construction_moteur, 3),
+        "construction_moteur_hors_delai": moteur is None,
+        "memoire_chargement_mo": (round(memoire_apres - memoire_avant, 1)
+                                  if memoire_avant is not None else None),
+        "memoire_pic_mo": round(_memoire_max_mo(), 1) if resource else None,
+        "operations": {
+            nom: chronometrer(appel, arguments, duree, delai) for nom, (appel, arguments) in operations.items()
+        }
+    }
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DOSSIER, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executer(echelles: List[int], graine: int = GRAINE_PAR_DEFAUT, duree: float = DUREE_MESURE,
+             delai: float = DELAI_OPERATION_MAX, dossier_bases: str = DOSSIER_BASES) -> Dict[str, Any]:
+    """Génère (ou reprend) la base de chaque échelle et la mesure dans un processus neuf"""
+    resultats = []
+    for echelle in echelles:
+        chemin = os.path.join(dossier_bases, f"kb_x{echelle}_g{graine}.json")
+        if not os.path.exists(chemin):
+            ecrire_base(echelle, chemin, graine)
+        # Processus neuf : chargement à froid et pic mémoire propres à cette échelle
+        sortie = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--base", chemin, "--graine", str(graine),
+             "--duree", str(duree), "--delai", str(delai)],
+            cwd=DOSSIER, capture_output=True, text=True
+        )
+        if sortie.returncode != 0:
+            raise RuntimeError(f"Échelle {echelle} : {sortie.stderr.strip().splitlines()[-1]}")
+        resultats.append({"echelle": echelle, **json.loads(sortie.stdout.strip().splitlines()[-1])})
+
+    return {
+        "version_resultats": VERSION_RESULTATS,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "plateforme": platform.platform(),
+        "processeurs": os.cpu_count(),
+        "graine": graine,
+        "resultats": resultats
+    }
+
+
+def comparer(reference: Dict[str, Any], actuel: Dict[str, Any],
+             tolerance: float = TOLERANCE_REGRESSION) -> List[str]:
+    """Mesures (chargement, moteur, p50 des opérations) plus lentes que la référence au-delà de la tolérance"""
+    regressions = []
+    precedents = {resultat["echelle"]: resultat for resultat in reference.get("resultats", [])}
+    for resultat in actuel["resultats"]:
+        precedent = precedents.get(resultat["echelle"])
+        if precedent is None:
+            continue
+        mesures = [("chargement", precedent["chargement_s"] * 1000, resultat["chargement_s"] * 1000),
+                   ("construction du moteur", precedent["construction_moteur_s"] * 1000,
+                    resultat["construction_moteur_s"] * 1000)]
+        mesures += [
+            (nom, precedent["operations"][nom]["p50_ms"], mesure["p50_ms"])
+            for nom, mesure in resultat["operations"].items() if nom in precedent["operations"]
+        ]
+        for nom, avant, apres in mesures:
+            if avant > 0 and apres > avant * tolerance:
+                regressions.append(f"x{resultat['echelle']} {nom} : {avant:.3f} ms -> {apres:.3f} ms "
+                                   f"({apres / avant:.2f}x)")
+    return regressions
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Mesure les échelles demandées, écrit le JSON ; code de sortie 1 si une régression est détectée"""
+    analyseur = argparse.ArgumentParser(description="Banc d'essai de la base et du moteur de recommandation")
+    analyseur.add_argument("--echelles", type=int, nargs="+", default=[1, *ECHELLES_STANDARD])
+    analyseur.add_argument("--graine", type=int, default=GRAINE_PAR_DEFAUT)
+    analyseur.add_argument("--duree", type=float, default=DUREE_MESURE, help="secondes de mesure par opération")
+    analyseur.add_argument("--delai", type=float, default=DELAI_OPERATION_MAX,
+                           help="secondes au-delà desquelles la mesure d'une opération est interrompue")
+    analyseur.add_argument("--sortie", default=None, help="fichier JSON des résultats (sinon sortie standard)")
+    analyseur.add_argument("--comparer", default=None, help="résultats d'une version précédente")
+    analyseur.add_argument("--tolerance", type=float, default=TOLERANCE_REGRESSION)
+    analyseur.add_argument("--base", help=argparse.SUPPRESS)
+    options = analyseur.parse_args(arguments)
+
+    if options.base:
+        print(json.dumps(mesurer_base(options.base, options.graine, options.duree, options.delai), ensure_ascii=False))
+        return
+
+    resultats = executer(options.echelles, options.graine, options.duree, options.delai)
+    texte = json.dumps(resultats, ensure_ascii=False, indent=2)
+    if options.sortie:
+        with open(options.sortie, "w", encoding="utf-8") as fichier:
+            fichier.write(texte + "\n")
+    else:
+        print(texte)
+
+    operations = list(resultats["resultats"][0]["operations"]) if resultats["resultats"] else []
+    print(f"{'p50 (ms)':<36}" + "".join(f"{'x' + str(r['echelle']):>12}" for r in resultats["resultats"]),
+          file=sys.stderr)
+    # « > » : mesure interrompue après --delai secondes, la durée réelle est plus longue ; « - » : non mesurée
+    lignes = [
+        ("chargement", [f"{r['chargement_s'] * 1000:.1f}" for r in resultats["resultats"]]),
+        ("construction du moteur", [(">" if r["construction_moteur_hors_delai"] else "")
+                                    + f"{r['construction_moteur_s'] * 1000:.1f}" for r in resultats["resultats"]]),
+        ("mémoire au chargement (Mo)", [f"{r['memoire_chargement_mo']}" for r in resultats["resultats"]])
+    ]
+    lignes += [(nom, [
+        (">" if r["operations"][nom]["hors_delai"] else "") + f"{r['operations'][nom]['p50_ms']:.3f}"
+        if nom in r["operations"] else "-"
+        for r in resultats["resultats"]
+    ]) for nom in operations]
+    for nom, valeurs in lignes:
+        print(f"{nom:<36}" + "".join(f"{valeur:>12}" for valeur in valeurs), file=sys.stderr)
+
+    if options.comparer:
+        with open(options.comparer, encoding="utf-8") as fichier:
+            regressions = comparer(json.load(fichier), resultats, options.tolerance)
+        for regression in regressions:
+            print(f"Régression : {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
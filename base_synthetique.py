@@ -0,0 +1,205 @@
+"""
+Module de génération de bases de connaissances synthétiques à l'échelle (schéma de knowledge_base_benin_v2.json)
+"""
+
+import argparse
+import json
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+FICHIER_REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge_base_benin_v2.json")
+
+# Échelles suivies par le banc d'essai (multiples de la base de référence)
+ECHELLES_STANDARD = (10, 100, 1000)
+
+GRAINE_PAR_DEFAUT = 2024
+
+# Déclinaisons d'un métier pour les copies de la base (spécialité, contexte d'exercice)
+DECLINAISONS_METIERS = [
+    "spécialisé", "en milieu rural", "principal", "junior", "territorial", "hospitalier", "industriel",
+    "international", "de projet", "numérique", "en entreprise", "indépendant", "en ONG", "agricole",
+    "de l'administration publique", "en zone portuaire", "urbain", "régional", "senior", "certifié"
+]
+
+VILLES = [
+    "Cotonou", "Porto-Novo", "Parakou", "Abomey-Calavi", "Bohicon", "Abomey", "Natitingou", "Djougou",
+    "Lokossa", "Ouidah", "Kandi", "Savalou", "Pobè", "Dassa-Zoumè", "Malanville", "Aplahoué", "Comè", "Allada"
+]
+
+PREFIXES_ETABLISSEMENTS = ["Université", "Institut Universitaire", "École Supérieure", "Institut Supérieur"]
+
+# Part des filières d'une université de référence reprises dans chaque copie, et filières ajoutées
+PART_FILIERES_CONSERVEES = 0.8
+FILIERES_AJOUTEES_MAX = 2
+
+# Part des universités privées parmi les copies (la référence n'en compte qu'une)
+PART_PRIVEES = 0.4
+
+# Métiers clés d'un secteur : ceux de la référence puis des déclinaisons, au plus ce multiple
+MULTIPLE_METIERS_CLES = 4
+
+
+def decliner(nom: str, copie: int) -> str:
+    """Nom de la copie numéro copie d'un métier (la copie 0 garde le nom de la référence)"""
+    if copie == 0:
+        return nom
+    rang, tour = (copie - 1) % len(DECLINAISONS_METIERS), (copie - 1) // len(DECLINAISONS_METIERS)
+    return f"{nom} {DECLINAISONS_METIERS[rang]}" + (f" {tour + 1}" if tour else "")
+
+
+def _metiers(reference: Dict, echelle: int, alea: random.Random) -> List[Dict]:
+    """Métiers déclinés : même secteur, compétences tirées parmi celles du secteur, demande variée"""
+    competences_par_secteur: Dict[str, List[str]] = {}
+    for metier in reference["metiers"]:
+        competences = competences_par_secteur.setdefault(metier["secteur_activite"], [])
+        for competence in metier.get("competences_requises_techniques", []):
+            if competence not in competences:
+                competences.append(competence)
+    niveaux = [metier.get("niveau_demande_marche", "") for metier in reference["metiers"]]
+
+    metiers = []
+    for copie in range(echelle):
+        for metier in reference["metiers"]:
+            if copie == 0:
+                metiers.append(metier)
+                continue
+            competences = competences_par_secteur[metier["secteur_activite"]]
+            techniques = metier.get("competences_requises_techniques", [])
+            metiers.append({
+                **metier,
+                "nom_metier": decliner(metier["nom_metier"], copie),
+                "description": f"{metier['description']} "
+                               f"({DECLINAISONS_METIERS[(copie - 1) % len(DECLINAISONS_METIERS)]})",
+                "competences_requises_techniques": alea.sample(competences, min(len(competences), len(techniques)))
+                                                   if techniques else [],
+                "niveau_demande_marche": alea.choice(niveaux)
+            })
+    return metiers
+
+
+def _viser(metiers_vises: List[str], noms_reference: set, echelle: int, alea: random.Random) -> List[str]:
+    """Métiers visés d'une filière copiée : métiers de la base remplacés par une déclinaison au hasard"""
+    return [
+        decliner(metier, alea.randrange(echelle)) if metier in noms_reference else metier
+        for metier in metiers_vises
+    ]
+
+
+def _universites(reference: Dict, echelle: int, alea: random.Random) -> List[Dict]:
+    """Établissements copiés : filières reprises en partie, complétées par d'autres, métiers visés déclinés"""
+    noms_reference = {metier["nom_metier"] for metier in reference["metiers"]}
+    toutes_filieres = [
+        filiere for universite in reference["universites"]
+        for faculte in universite["facultes_ecoles"] for filiere in faculte["filieres"]
+    ]
+
+    universites = []
+    for copie in range(echelle):
+        for universite in reference["universites"]:
+            if copie == 0:
+                universites.append(universite)
+                continue
+            ville = alea.choice(VILLES)
+            sigle = f"{universite.get('sigle') or 'ES'}{copie}"
+            facultes = []
+            for faculte in universite["facultes_ecoles"]:
+                filieres = [filiere for filiere in faculte["filieres"] if alea.random() < PART_FILIERES_CONSERVEES]
+                filieres += alea.sample(toutes_filieres, alea.randint(0, FILIERES_AJOUTEES_MAX))
+                noms = set()
+                copiees = []
+                for filiere in filieres:
+                    # Noms de filière uniques dans une faculté (identifiants des résultats compacts)
+                    if filiere["nom_filiere"] in noms:
+                        continue
+                    noms.add(filiere["nom_filiere"])
+                    copiees.append({
+                        **filiere,
+                        "metiers_vises_typiques": _viser(filiere.get("metiers_vises_typiques", []),
+                                                         noms_reference, echelle, alea)
+                    })
+                if copiees:
+                    facultes.append({**faculte, "filieres": copiees})
+            universites.append({
+                **universite,
+                "nom_universite": f"{alea.choice(PREFIXES_ETABLISSEMENTS)} {sigle} de {ville}",
+                "sigle": sigle,
+                "statut": "Privé Agréé" if alea.random() < PART_PRIVEES else "Public",
+                "localisation": ville,
+                "site_web": f"https://www.{sigle.lower()}.bj",
+                "facultes_ecoles": facultes
+            })
+    return universites
+
+
+def generer_base(echelle: int, graine: int = GRAINE_PAR_DEFAUT, reference: Optional[Dict] = None) -> Dict[str, Any]:
+    """Base au schéma de la référence, echelle fois plus de métiers, universités, filières et formations.
+
+    Même graine et même échelle : même base. L'échelle 1 redonne la référence.
+    """
+    if reference is None:
+        with open(FICHIER_REFERENCE, encoding="utf-8") as fichier:
+            reference = json.load(fichier)
+    alea = random.Random(graine)
+
+    metiers = _metiers(reference, echelle, alea)
+    secteurs = []
+    for secteur in reference.get("secteurs_porteurs", []):
+        declinaisons = [decliner(metier, copie) for copie in range(1, echelle) for metier in secteur["metiers_cles"]]
+        supplementaires = min(len(declinaisons), (MULTIPLE_METIERS_CLES - 1) * len(secteur["metiers_cles"]))
+        secteurs.append({**secteur,
+                         "metiers_cles": secteur["metiers_cles"] + alea.sample(declinaisons, supplementaires)})
+
+    formations = [
+        formation if copie == 0 else {
+            **formation,
+            "nom_formation_generale": f"{formation['nom_formation_generale']} - parcours {copie}",
+            "metiers_prepares": [decliner(metier, copie) for metier in formation.get("metiers_prepares", [])]
+        }
+        for copie in range(echelle) for formation in reference.get("formations_generales", [])
+    ]
+
+    return {
+        **reference,
+        "version": (f"{reference.get('version', '')}-x{echelle}-g{graine}" if echelle > 1
+                    else reference.get("version", "")),
+        "metiers": metiers,
+        "secteurs_porteurs": secteurs,
+        "formations_generales": formations,
+        "universites": _universites(reference, echelle, alea)
+    }
+
+
+def ecrire_base(echelle: int, chemin: str, graine: int = GRAINE_PAR_DEFAUT) -> Dict[str, int]:
+    """Écrit la base générée et retourne ses effectifs"""
+    base = generer_base(echelle, graine)
+    dossier = os.path.dirname(chemin)
+    if dossier:
+        os.makedirs(dossier, exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as fichier:
+        json.dump(base, fichier, ensure_ascii=False)
+    return {
+        "metiers": len(base["metiers"]),
+        "universites": len(base["universites"]),
+        "filieres": sum(len(faculte["filieres"]) for universite in base["universites"]
+                        for faculte in universite["facultes_ecoles"]),
+        "formations": len(base["formations_generales"]),
+        "octets": os.path.getsize(chemin)
+    }
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Génère une base synthétique (à utiliser avec KnowledgeBaseLoader(chemin))"""
+    analyseur = argparse.ArgumentParser(description="Base de connaissances synthétique à l'échelle")
+    analyseur.add_argument("--echelle", type=int, default=10, help="multiple de la base de référence")
+    analyseur.add_argument("--graine", type=int, default=GRAINE_PAR_DEFAUT)
+    analyseur.add_argument("--sortie", default=None, help="fichier produit (par défaut kb_x<echelle>.json)")
+    options = analyseur.parse_args(arguments)
+
+    chemin = options.sortie or f"kb_x{options.echelle}.json"
+    effectifs = ecrire_base(options.echelle, chemin, options.graine)
+    print(f"{chemin} : " + ", ".join(f"{nombre} {nom}" for nom, nombre in effectifs.items()))
+
+
+if __name__ == "__main__":
+    main()
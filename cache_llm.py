@@ -0,0 +1,259 @@
+"""
+Module de cache des réponses du LLM : LRU en mémoire + stockage SQLite partagé entre processus
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Valeurs par défaut, surchargeables dans la section [cache] de .streamlit/secrets.toml
+CONFIG_CACHE_PAR_DEFAUT = {
+    "chemin": os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "reponses_llm.sqlite3"),
+    "taille_memoire": 256,
+    "taille_disque": 20000,
+    "ttl_heures": 24 * 7
+}
+
+# Paramètres de génération qui influencent la réponse (et font donc partie de la clé)
+PARAMETRES_CLE = ("temperature", "max_tokens", "top_p")
+
+
+def cle_cache(modele: str, config: Dict[str, Any], messages: List[Dict[str, str]]) -> str:
+    """Empreinte du modèle, de la configuration et des messages normalisés.
+
+    Seuls les messages envoyés à l'API entrent dans la clé : les données personnelles
+    du profil (nom, prénom) n'y figurent jamais.
+    """
+    messages_normalises = [
+        {"role": message["role"], "content": re.sub(r"\s+", " ", message["content"]).strip()}
+        for message in messages
+    ]
+    contenu = json.dumps(
+        {
+            "modele": modele,
+            "config": {parametre: config.get(parametre) for parametre in PARAMETRES_CLE},
+            "messages": messages_normalises
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(contenu.encode("utf-8")).hexdigest()
+
+
+class CacheReponsesLLM:
+    """Cache à deux niveaux avec durée de vie, éviction bornée et invalidation par version de la base"""
+
+    def __init__(self, chemin: str, version_kb: str, taille_memoire: int = 256, taille_disque: int = 20000,
+                 ttl_heures: float = 24 * 7):
+        """Ouvre (ou crée) le stockage disque ; seules les réponses de version_kb sont lues"""
+        self.chemin = chemin
+        self.taille_memoire = taille_memoire
+        self.taille_disque = taille_disque
+        self.ttl = ttl_heures * 3600
+        self.version_kb = version_kb
+
+        self._memoire: "OrderedDict[str, tuple]" = OrderedDict()
+        self._verrou = threading.Lock()
+        self._local = threading.local()
+        self._compteurs = {"succes_memoire": 0, "succes_disque": 0, "echecs": 0, "ecritures": 0, "evictions": 0}
+
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+        connexion = self._connexion()
+        # Une ligne par requête et par version : les workers de versions différentes ne s'écrasent pas
+        connexion.execute(
+            "CREATE TABLE IF NOT EXISTS reponses_par_version ("
+            " cle TEXT NOT NULL, version_kb TEXT NOT NULL, reponse TEXT NOT NULL,"
+            " cree_le REAL NOT NULL, dernier_acces REAL NOT NULL, PRIMARY KEY (cle, version_kb))"
+        )
+        connexion.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reponses_dernier_acces ON reponses_par_version(dernier_acces)"
+        )
+        connexion.commit()
+
+    def _connexion(self) -> sqlite3.Connection:
+        """Connexion SQLite propre au thread courant (mode WAL pour les accès concurrents)"""
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin, timeout=10)
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.connexion = connexion
+        return connexion
+
+    def _compter(self, compteur: str, increment: int = 1) -> None:
+        with self._verrou:
+            self._compteurs[compteur] += increment
+
+    def lire(self, cle: str) -> Optional[str]:
+        """Retourne la réponse en cache (mémoire puis disque), ou None"""
+        maintenant = time.time()
+
+        with self._verrou:
+            entree = self._memoire.get(cle)
+            if entree and maintenant - entree[1] < self.ttl:
+                self._memoire.move_to_end(cle)
+                self._compteurs["succes_memoire"] += 1
+                return entree[0]
+            if entree:
+                del self._memoire[cle]
+
+        try:
+            connexion = self._connexion()
+            ligne = connexion.execute(
+                "SELECT reponse, cree_le FROM reponses_par_version WHERE cle = ? AND version_kb = ? AND cree_le > ?",
+                (cle, self.version_kb, maintenant - self.ttl)
+            ).fetchone()
+            if ligne:
+                connexion.execute(
+                    "UPDATE reponses_par_version SET dernier_acces = ? WHERE cle = ? AND version_kb = ?",
+                    (maintenant, cle, self.version_kb)
+                )
+                connexion.commit()
+        except sqlite3.Error:
+            ligne = None
+
+        if not ligne:
+            self._compter("echecs")
+            return None
+
+        self._compter("succes_disque")
+        self._mettre_en_memoire(cle, ligne[0], ligne[1])
+        return ligne[0]
+
+    def contient(self, cle: str) -> bool:
+        """Vrai si une réponse valide est en cache (sans modifier les compteurs ni l'ordre LRU)"""
+        maintenant = time.time()
+        with self._verrou:
+            entree = self._memoire.get(cle)
+            if entree and maintenant - entree[1] < self.ttl:
+                return True
+        try:
+            return self._connexion().execute(
+                "SELECT 1 FROM reponses_par_version WHERE cle = ? AND version_kb = ? AND cree_le > ?",
+                (cle, self.version_kb, maintenant - self.ttl)
+            ).fetchone() is not None
+        except sqlite3.Error:
+            return False
+
+    def precharger(self, nombre: int) -> int:
+        """Charge en mémoire les réponses du disque les plus récemment utilisées ; retourne leur nombre"""
+        try:
+            lignes = self._connexion().execute(
+                "SELECT cle, reponse, cree_le FROM reponses_par_version WHERE version_kb = ? AND cree_le > ?"
+                " ORDER BY dernier_acces DESC LIMIT ?",
+                (self.version_kb, time.time() - self.ttl, min(nombre, self.taille_memoire))
+            ).fetchall()
+        except sqlite3.Error:
+            return 0
+        # Insertion de la moins récente à la plus récente : l'ordre LRU reflète celui du disque
+        for cle, reponse, cree_le in reversed(lignes):
+            self._mettre_en_memoire(cle, reponse, cree_le)
+        return len(lignes)
+
+    def ecrire(self, cle: str, reponse: str) -> None:
+        """Enregistre une réponse dans les deux niveaux"""
+        maintenant = time.time()
+        self._mettre_en_memoire(cle, reponse, maintenant)
+
+        try:
+            connexion = self._connexion()
+            connexion.execute(
+                "INSERT OR REPLACE INTO reponses_par_version (cle, reponse, version_kb, cree_le, dernier_acces)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (cle, reponse, self.version_kb, maintenant, maintenant)
+            )
+            connexion.commit()
+        except sqlite3.Error:
+            return
+
+        self._compter("ecritures")
+        # Éviction amortie : contrôle de la taille toutes les 50 écritures
+        if self._compteurs["ecritures"] % 50 == 0:
+            self._evincer_disque()
+
+    def _mettre_en_memoire(self, cle: str, reponse: str, cree_le: float) -> None:
+        """Insère dans le LRU mémoire en évinçant l'entrée la moins récemment utilisée"""
+        with self._verrou:
+            self._memoire[cle] = (reponse, cree_le)
+            self._memoire.move_to_end(cle)
+            while len(self._memoire) > self.taille_memoire:
+                self._memoire.popitem(last=False)
+                self._compteurs["evictions"] += 1
+
+    def _evincer_disque(self) -> None:
+        """Supprime les entrées expirées puis les moins récemment utilisées au-delà de la taille maximale"""
+        try:
+            connexion = self._connexion()
+            connexion.execute("DELETE FROM reponses_par_version WHERE cree_le <= ?", (time.time() - self.ttl,))
+            curseur = connexion.execute(
+                "DELETE FROM reponses_par_version WHERE rowid IN ("
+                " SELECT rowid FROM reponses_par_version ORDER BY dernier_acces DESC LIMIT -1 OFFSET ?)",
+                (self.taille_disque,)
+            )
+            connexion.commit()
+            self._compter("evictions", max(0, curseur.rowcount))
+        except sqlite3.Error:
+            pass
+
+    def invalider_version(self, version_kb: str) -> None:
+        """Adopte une nouvelle version de la base : les réponses des autres versions ne sont plus lues.
+
+        Rien n'est supprimé : pendant un redémarrage progressif, les workers encore sur l'ancienne
+        version continuent de lire leurs réponses. Les entrées délaissées partent par expiration
+        (ttl_heures) ou par l'éviction LRU de _evincer_disque.
+        """
+        self.version_kb = version_kb
+        with self._verrou:
+            self._memoire.clear()
+
+    def vider(self) -> None:
+        """Vide entièrement le cache"""
+        with self._verrou:
+            self._memoire.clear()
+        connexion = self._connexion()
+        connexion.execute("DELETE FROM reponses_par_version")
+        connexion.commit()
+
+    def statistiques(self) -> Dict[str, Any]:
+        """Compteurs de succès/échecs et taux de succès"""
+        with self._verrou:
+            compteurs = dict(self._compteurs)
+            compteurs["entrees_memoire"] = len(self._memoire)
+
+        try:
+            compteurs["entrees_disque"] = self._connexion().execute(
+                "SELECT COUNT(*) FROM reponses_par_version"
+            ).fetchone()[0]
+        except sqlite3.Error:
+            compteurs["entrees_disque"] = None
+
+        lectures = compteurs["succes_memoire"] + compteurs["succes_disque"] + compteurs["echecs"]
+        compteurs["taux_succes"] = round(
+            (compteurs["succes_memoire"] + compteurs["succes_disque"]) / lectures, 3
+        ) if lectures else 0.0
+        compteurs["version_kb"] = self.version_kb
+        return compteurs
+
+
+_cache_partage: Optional[CacheReponsesLLM] = None
+_verrou_cache = threading.Lock()
+
+
+def obtenir_cache_llm(version_kb: str, **config) -> CacheReponsesLLM:
+    """Retourne le cache unique du processus ; un changement de version de la base l'invalide"""
+    global _cache_partage
+    with _verrou_cache:
+        if _cache_partage is None:
+            _cache_partage = CacheReponsesLLM(version_kb=version_kb, **{**CONFIG_CACHE_PAR_DEFAUT, **config})
+        elif _cache_partage.version_kb != version_kb:
+            _cache_partage.invalider_version(version_kb)
+    return _cache_partage
@@ -0,0 +1,132 @@
+"""
+Module de classification de texte libre (domaines, secteurs, métiers, filières) en une seule passe
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from knowledge_base_loader import KnowledgeBaseLoader
+from automate_motifs import AutomateMotifs
+
+# Mots-clés des domaines d'étude (par ordre de priorité)
+DOMAINES_MOTS_CLES = {
+    "médecine": "Santé", "pharmacie": "Santé", "infirmier": "Santé",
+    "informatique": "Technologies", "génie": "Ingénierie", "math": "Sciences",
+    "droit": "Juridique", "avocat": "Juridique",
+    "économie": "Économie", "gestion": "Gestion", "commerce": "Commerce",
+    "lettres": "Lettres", "langue": "Langues", "communication": "Communication"
+}
+
+# Règles de compatibilité simplifiées entre type de série et secteur d'activité
+COMPATIBILITES_SERIE_SECTEUR = {
+    "scientifique": ["santé", "sciences", "ingénierie", "technique", "médecine", "recherche"],
+    "littéraire": ["communication", "education", "langues", "culture", "média", "enseignement"],
+    "économique": ["économie", "banque", "finance", "administration", "gestion"],
+    "technique": ["technique", "ingénierie", "industrie", "construction", "technologie"],
+    "tertiaire": ["commerce", "service", "vente", "administration", "secrétariat"]
+}
+
+# Clé d'une filière du catalogue : (université, faculté/école, filière)
+CleFiliere = Tuple[str, str, str]
+
+
+class ClassificateurTexte:
+    """Automate unique compilé depuis le vocabulaire de la base et les tables de mots-clés"""
+
+    def __init__(self, knowledge_base_loader: KnowledgeBaseLoader):
+        """Compile l'automate à partir de la base de connaissances"""
+        self.kb_loader = knowledge_base_loader
+        self.automate = AutomateMotifs()
+        self.domaines_par_filiere: Dict[CleFiliere, str] = {}
+        # Types de série compatibles mémorisés par secteur d'activité (propres à cette instance)
+        self.types_serie_par_secteur: Dict[str, frozenset] = {}
+
+        for priorite, (mot_cle, domaine) in enumerate(DOMAINES_MOTS_CLES.items()):
+            self.automate.ajouter(mot_cle, ("domaine", (priorite, domaine)))
+
+        for type_serie, mots_cles in COMPATIBILITES_SERIE_SECTEUR.items():
+            for mot_cle in mots_cles:
+                self.automate.ajouter(mot_cle, ("type_serie", type_serie))
+
+        kb = self.kb_loader.knowledge_base
+        if kb:
+            secteurs_metiers = {m.nom_metier.lower(): m.secteur_activite for m in kb.metiers}
+
+            for secteur in kb.secteurs_porteurs:
+                self.automate.ajouter(secteur.nom_secteur, ("secteur", secteur.nom_secteur), mots_entiers=True)
+            for metier in kb.metiers:
+                self.automate.ajouter(metier.nom_metier, ("metier", metier.nom_metier), mots_entiers=True)
+
+            for universite in kb.universites:
+                for faculte in universite.facultes_ecoles:
+                    for filiere in faculte.filieres:
+                        cle = (universite.nom_universite, faculte.nom_faculte_ecole, filiere.nom_filiere)
+                        self.automate.ajouter(filiere.nom_filiere, ("filiere", cle), mots_entiers=True)
+
+                        # Domaine de la filière : secteur majoritaire des métiers visés connus
+                        secteurs = Counter(
+                            secteurs_metiers[m.lower()]
+                            for m in filiere.metiers_vises_typiques
+                            if m.lower() in secteurs_metiers
+                        )
+                        if secteurs:
+                            self.domaines_par_filiere[cle] = secteurs.most_common(1)[0][0]
+
+        self.automate.compiler()
+
+    def classer(self, texte: str) -> Dict[str, List]:
+        """Classe un texte libre en domaines, types de série, secteurs, métiers et filières"""
+        resultat = {"domaines": [], "types_serie": [], "secteurs": [], "metiers": [], "filieres": []}
+        if not texte:
+            return resultat
+
+        occurrences = self.automate.rechercher(texte)
+
+        domaines = sorted({valeur for _, _, (categorie, valeur) in occurrences if categorie == "domaine"})
+        resultat["domaines"] = [domaine for _, domaine in domaines]
+
+        # Pour les filières, seules les correspondances les plus longues sont retenues
+        longueur_max = max(
+            (fin - debut for debut, fin, (categorie, _) in occurrences if categorie == "filiere"),
+            default=0
+        )
+
+        for debut, fin, (categorie, valeur) in occurrences:
+            if categorie == "domaine":
+                continue
+            if categorie == "filiere" and fin - debut < longueur_max:
+                continue
+            cle = {"type_serie": "types_serie", "secteur": "secteurs",
+                   "metier": "metiers", "filiere": "filieres"}[categorie]
+            if valeur not in resultat[cle]:
+                resultat[cle].append(valeur)
+
+        return resultat
+
+    def filieres(self, texte: str) -> List[CleFiliere]:
+        """Filières du catalogue reconnues dans un texte libre"""
+        return self.classer(texte)["filieres"]
+
+    def domaine_filiere(self, filiere_actuelle: str) -> Optional[str]:
+        """Domaine d'une filière saisie librement (catalogue d'abord, mots-clés ensuite)"""
+        classement = self.classer(filiere_actuelle)
+
+        domaines_catalogue = Counter(
+            self.domaines_par_filiere[cle]
+            for cle in classement["filieres"]
+            if cle in self.domaines_par_filiere
+        )
+        if domaines_catalogue:
+            return domaines_catalogue.most_common(1)[0][0]
+
+        if classement["domaines"]:
+            return classement["domaines"][0]
+
+        return None
+
+    def types_serie_compatibles(self, secteur_activite: str) -> frozenset:
+        """Types de série compatibles avec un secteur d'activité (mémorisé par secteur)"""
+        types_serie = self.types_serie_par_secteur.get(secteur_activite)
+        if types_serie is None:
+            types_serie = frozenset(self.classer(secteur_activite)["types_serie"])
+            self.types_serie_par_secteur[secteur_activite] = types_serie
+        return types_serie
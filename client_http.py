@@ -0,0 +1,136 @@
+"""
+Module fournissant un client HTTP partagé par le processus (keep-alive, pool de connexions par hôte)
+"""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+from demarrage import module_differe
+
+# requests (et urllib3) importés à la création du pool, lors du premier appel à l'API
+requests = module_differe("requests")
+
+# Valeurs par défaut, surchargeables dans la section [http] de .streamlit/secrets.toml
+CONFIG_HTTP_PAR_DEFAUT = {
+    "taille_pool": 10,
+    "timeout_connexion": 5,
+    "timeout_lecture": 30,
+    "http2": False
+}
+
+
+class ClientHTTP:
+    """Client HTTP à connexions persistantes, avec HTTP/2 optionnel (via httpx)"""
+
+    def __init__(self, taille_pool: int = 10, timeout_connexion: float = 5,
+                 timeout_lecture: float = 30, http2: bool = False):
+        """Crée le pool de connexions"""
+        self.taille_pool = taille_pool
+        self.timeout_connexion = timeout_connexion
+        self.timeout_lecture = timeout_lecture
+        self._verrou = threading.Lock()
+        self._nb_requetes = 0
+        self._versions_http: Dict[str, int] = {}
+
+        self._httpx = None
+        if http2:
+            try:
+                import httpx
+                self._httpx = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=taille_pool, max_keepalive_connections=taille_pool),
+                    timeout=httpx.Timeout(timeout_lecture, connect=timeout_connexion)
+                )
+            except ImportError:
+                # httpx[http2] non installé : repli sur HTTP/1.1 keep-alive
+                self._httpx = None
+
+        self.http2 = self._httpx is not None
+        # Pool HTTP/1.1 créé à la première requête
+        self._session = None
+        self._adaptateur = None
+
+    def _session_http(self):
+        """Session requests à connexions persistantes (créée au premier appel)"""
+        if self._session is None:
+            with self._verrou:
+                if self._session is None:
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adaptateur = HTTPAdapter(pool_connections=self.taille_pool, pool_maxsize=self.taille_pool)
+                    session.mount("https://", adaptateur)
+                    session.mount("http://", adaptateur)
+                    self._adaptateur = adaptateur
+                    self._session = session
+        return self._session
+
+    def _timeouts(self, timeout: Optional[Tuple[float, float]]) -> Tuple[float, float]:
+        """Couple (connexion, lecture) effectif"""
+        return timeout or (self.timeout_connexion, self.timeout_lecture)
+
+    def post(self, url: str, headers: Optional[Dict[str, str]] = None, json: Any = None,
+             timeout: Optional[Tuple[float, float]] = None, stream: bool = False):
+        """Envoie une requête POST en réutilisant les connexions ouvertes"""
+        connexion, lecture = self._timeouts(timeout)
+
+        if self._httpx is not None and not stream:
+            import httpx
+            try:
+                reponse = self._httpx.post(
+                    url, headers=headers, json=json,
+                    timeout=httpx.Timeout(lecture, connect=connexion)
+                )
+            except httpx.TimeoutException as e:
+                raise requests.exceptions.Timeout(str(e))
+            except httpx.HTTPError as e:
+                raise requests.exceptions.ConnectionError(str(e))
+            self._compter(reponse.http_version)
+            return reponse
+
+        reponse = self._session_http().post(url, headers=headers, json=json, timeout=(connexion, lecture), stream=stream)
+        self._compter("HTTP/1.1")
+        return reponse
+
+    def _compter(self, version_http: str) -> None:
+        """Met à jour les compteurs de requêtes"""
+        with self._verrou:
+            self._nb_requetes += 1
+            self._versions_http[version_http] = self._versions_http.get(version_http, 0) + 1
+
+    def metriques(self) -> Dict[str, Any]:
+        """Requêtes envoyées, connexions ouvertes et taux de réutilisation des connexions"""
+        pools = self._adaptateur.poolmanager.pools if self._adaptateur else {}
+        connexions = sum(pools[cle].num_connections for cle in pools.keys())
+        requetes_http1 = sum(pools[cle].num_requests for cle in pools.keys())
+
+        with self._verrou:
+            metriques = {
+                "requetes": self._nb_requetes,
+                "versions_http": dict(self._versions_http),
+                "connexions_ouvertes_http1": connexions,
+                "connexions_reutilisees_http1": max(0, requetes_http1 - connexions),
+                "taux_reutilisation_http1": round(1 - connexions / requetes_http1, 3) if requetes_http1 else 0.0,
+                "taille_pool": self.taille_pool,
+                "http2": self.http2
+            }
+        return metriques
+
+    def fermer(self) -> None:
+        """Ferme toutes les connexions du pool"""
+        if self._session is not None:
+            self._session.close()
+        if self._httpx is not None:
+            self._httpx.close()
+
+
+_client_partage: Optional[ClientHTTP] = None
+_verrou_client = threading.Lock()
+
+
+def obtenir_client_http(**config) -> ClientHTTP:
+    """Retourne le client HTTP unique du processus (créé au premier appel)"""
+    global _client_partage
+    if _client_partage is None:
+        with _verrou_client:
+            if _client_partage is None:
+                _client_partage = ClientHTTP(**{**CONFIG_HTTP_PAR_DEFAUT, **config})
+    return _client_partage
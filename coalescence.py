@@ -0,0 +1,160 @@
+"""
+Module de regroupement des requêtes identiques simultanées (un seul appel, résultat partagé)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Plateforme sans verrous de fichiers POSIX : regroupement limité au processus courant
+    fcntl = None
+
+
+class CoalesceurRequetes:
+    """Le premier appelant d'une clé exécute la requête, les appelants simultanés attendent son résultat"""
+
+    def __init__(self, dossier_verrous: Optional[str] = None, delai_attente: float = 120):
+        """Initialise le registre des requêtes en cours (et le dossier des verrous entre processus)"""
+        self.dossier_verrous = dossier_verrous if fcntl else None
+        self.delai_attente = delai_attente
+        self._en_cours: Dict[str, Future] = {}
+        self._verrou = threading.Lock()
+        self._compteurs = {"meneurs": 0, "suiveurs": 0, "attentes_inter_processus": 0}
+
+        if self.dossier_verrous:
+            try:
+                os.makedirs(self.dossier_verrous, exist_ok=True)
+            except OSError:
+                self.dossier_verrous = None
+
+    def rejoindre(self, cle: str) -> Tuple[Future, bool]:
+        """Retourne le résultat à venir pour la clé et indique si l'appelant doit exécuter la requête"""
+        with self._verrou:
+            futur = self._en_cours.get(cle)
+            if futur is not None:
+                self._compteurs["suiveurs"] += 1
+                return futur, False
+
+            futur = Future()
+            self._en_cours[cle] = futur
+            self._compteurs["meneurs"] += 1
+            return futur, True
+
+    def terminer(self, cle: str, futur: Future, resultat: Optional[str] = None,
+                 erreur: Optional[BaseException] = None) -> None:
+        """Publie le résultat (ou l'erreur) aux appelants en attente"""
+        with self._verrou:
+            if self._en_cours.get(cle) is futur:
+                del self._en_cours[cle]
+
+        if erreur is not None:
+            # Un meneur interrompu (flux abandonné, arrêt) ne doit pas interrompre les suiveurs
+            if not isinstance(erreur, Exception):
+                erreur = Exception("Requête interrompue")
+            futur.set_exception(erreur)
+        else:
+            futur.set_result(resultat)
+
+    def attendre(self, futur: Future, delai: Optional[float] = None) -> str:
+        """Attend le résultat du meneur (l'erreur du meneur est relancée telle quelle)"""
+        return futur.result(timeout=self._delai(delai))
+
+    def _delai(self, delai: Optional[float]) -> float:
+        """Attente maximale : le budget de l'appelant, dans la limite de delai_attente"""
+        return self.delai_attente if delai is None else min(delai, self.delai_attente)
+
+    @contextmanager
+    def verrou_processus(self, cle: str, delai: Optional[float] = None):
+        """Verrou de fichier exclusif entre processus ; indique si un autre processus a dû être attendu.
+
+        Un fichier par clé : des requêtes différentes ne s'attendent jamais. L'attente est bornée
+        par delai (budget de latence de l'appelant), au plus delai_attente.
+        """
+        if not self.dossier_verrous:
+            yield False
+            return
+
+        # Fichier supprimé par son détenteur à la libération : le dossier ne grossit pas
+        chemin = os.path.join(self.dossier_verrous, f"{cle}.lock")
+        a_attendu = False
+        fichier = None
+        limite = time.monotonic() + self._delai(delai)
+        while True:
+            fichier = open(chemin, "a")
+            try:
+                fcntl.flock(fichier, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                try:
+                    # Fichier supprimé puis recréé pendant l'attente : verrouiller le nouveau
+                    if os.fstat(fichier.fileno()).st_ino == os.stat(chemin).st_ino:
+                        break
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                if not a_attendu:
+                    a_attendu = True
+                    with self._verrou:
+                        self._compteurs["attentes_inter_processus"] += 1
+                if time.monotonic() >= limite:
+                    # Verrou tenu au-delà du budget : la requête est exécutée sans lui
+                    fichier.close()
+                    fichier = None
+                    break
+                time.sleep(0.05)
+            fichier.close()
+
+        try:
+            yield a_attendu
+        finally:
+            if fichier is not None:
+                try:
+                    os.unlink(chemin)
+                except OSError:
+                    pass
+                fcntl.flock(fichier, fcntl.LOCK_UN)
+                fichier.close()
+
+    def executer(self, cle: str, appel: Callable[[], str],
+                 relire: Optional[Callable[[], Optional[str]]] = None, delai: Optional[float] = None) -> str:
+        """Exécute l'appel une seule fois par clé ; relire consulte le cache après l'attente d'un autre processus"""
+        futur, meneur = self.rejoindre(cle)
+        if not meneur:
+            return self.attendre(futur, delai)
+
+        try:
+            with self.verrou_processus(cle, delai) as a_attendu:
+                resultat = relire() if a_attendu and relire else None
+                if resultat is None:
+                    resultat = appel()
+        except BaseException as e:
+            self.terminer(cle, futur, erreur=e)
+            raise
+
+        self.terminer(cle, futur, resultat=resultat)
+        return resultat
+
+    def statistiques(self) -> Dict[str, int]:
+        """Compteurs : requêtes exécutées, appels regroupés et attentes d'un autre processus"""
+        with self._verrou:
+            statistiques = dict(self._compteurs)
+            statistiques["en_cours"] = len(self._en_cours)
+        return statistiques
+
+
+_coalesceur_partage: Optional[CoalesceurRequetes] = None
+_verrou_coalesceur = threading.Lock()
+
+
+def obtenir_coalesceur(dossier_verrous: Optional[str] = None) -> CoalesceurRequetes:
+    """Retourne le coalesceur unique du processus (créé au premier appel)"""
+    global _coalesceur_partage
+    if _coalesceur_partage is None:
+        with _verrou_coalesceur:
+            if _coalesceur_partage is None:
+                _coalesceur_partage = CoalesceurRequetes(dossier_verrous)
+    return _coalesceur_partage
@@ -0,0 +1,196 @@
+"""
+Module de comptabilité des tokens : estimation locale, dimensionnement de max_tokens et budget quotidien
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Valeurs par défaut, surchargeables dans la section [tokens] de .streamlit/secrets.toml
+CONFIG_TOKENS_PAR_DEFAUT = {
+    "prix_entree_par_million": 0.30,   # USD par million de tokens envoyés (à ajuster au modèle)
+    "prix_sortie_par_million": 1.20,   # USD par million de tokens générés
+    "budget_quotidien_usd": 0.0,       # 0 : pas de budget
+    "budget_quotidien_tokens": 0       # 0 : pas de budget
+}
+
+# Un mot français fait en moyenne 1,5 token environ ; la marge évite de couper la fin de la réponse
+TOKENS_PAR_MOT = 1.5
+MARGE_SORTIE = 1.25
+
+# Tokens ajoutés par message (rôle et séparateurs du format de conversation)
+TOKENS_PAR_MESSAGE = 4
+
+_MOTS_ET_SIGNES = re.compile(r"\w+|[^\w\s]")
+
+
+class BudgetTokensEpuise(Exception):
+    """Le budget quotidien de tokens ou de coût est atteint : l'appel n'est pas tenté"""
+
+
+def estimer_tokens(texte: str) -> int:
+    """Estimation locale du nombre de tokens (un par signe, un par tranche de 4 lettres d'un mot)"""
+    return sum(
+        math.ceil(len(element) / 4) if element[0].isalnum() or element[0] == "_" else 1
+        for element in _MOTS_ET_SIGNES.findall(texte)
+    )
+
+
+def estimer_tokens_messages(messages: List[Dict[str, str]]) -> int:
+    """Estimation des tokens d'entrée d'une requête de conversation"""
+    return sum(estimer_tokens(message["content"]) + TOKENS_PAR_MESSAGE for message in messages)
+
+
+def max_tokens_pour_mots(nb_mots: int) -> int:
+    """Limite de tokens générés pour une réponse d'au plus nb_mots mots"""
+    return int(math.ceil(nb_mots * TOKENS_PAR_MOT * MARGE_SORTIE / 10.0)) * 10
+
+
+class ComptabiliteTokens:
+    """Cumule tokens et coût par point d'accès et par jour (SQLite partagé entre processus)"""
+
+    def __init__(self, chemin: str, prix_entree_par_million: float = 0.30, prix_sortie_par_million: float = 1.20,
+                 budget_quotidien_usd: float = 0.0, budget_quotidien_tokens: int = 0):
+        """Ouvre (ou crée) la table de consommation dans la base SQLite du cache"""
+        self.chemin = chemin
+        self.prix_entree = prix_entree_par_million / 1_000_000
+        self.prix_sortie = prix_sortie_par_million / 1_000_000
+        self.budget_quotidien_usd = budget_quotidien_usd
+        self.budget_quotidien_tokens = budget_quotidien_tokens
+        self._local = threading.local()
+        self._compteurs = {"refus_budget": 0, "usages_estimes": 0}
+        self._verrou = threading.Lock()
+
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+        connexion = self._connexion()
+        connexion.execute(
+            "CREATE TABLE IF NOT EXISTS consommation ("
+            " jour TEXT NOT NULL, point_acces TEXT NOT NULL, requetes INTEGER NOT NULL,"
+            " tokens_entree INTEGER NOT NULL, tokens_sortie INTEGER NOT NULL,"
+            " tokens_entree_estimes INTEGER NOT NULL, cout REAL NOT NULL,"
+            " PRIMARY KEY (jour, point_acces))"
+        )
+        connexion.commit()
+
+    def _connexion(self) -> sqlite3.Connection:
+        """Connexion SQLite propre au thread courant (mode WAL pour les accès concurrents)"""
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin, timeout=10)
+            connexion.execute("PRAGMA journal_mode=WAL")
+            self._local.connexion = connexion
+        return connexion
+
+    def cout(self, tokens_entree: int, tokens_sortie: int) -> float:
+        """Coût en USD d'une requête"""
+        return tokens_entree * self.prix_entree + tokens_sortie * self.prix_sortie
+
+    def verifier_budget(self, tokens_entree: int, max_tokens: int) -> None:
+        """Lève BudgetTokensEpuise si la requête (au pire max_tokens générés) dépasserait le budget du jour"""
+        if not self.budget_quotidien_usd and not self.budget_quotidien_tokens:
+            return
+
+        jour = self.consommation_jour()
+        depasse = (
+            (self.budget_quotidien_tokens
+             and jour["tokens_entree"] + jour["tokens_sortie"] + tokens_entree + max_tokens
+             > self.budget_quotidien_tokens)
+            or (self.budget_quotidien_usd
+                and jour["cout"] + self.cout(tokens_entree, max_tokens) > self.budget_quotidien_usd)
+        )
+        if depasse:
+            with self._verrou:
+                self._compteurs["refus_budget"] += 1
+            raise BudgetTokensEpuise("Budget quotidien de l'IA atteint")
+
+    def enregistrer(self, point_acces: str, usage: Optional[Dict[str, Any]], tokens_entree_estimes: int,
+                    tokens_sortie_estimes: int = 0) -> None:
+        """Ajoute la consommation d'une réponse (bloc usage de l'API, ou estimation locale à défaut)"""
+        if usage:
+            tokens_entree = int(usage.get("prompt_tokens") or 0)
+            tokens_sortie = int(usage.get("completion_tokens") or 0)
+        else:
+            with self._verrou:
+                self._compteurs["usages_estimes"] += 1
+            tokens_entree, tokens_sortie = tokens_entree_estimes, tokens_sortie_estimes
+
+        try:
+            connexion = self._connexion()
+            connexion.execute(
+                "INSERT INTO consommation VALUES (?, ?, 1, ?, ?, ?, ?)"
+                " ON CONFLICT (jour, point_acces) DO UPDATE SET"
+                " requetes = requetes + 1, tokens_entree = tokens_entree + excluded.tokens_entree,"
+                " tokens_sortie = tokens_sortie + excluded.tokens_sortie,"
+                " tokens_entree_estimes = tokens_entree_estimes + excluded.tokens_entree_estimes,"
+                " cout = cout + excluded.cout",
+                (time.strftime("%Y-%m-%d"), point_acces, tokens_entree, tokens_sortie,
+                 tokens_entree_estimes, self.cout(tokens_entree, tokens_sortie))
+            )
+            connexion.commit()
+        except sqlite3.Error:
+            pass
+
+    def consommation_jour(self, jour: Optional[str] = None) -> Dict[str, Any]:
+        """Totaux d'une journée, tous points d'accès confondus (aujourd'hui par défaut)"""
+        try:
+            ligne = self._connexion().execute(
+                "SELECT COALESCE(SUM(requetes), 0), COALESCE(SUM(tokens_entree), 0),"
+                " COALESCE(SUM(tokens_sortie), 0), COALESCE(SUM(cout), 0) FROM consommation WHERE jour = ?",
+                (jour or time.strftime("%Y-%m-%d"),)
+            ).fetchone()
+        except sqlite3.Error:
+            ligne = (0, 0, 0, 0.0)
+        return {"requetes": ligne[0], "tokens_entree": ligne[1], "tokens_sortie": ligne[2], "cout": ligne[3]}
+
+    def statistiques(self, nb_jours: int = 7) -> Dict[str, Any]:
+        """Consommation par jour et par point d'accès, budget et écart de l'estimation locale"""
+        try:
+            lignes = self._connexion().execute(
+                "SELECT jour, point_acces, requetes, tokens_entree, tokens_sortie, tokens_entree_estimes, cout"
+                " FROM consommation WHERE jour >= ? ORDER BY jour DESC, point_acces",
+                (time.strftime("%Y-%m-%d", time.localtime(time.time() - (nb_jours - 1) * 86400)),)
+            ).fetchall()
+        except sqlite3.Error:
+            lignes = []
+
+        par_jour: Dict[str, Dict[str, Any]] = {}
+        for jour, point_acces, requetes, entree, sortie, estimes, cout in lignes:
+            par_jour.setdefault(jour, {})[point_acces] = {
+                "requetes": requetes,
+                "tokens_entree": entree,
+                "tokens_sortie": sortie,
+                "ecart_estimation": round(estimes / entree - 1, 3) if entree else None,
+                "cout_usd": round(cout, 4)
+            }
+
+        aujourd_hui = self.consommation_jour()
+        with self._verrou:
+            compteurs = dict(self._compteurs)
+        return {
+            "aujourd_hui": {**aujourd_hui, "cout": round(aujourd_hui["cout"], 4)},
+            "budget_quotidien_usd": self.budget_quotidien_usd or None,
+            "budget_quotidien_tokens": self.budget_quotidien_tokens or None,
+            **compteurs,
+            "par_jour": par_jour
+        }
+
+
+_comptabilite_partagee: Optional[ComptabiliteTokens] = None
+_verrou_comptabilite = threading.Lock()
+
+
+def obtenir_comptabilite(chemin: str, **config) -> ComptabiliteTokens:
+    """Retourne la comptabilité unique du processus (créée au premier appel)"""
+    global _comptabilite_partagee
+    if _comptabilite_partagee is None:
+        with _verrou_comptabilite:
+            if _comptabilite_partagee is None:
+                _comptabilite_partagee = ComptabiliteTokens(chemin, **{**CONFIG_TOKENS_PAR_DEFAUT, **config})
+    return _comptabilite_partagee
@@ -0,0 +1,254 @@
+"""
+Module de démarrage rapide : imports différés, chargement de la base en arrière-plan, rapport des temps d'import
+"""
+
+import argparse
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+
+# Modules chargés en arrière-plan pendant le premier affichage (base, moteur, interface IA)
+MODULES_ARRIERE_PLAN = ("recommendation_logic_student", "llm_interface", "prechauffage", "schema_resultats")
+
+# Budget de démarrage (ms), vérifié par `python demarrage.py`
+BUDGET_DEMARRAGE_PAR_DEFAUT = {
+    "premier_affichage_ms": 150,   # import de l'application, Streamlit déjà chargé par le serveur
+    "chargement_ms": 900,          # imports différés, moteur et secrets, en arrière-plan
+    "interface_ia_ms": 150         # construction de l'interface IA de la première session
+}
+
+LIGNE_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+class ModuleDiffere:
+    """Module importé au premier accès à l'un de ses attributs"""
+
+    def __init__(self, nom: str):
+        self._nom = nom
+        self._module = None
+
+    def __getattr__(self, attribut: str) -> Any:
+        if self._module is None:
+            # importlib sérialise les imports concurrents d'un même module
+            self._module = importlib.import_module(self._nom)
+        return getattr(self._module, attribut)
+
+    def __repr__(self) -> str:
+        etat = "importé" if self._module is not None else "différé"
+        return f"<module {self._nom} ({etat})>"
+
+
+def module_differe(nom: str) -> ModuleDiffere:
+    """Référence à un module qui ne sera importé qu'à sa première utilisation"""
+    return ModuleDiffere(nom)
+
+
+class ChargementArrierePlan:
+    """Imports lourds, moteur (base, index) et secrets préparés dans un thread, pendant le premier affichage"""
+
+    def __init__(self, modules=MODULES_ARRIERE_PLAN):
+        self.modules = modules
+        self.mesures: Dict[str, Any] = {}
+        self._fini = threading.Event()
+        self._thread = threading.Thread(target=self._charger, name="chargement-demarrage", daemon=True)
+
+    def demarrer(self) -> "ChargementArrierePlan":
+        self._thread.start()
+        return self
+
+    def _charger(self) -> None:
+        debut = time.perf_counter()
+        try:
+            for nom in self.modules:
+                importlib.import_module(nom)
+            self.mesures["imports_s"] = round(time.perf_counter() - debut, 3)
+
+            etape = time.perf_counter()
+            from recommendation_logic_student import obtenir_moteur_recommandation
+            obtenir_moteur_recommandation()
+            self.mesures["base_s"] = round(time.perf_counter() - etape, 3)
+
+            # Première lecture des secrets (analyse du fichier, surveillance des chemins) : ~0,4 s
+            etape = time.perf_counter()
+            import streamlit as st
+            st.secrets.load_if_toml_exists()
+            self.mesures["secrets_s"] = round(time.perf_counter() - etape, 3)
+        except Exception as e:
+            # Construction reprise par la session qui attend le moteur : l'erreur y sera affichée
+            self.mesures["erreur"] = str(e)
+        finally:
+            self.mesures["total_s"] = round(time.perf_counter() - debut, 3)
+            self._fini.set()
+
+    def pret(self) -> bool:
+        return self._fini.is_set()
+
+    def attendre(self, delai: Optional[float] = None):
+        """Moteur de recommandation partagé, une fois le chargement terminé"""
+        self._fini.wait(delai)
+        from recommendation_logic_student import obtenir_moteur_recommandation
+        return obtenir_moteur_recommandation()
+
+
+_chargement_partage: Optional[ChargementArrierePlan] = None
+_verrou_chargement = threading.Lock()
+
+
+def lancer_chargement() -> ChargementArrierePlan:
+    """Démarre le chargement en arrière-plan une seule fois par processus et le retourne"""
+    global _chargement_partage
+    if _chargement_partage is None:
+        with _verrou_chargement:
+            if _chargement_partage is None:
+                _chargement_partage = ChargementArrierePlan().demarrer()
+    return _chargement_partage
+
+
+def mesurer_imports(modules: List[str], deja_importes: List[str] = ()) -> List[Dict[str, Any]]:
+    """Temps d'import de chaque module (python -X importtime dans un interpréteur neuf).
+
+    Les modules de deja_importes sont importés avant la mesure et n'y figurent pas.
+    """
+    code = "".join(f"import {nom}\n" for nom in deja_importes)
+    code += "import sys\nsys.stderr.write('--- mesure ---\\n')\n"
+    code += "".join(f"import {nom}\n" for nom in modules)
+    resultat = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=DOSSIER,
+                              capture_output=True, text=True)
+    if resultat.returncode != 0:
+        raise RuntimeError(resultat.stderr.strip().splitlines()[-1])
+
+    mesures = []
+    sortie = resultat.stderr.split("--- mesure ---\n", 1)[-1]
+    for ligne in sortie.splitlines():
+        correspondance = LIGNE_IMPORTTIME.match(ligne)
+        if correspondance:
+            propre, cumule, retrait, nom = correspondance.groups()
+            mesures.append({
+                "module": nom,
+                "propre_ms": int(propre) / 1000,
+                "cumule_ms": int(cumule) / 1000,
+                "profondeur": (len(retrait) - 1) // 2
+            })
+    return mesures
+
+
+def regrouper_par_paquet(mesures: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Temps propre cumulé par paquet racine (streamlit, pydantic, requests, modules du projet...)"""
+    paquets: Dict[str, Dict[str, Any]] = {}
+    for mesure in mesures:
+        racine = mesure["module"].split(".")[0]
+        paquet = paquets.setdefault(racine, {"paquet": racine, "propre_ms": 0.0, "modules": 0})
+        paquet["propre_ms"] += mesure["propre_ms"]
+        paquet["modules"] += 1
+    return sorted(
+        ({**paquet, "propre_ms": round(paquet["propre_ms"], 1)} for paquet in paquets.values()),
+        key=lambda paquet: -paquet["propre_ms"]
+    )
+
+
+def modules_du_projet() -> List[str]:
+    return sorted(nom[:-3] for nom in os.listdir(DOSSIER) if nom.endswith(".py"))
+
+
+def _mesurer_phases() -> Dict[str, float]:
+    """Durées des phases du démarrage d'un worker (exécuté dans un interpréteur neuf)"""
+    phases = {}
+    debut = time.perf_counter()
+    import streamlit  # noqa: F401  (chargé par le serveur avant la première session)
+    phases["streamlit_ms"] = round((time.perf_counter() - debut) * 1000, 1)
+
+    etape = time.perf_counter()
+    import app_student  # noqa: F401
+    phases["premier_affichage_ms"] = round((time.perf_counter() - etape) * 1000, 1)
+
+    etape = time.perf_counter()
+    chargement = lancer_chargement()
+    moteur = chargement.attendre()
+    phases["chargement_ms"] = round((time.perf_counter() - etape) * 1000, 1)
+    for mesure in ("imports_s", "base_s", "secrets_s"):
+        if mesure in chargement.mesures:
+            phases[f"  dont {mesure[:-2]}_ms"] = round(chargement.mesures[mesure] * 1000, 1)
+
+    etape = time.perf_counter()
+    from llm_interface import LLMInterface
+    LLMInterface(moteur.kb_loader.version_contenu)
+    phases["interface_ia_ms"] = round((time.perf_counter() - etape) * 1000, 1)
+    return phases
+
+
+def rapport_demarrage(nb_modules: int = 15) -> Dict[str, Any]:
+    """Phases du démarrage et détail des imports (premier affichage, puis chargement en arrière-plan)"""
+    resultat = subprocess.run([sys.executable, os.path.join(DOSSIER, "demarrage.py"), "--phases"], cwd=DOSSIER,
+                              capture_output=True, text=True)
+    if resultat.returncode != 0:
+        raise RuntimeError(resultat.stderr.strip().splitlines()[-1])
+    phases = json.loads(resultat.stdout.strip().splitlines()[-1])
+
+    projet = set(modules_du_projet())
+    rapport: Dict[str, Any] = {"phases": phases, "budget": BUDGET_DEMARRAGE_PAR_DEFAUT}
+    for etape, modules, deja_importes in (
+        ("premier_affichage", ["app_student"], ["streamlit"]),
+        ("chargement", list(MODULES_ARRIERE_PLAN), ["streamlit", "app_student"])
+    ):
+        mesures = mesurer_imports(modules, deja_importes)
+        rapport[etape] = {
+            "total_ms": round(sum(mesure["propre_ms"] for mesure in mesures), 1),
+            "paquets": regrouper_par_paquet(mesures)[:nb_modules],
+            "modules_du_projet": [
+                {cle: mesure[cle] for cle in ("module", "propre_ms", "cumule_ms")}
+                for mesure in mesures if mesure["module"] in projet
+            ]
+        }
+    return rapport
+
+
+def depassements(phases: Dict[str, float], budget: Dict[str, float]) -> List[str]:
+    """Phases dont la durée dépasse le budget"""
+    return [
+        f"{phase} : {phases[phase]} ms pour {limite} ms"
+        for phase, limite in budget.items() if phases.get(phase, 0) > limite
+    ]
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Affiche le rapport de démarrage ; code de sortie 1 si le budget est dépassé"""
+    analyseur = argparse.ArgumentParser(description="Temps de démarrage et d'import de l'application")
+    analyseur.add_argument("--modules", type=int, default=15, help="paquets les plus lents affichés par étape")
+    analyseur.add_argument("--json", action="store_true", help="rapport complet en JSON")
+    analyseur.add_argument("--phases", action="store_true", help=argparse.SUPPRESS)
+    options = analyseur.parse_args(arguments)
+
+    if options.phases:
+        print(json.dumps(_mesurer_phases()))
+        return
+
+    rapport = rapport_demarrage(options.modules)
+    if options.json:
+        print(json.dumps(rapport, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'phase':<24}{'ms':>10}{'budget':>10}")
+        for phase, duree in rapport["phases"].items():
+            print(f"{phase:<24}{duree:>10}{BUDGET_DEMARRAGE_PAR_DEFAUT.get(phase, ''):>10}")
+        for etape in ("premier_affichage", "chargement"):
+            print(f"\nImports de l'étape {etape} : {rapport[etape]['total_ms']} ms")
+            for paquet in rapport[etape]["paquets"]:
+                print(f"  {paquet['paquet']:<40}{paquet['propre_ms']:>10} ms{paquet['modules']:>6} modules")
+            for mesure in rapport[etape]["modules_du_projet"]:
+                print(f"    {mesure['module']:<38}{mesure['propre_ms']:>10} ms (cumulé {mesure['cumule_ms']} ms)")
+
+    hors_budget = depassements(rapport["phases"], BUDGET_DEMARRAGE_PAR_DEFAUT)
+    for depassement in hors_budget:
+        print(f"Budget dépassé : {depassement}", file=sys.stderr)
+    sys.exit(1 if hors_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Module de disjoncteur (fermé / ouvert / semi-ouvert) protégeant les appels à l'API
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Valeurs par défaut, surchargeables dans la section [disjoncteur] de .streamlit/secrets.toml
+CONFIG_DISJONCTEUR_PAR_DEFAUT = {
+    "taille_fenetre": 20,
+    "appels_minimum": 5,
+    "seuil_taux_echec": 0.5,
+    "refroidissement": 30
+}
+
+FERME = "fermé"
+OUVERT = "ouvert"
+SEMI_OUVERT = "semi-ouvert"
+
+
+class CircuitOuvert(Exception):
+    """L'API est considérée indisponible : l'appel n'est pas tenté"""
+
+
+class Disjoncteur:
+    """Ouvre le circuit quand le taux d'échec récent dépasse le seuil, puis teste la reprise après refroidissement"""
+
+    def __init__(self, taille_fenetre: int = 20, appels_minimum: int = 5,
+                 seuil_taux_echec: float = 0.5, refroidissement: float = 30):
+        """Initialise un disjoncteur fermé"""
+        self.appels_minimum = appels_minimum
+        self.seuil_taux_echec = seuil_taux_echec
+        self.refroidissement = refroidissement
+
+        self._verrou = threading.Lock()
+        self._resultats = deque(maxlen=taille_fenetre)
+        self._etat = FERME
+        self._ouvert_depuis = 0.0
+        self._essai_depuis: Optional[float] = None
+        self._compteurs = {"ouvertures": 0, "refus": 0, "succes": 0, "echecs": 0}
+
+    def disponible(self) -> bool:
+        """Vrai si un appel peut être tenté maintenant (sans changer l'état)"""
+        with self._verrou:
+            if self._etat == OUVERT:
+                return time.monotonic() - self._ouvert_depuis >= self.refroidissement
+            if self._etat == SEMI_OUVERT:
+                return not self._essai_en_cours()
+            return True
+
+    def _essai_en_cours(self) -> bool:
+        """Un appel d'essai est en cours (un essai sans réponse depuis le refroidissement est abandonné)"""
+        return self._essai_depuis is not None and time.monotonic() - self._essai_depuis < self.refroidissement
+
+    def autoriser(self) -> bool:
+        """Réserve le droit d'appeler l'API ; en semi-ouvert, un seul appel d'essai à la fois"""
+        with self._verrou:
+            maintenant = time.monotonic()
+            if self._etat == OUVERT and maintenant - self._ouvert_depuis >= self.refroidissement:
+                self._etat = SEMI_OUVERT
+                self._essai_depuis = None
+
+            if self._etat == FERME:
+                return True
+            if self._etat == SEMI_OUVERT and not self._essai_en_cours():
+                self._essai_depuis = maintenant
+                return True
+
+            self._compteurs["refus"] += 1
+            return False
+
+    def succes(self) -> None:
+        """Enregistre un appel réussi (referme le circuit après un essai concluant)"""
+        with self._verrou:
+            self._compteurs["succes"] += 1
+            if self._etat == SEMI_OUVERT:
+                self._etat = FERME
+                self._essai_depuis = None
+                self._resultats.clear()
+            self._resultats.append(True)
+
+    def echec(self) -> None:
+        """Enregistre un appel en échec (ouvre le circuit si le seuil est atteint)"""
+        with self._verrou:
+            self._compteurs["echecs"] += 1
+            if self._etat == SEMI_OUVERT:
+                self._ouvrir()
+                return
+
+            self._resultats.append(False)
+            if self._etat == FERME and len(self._resultats) >= self.appels_minimum:
+                if self._taux_echec() >= self.seuil_taux_echec:
+                    self._ouvrir()
+
+    def _ouvrir(self) -> None:
+        """Passe à l'état ouvert (verrou déjà tenu)"""
+        self._etat = OUVERT
+        self._ouvert_depuis = time.monotonic()
+        self._essai_depuis = None
+        self._compteurs["ouvertures"] += 1
+
+    def _taux_echec(self) -> float:
+        """Part des échecs parmi les derniers appels (verrou déjà tenu)"""
+        if not self._resultats:
+            return 0.0
+        return self._resultats.count(False) / len(self._resultats)
+
+    @property
+    def etat(self) -> str:
+        """État courant : fermé, ouvert ou semi-ouvert"""
+        with self._verrou:
+            if self._etat == OUVERT and time.monotonic() - self._ouvert_depuis >= self.refroidissement:
+                return SEMI_OUVERT
+            return self._etat
+
+    def metriques(self) -> Dict[str, Any]:
+        """État, taux d'échec sur la fenêtre, délai avant le prochain essai et compteurs"""
+        etat = self.etat
+        with self._verrou:
+            metriques: Dict[str, Any] = dict(self._compteurs)
+            metriques["taux_echec"] = round(self._taux_echec(), 3)
+            metriques["appels_fenetre"] = len(self._resultats)
+            metriques["prochain_essai_s"] = round(
+                max(0.0, self._ouvert_depuis + self.refroidissement - time.monotonic()), 1
+            ) if self._etat == OUVERT else 0.0
+        metriques["etat"] = etat
+        return metriques
+
+
+_disjoncteur_partage: Optional[Disjoncteur] = None
+_verrou_disjoncteur = threading.Lock()
+
+
+def obtenir_disjoncteur(**config) -> Disjoncteur:
+    """Retourne le disjoncteur unique du processus (créé au premier appel)"""
+    global _disjoncteur_partage
+    if _disjoncteur_partage is None:
+        with _verrou_disjoncteur:
+            if _disjoncteur_partage is None:
+                _disjoncteur_partage = Disjoncteur(**{**CONFIG_DISJONCTEUR_PAR_DEFAUT, **config})
+    return _disjoncteur_partage
@@ -0,0 +1,112 @@
+"""
+Module d'exécution concurrente : analyse de profils par lots
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from limiteur_debit import PRIORITE_ARRIERE_PLAN
+
+# Nombre de requêtes maintenues en vol par défaut lors d'une analyse par lots
+CONCURRENCE_PAR_DEFAUT = 16
+
+
+def _resume_profil(profil: Dict) -> Dict:
+    """Champs du profil repris dans les résultats (jamais le nom ni le prénom)"""
+    return {
+        "statut": profil.get("statut"),
+        "serie_bac": profil.get("serie_bac"),
+        "filiere_actuelle": profil.get("filiere_actuelle"),
+        "carriere_envisagee": profil.get("carriere_envisagee")
+    }
+
+
+async def analyser_lot(moteur, llm_interface, profils: Iterable[Dict],
+                       concurrence: int = CONCURRENCE_PAR_DEFAUT,
+                       priorite: int = PRIORITE_ARRIERE_PLAN,
+                       rappel: Optional[Callable[[Dict], None]] = None,
+                       budget_latence: Optional[float] = None) -> List[Dict]:
+    """Analyse des profils en gardant jusqu'à concurrence requêtes IA en vol ; résultats dans l'ordre d'entrée
+
+    Sans budget_latence, chaque analyse attend son tour dans la file de l'API au lieu d'être abandonnée
+    (délai maximal de sa priorité). Les analyses de base servies à la place de l'IA sont marquées repli.
+    """
+    # Import différé : llm_interface importe ce module
+    from llm_interface import RepliAnalyse
+
+    boucle = asyncio.get_running_loop()
+    profils = list(profils)
+    resultats: List[Optional[Dict]] = [None] * len(profils)
+    file_travail: "asyncio.Queue" = asyncio.Queue()
+    for index, profil in enumerate(profils):
+        file_travail.put_nowait((index, profil))
+
+    async def travailleur():
+        while True:
+            try:
+                index, profil = file_travail.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            debut = time.perf_counter()
+            # Calcul local hors de la boucle : les autres travailleurs continuent d'envoyer leurs requêtes
+            recommandations = await boucle.run_in_executor(None, moteur.generer_recommandations, profil)
+            analyse = await llm_interface.analyser_profil_async(profil, recommandations, budget_latence,
+                                                                priorite=priorite)
+
+            resultat = {
+                "index": index,
+                "profil": _resume_profil(profil),
+                "universites": [u["nom_universite"] for u in recommandations.get("universites_recommandees", [])],
+                "analyse": analyse,
+                "repli": isinstance(analyse, RepliAnalyse),
+                "duree_s": round(time.perf_counter() - debut, 3)
+            }
+            resultats[index] = resultat
+            if rappel:
+                rappel(resultat)
+
+    await asyncio.gather(*(travailleur() for _ in range(max(1, min(concurrence, len(profils))))))
+    return resultats
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Analyse par lots d'un fichier JSON Lines de profils (un résultat JSON par ligne sur la sortie)"""
+    analyseur = argparse.ArgumentParser(description="Analyse par lots de profils d'orientation")
+    analyseur.add_argument("profils", help="fichier JSON Lines, un profil par ligne")
+    analyseur.add_argument("--concurrence", type=int, default=CONCURRENCE_PAR_DEFAUT,
+                           help="requêtes IA maintenues en vol")
+    options = analyseur.parse_args(arguments)
+
+    from knowledge_base_loader import KnowledgeBaseLoader
+    from recommendation_logic_student import RecommendationEngine
+    from llm_interface import LLMInterface
+
+    with open(options.profils, encoding="utf-8") as fichier:
+        profils = [json.loads(ligne) for ligne in fichier if ligne.strip()]
+
+    kb_loader = KnowledgeBaseLoader()
+    moteur = RecommendationEngine(kb_loader)
+    llm_interface = LLMInterface(kb_loader.version_contenu, concurrence_async=options.concurrence)
+
+    debut = time.perf_counter()
+    termines = [0]
+
+    def afficher(resultat: Dict[str, Any]) -> None:
+        termines[0] += 1
+        print(json.dumps(resultat, ensure_ascii=False), flush=True)
+        print(f"\r{termines[0]}/{len(profils)} profils analysés", end="", file=sys.stderr)
+
+    resultats = asyncio.run(analyser_lot(moteur, llm_interface, profils, options.concurrence, rappel=afficher))
+
+    duree = time.perf_counter() - debut
+    replis = sum(1 for resultat in resultats if resultat["repli"])
+    print(f"\n{len(profils)} profils en {duree:.1f} s ({len(profils) / duree:.1f} profils/s), "
+          f"{replis} analyses de base", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
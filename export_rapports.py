@@ -0,0 +1,407 @@
+"""
+Module d'export groupé des rapports d'orientation (modèles précompilés, rendu parallèle, ZIP ou document en flux)
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from automate_motifs import normaliser_texte
+from rendu_cartes import CacheFragments, obtenir_cache_fragments
+
+# Rapports rendus par tâche envoyée à un processus (amortit l'envoi des profils et des textes)
+TAILLE_LOT_PAR_DEFAUT = 64
+
+# Lots en cours par processus : la mémoire reste bornée quelle que soit la taille de la classe
+LOTS_EN_VOL_PAR_PROCESSUS = 2
+
+# Recommandations conservées par processus (élèves d'une même classe au même profil)
+TAILLE_MEMO_RECOMMANDATIONS = 512
+
+# Niveau de compression des rapports dans le ZIP (texte répétitif : le niveau 1 suffit)
+NIVEAU_COMPRESSION = 1
+
+# Colonnes reconnues d'un fichier de classe CSV (les autres sont ignorées)
+COLONNES_PROFIL = ("prenom", "nom", "statut", "serie_bac", "filiere_actuelle", "carriere_envisagee")
+
+STATUT_PAR_DEFAUT = "Élève (Futur Bachelier)"
+
+# Séparateur des rapports du document unique : saut de page à l'impression
+SEPARATEUR_DOCUMENT = "\f"
+
+MODELE_ENTETE = """
+RAPPORT D'ORIENTATION PROFESSIONNELLE - BÉNIN
+Généré le {date}
+================================================
+
+PROFIL ÉTUDIANT
+---------------
+Nom: {nom}
+Statut: {statut}
+Série BAC: {serie_bac}
+Filière actuelle: {filiere_actuelle}
+Carrière envisagée: {carriere_envisagee}
+
+ANALYSE PERSONNALISÉE
+--------------------
+{analyse_ia}
+
+"""
+
+SECTION_UNIVERSITES = "\nUNIVERSITÉS ET FILIÈRES RECOMMANDÉES\n====================================\n"
+
+SECTION_CARRIERES = "\nCARRIÈRES ALTERNATIVES À CONSIDÉRER\n==================================\n"
+
+PIED_RAPPORT = """
+
+CONSEILS POUR LA SUITE
+=====================
+1. Consultez les sites web des universités recommandées
+2. Assistez aux journées portes ouvertes
+3. Rencontrez des professionnels du domaine
+4. Préparez-vous aux concours d'entrée si nécessaire
+5. Gardez des options de carrières alternatives
+
+---
+Rapport généré par le Système d'Orientation Professionnelle du Bénin
+Pour plus d'informations: contactez votre conseiller d'orientation
+"""
+
+NB_UNIVERSITES_RAPPORT = 5
+NB_FILIERES_RAPPORT = 3
+NB_CARRIERES_RAPPORT = 3
+
+
+def _bloc_universite(universite: Dict) -> str:
+    """Université et ses premières filières, sans son numéro (partagé par tous les rapports)"""
+    lignes = [
+        f"{universite['nom_universite']} ({universite['statut']})\n",
+        f"   Localisation: {universite.get('localisation', 'Non spécifiée')}\n"
+    ]
+    if universite.get("filieres_recommandees"):
+        lignes.append("   Filières adaptées:\n")
+        for filiere in universite["filieres_recommandees"][:NB_FILIERES_RAPPORT]:
+            lignes.append(f"   • {filiere['nom_filiere']} ({filiere['diplome_delivre']})\n")
+            lignes.append(f"     Durée: {filiere['duree_etudes_ans']} ans\n")
+            if filiere.get("series_bac_requises"):
+                lignes.append(f"     Séries BAC: {', '.join(filiere['series_bac_requises'])}\n")
+    lignes.append("\n")
+    return "".join(lignes)
+
+
+def _bloc_carriere(carriere) -> str:
+    """Carrière alternative, sans son numéro"""
+    lignes = [
+        f"{carriere.nom_metier}\n",
+        f"   Secteur: {carriere.secteur_activite}\n",
+        f"   Description: {carriere.description}\n"
+    ]
+    if carriere.niveau_demande_marche:
+        lignes.append(f"   Demande marché: {carriere.niveau_demande_marche}\n")
+    return "".join(lignes)
+
+
+def generer_rapport(profil: Dict, recommandations: Dict, analyse_ia: str, date: Optional[str] = None,
+                    cache: Optional[CacheFragments] = None) -> str:
+    """Rapport texte d'un élève : en-tête du profil, analyse, blocs universités et carrières (en cache)"""
+    parties = [MODELE_ENTETE.format(
+        date=date or datetime.now().strftime('%d/%m/%Y à %H:%M'),
+        nom=" ".join(filter(None, (profil.get('prenom'), profil.get('nom')))) or 'Non renseigné',
+        statut=profil['statut'],
+        serie_bac=profil.get('serie_bac') or 'Non applicable',
+        filiere_actuelle=profil.get('filiere_actuelle') or 'Non applicable',
+        carriere_envisagee=profil['carriere_envisagee'],
+        analyse_ia=analyse_ia
+    )]
+
+    if recommandations.get("mode") != "degrade":
+        if recommandations.get("universites_recommandees"):
+            parties.append(SECTION_UNIVERSITES)
+            for i, universite in enumerate(recommandations["universites_recommandees"][:NB_UNIVERSITES_RAPPORT], 1):
+                if cache:
+                    cle = ("rapport_universite", universite.get("id_universite") or universite["nom_universite"],
+                           tuple((filiere.get("faculte"), filiere["nom_filiere"])
+                                 for filiere in universite.get("filieres_recommandees", [])[:NB_FILIERES_RAPPORT]))
+                    bloc = cache.obtenir(cle, lambda: _bloc_universite(universite))
+                else:
+                    bloc = _bloc_universite(universite)
+                parties.append(f"\n{i}. ")
+                parties.append(bloc)
+
+        if recommandations.get("carrieres_alternatives"):
+            parties.append(SECTION_CARRIERES)
+            for i, carriere in enumerate(recommandations["carrieres_alternatives"][:NB_CARRIERES_RAPPORT], 1):
+                bloc = (cache.obtenir(("rapport_carriere", carriere.nom_metier), lambda: _bloc_carriere(carriere))
+                        if cache else _bloc_carriere(carriere))
+                parties.append(f"\n{i}. ")
+                parties.append(bloc)
+
+    parties.append(PIED_RAPPORT)
+    return "".join(parties)
+
+
+def _valeur(texte: Optional[str]) -> Optional[str]:
+    texte = " ".join((texte or "").split())
+    return texte or None
+
+
+def entree_depuis_profil(profil: Dict) -> Dict[str, Any]:
+    """Entrée d'export d'un profil (colonnes vides ignorées, statut par défaut : élève)"""
+    profil = {colonne: _valeur(profil.get(colonne)) for colonne in COLONNES_PROFIL}
+    profil["statut"] = profil["statut"] or STATUT_PAR_DEFAUT
+    profil["notes"] = {}
+    return {"profil": profil, "recommandations": None, "analyse_ia": None}
+
+
+def lire_entrees(chemin: str) -> Iterator[Dict[str, Any]]:
+    """Élèves d'un fichier de classe, lus au fil de l'eau.
+
+    CSV (séparateur ; ou ,) : une ligne par élève, colonnes de COLONNES_PROFIL.
+    JSONL : un profil par ligne, ou un résultat conservé {"profil", "recommandations" (format
+    compact), "analyse_ia"} dont les recommandations et l'analyse sont reprises sans recalcul.
+    """
+    with open(chemin, encoding="utf-8-sig", newline="") as fichier:
+        if chemin.endswith(".jsonl"):
+            for ligne in fichier:
+                if not ligne.strip():
+                    continue
+                donnees = json.loads(ligne)
+                if "profil" in donnees:
+                    entree = entree_depuis_profil(donnees["profil"])
+                    entree["profil"]["notes"] = donnees["profil"].get("notes") or {}
+                    entree["recommandations"] = donnees.get("recommandations")
+                    entree["analyse_ia"] = donnees.get("analyse_ia")
+                    yield entree
+                else:
+                    yield entree_depuis_profil(donnees)
+        else:
+            debut = fichier.readline()
+            separateur = ";" if debut.count(";") > debut.count(",") else ","
+            colonnes = [normaliser_texte(colonne).replace(" ", "_")
+                        for colonne in next(csv.reader([debut], delimiter=separateur))]
+            for ligne in csv.reader(fichier, delimiter=separateur):
+                if any(cellule.strip() for cellule in ligne):
+                    yield entree_depuis_profil(dict(zip(colonnes, ligne)))
+
+
+def nom_fichier_rapport(numero: int, profil: Dict) -> str:
+    """Nom du rapport dans l'archive : numéro d'ordre puis nom de l'élève (ou carrière envisagée)"""
+    libelle = " ".join(filter(None, (profil.get("nom"), profil.get("prenom")))) or profil["carriere_envisagee"]
+    libelle = re.sub(r"[^a-z0-9]+", "_", normaliser_texte(libelle)).strip("_")[:60]
+    return f"rapport_{numero:05d}_{libelle or 'eleve'}.txt"
+
+
+# État d'un processus de rendu (créé par _initialiser_processus)
+_moteur = None
+_cache: Optional[CacheFragments] = None
+_memo: "OrderedDict[str, Dict]" = OrderedDict()
+
+
+def _initialiser_processus() -> None:
+    """Moteur, cache des blocs et recommandations déjà calculées du processus de rendu"""
+    global _moteur, _cache
+    from recommendation_logic_student import obtenir_moteur_recommandation
+    _moteur = obtenir_moteur_recommandation()
+    _cache = obtenir_cache_fragments(_moteur.kb_loader.version_contenu)
+
+
+def _recommandations(entree: Dict[str, Any]) -> Dict:
+    """Recommandations conservées (résolues dans la base), sinon calculées une fois par profil distinct"""
+    from schema_resultats import ResultatIncompatible, resoudre
+
+    if entree["recommandations"]:
+        if entree["recommandations"].get("mode") == "degrade":
+            return {"mode": "degrade"}
+        try:
+            return resoudre(entree["recommandations"], _moteur.kb_loader)
+        except (ResultatIncompatible, IndexError, KeyError):
+            # Résultat d'une autre version de la base : recalculé comme un profil seul
+            entree["analyse_ia"] = None
+
+    profil = entree["profil"]
+    cle = json.dumps({champ: valeur for champ, valeur in profil.items() if champ not in ("nom", "prenom")},
+                     sort_keys=True, ensure_ascii=False)
+    recommandations = _memo.get(cle)
+    if recommandations is None:
+        recommandations = _moteur.generer_recommandations(profil)
+        _memo[cle] = recommandations
+        while len(_memo) > TAILLE_MEMO_RECOMMANDATIONS:
+            _memo.popitem(last=False)
+    else:
+        _memo.move_to_end(cle)
+    return recommandations
+
+
+def rendre_lot(lot: List[Tuple[int, Dict[str, Any]]], date: str) -> List[Tuple[str, bytes]]:
+    """Rapports (nom de fichier, texte UTF-8) d'un lot d'élèves numérotés"""
+    from llm_interface import analyse_de_base
+
+    if _moteur is None:
+        _initialiser_processus()
+    rapports = []
+    for numero, entree in lot:
+        recommandations = _recommandations(entree)
+        analyse = entree["analyse_ia"] or analyse_de_base(entree["profil"], recommandations)
+        texte = generer_rapport(entree["profil"], recommandations, analyse, date, _cache)
+        rapports.append((nom_fichier_rapport(numero, entree["profil"]), texte.encode("utf-8")))
+    return rapports
+
+
+def _lots(entrees: Iterable[Dict[str, Any]], taille_lot: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    lot = []
+    for numero, entree in enumerate(entrees, 1):
+        lot.append((numero, entree))
+        if len(lot) == taille_lot:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def rendre_rapports(entrees: Iterable[Dict[str, Any]], nb_processus: int = 1,
+                    taille_lot: int = TAILLE_LOT_PAR_DEFAUT, date: Optional[str] = None) -> Iterator[Tuple[str, bytes]]:
+    """Rapports dans l'ordre des élèves, rendus par nb_processus processus.
+
+    Au plus LOTS_EN_VOL_PAR_PROCESSUS lots par processus sont en cours : les entrées sont
+    lues et les rapports produits au rythme de l'écriture, sans jamais tenir la classe en mémoire.
+    """
+    date = date or datetime.now().strftime('%d/%m/%Y à %H:%M')
+    lots = _lots(entrees, taille_lot)
+    if nb_processus <= 1:
+        for lot in lots:
+            yield from rendre_lot(lot, date)
+        return
+
+    # Moteur chargé avant la création des processus : hérité par fork, sinon chargé par chacun
+    _initialiser_processus()
+    with ProcessPoolExecutor(max_workers=nb_processus, initializer=_initialiser_processus) as executeur:
+        en_cours = deque()
+        for lot in lots:
+            en_cours.append(executeur.submit(rendre_lot, lot, date))
+            if len(en_cours) >= nb_processus * LOTS_EN_VOL_PAR_PROCESSUS:
+                yield from en_cours.popleft().result()
+        while en_cours:
+            yield from en_cours.popleft().result()
+
+
+def ecrire_zip(rapports: Iterable[Tuple[str, bytes]], sortie: BinaryIO) -> int:
+    """Archive ZIP écrite au fil des rapports (sortie non positionnable acceptée) ; nombre de rapports"""
+    nombre = 0
+    with zipfile.ZipFile(sortie, "w", zipfile.ZIP_DEFLATED, compresslevel=NIVEAU_COMPRESSION) as archive:
+        for nom, contenu in rapports:
+            archive.writestr(nom, contenu)
+            nombre += 1
+    return nombre
+
+
+def ecrire_document(rapports: Iterable[Tuple[str, bytes]], sortie: BinaryIO) -> int:
+    """Document texte unique, rapports séparés par un saut de page ; nombre de rapports"""
+    nombre = 0
+    separateur = SEPARATEUR_DOCUMENT.encode("utf-8")
+    for _, contenu in rapports:
+        if nombre:
+            sortie.write(separateur)
+        sortie.write(contenu)
+        nombre += 1
+    return nombre
+
+
+class _SortieComptee:
+    """Sortie binaire qui ne garde que le nombre d'octets écrits (mesures)"""
+
+    def __init__(self):
+        self.octets = 0
+
+    def write(self, donnees: bytes) -> int:
+        self.octets += len(donnees)
+        return len(donnees)
+
+    def flush(self) -> None:
+        pass
+
+
+def classe_synthetique(kb_loader, nb_eleves: int) -> Iterator[Dict[str, Any]]:
+    """Élèves fictifs : métiers de la base croisés avec les séries, noms numérotés"""
+    series = ["A1", "A2", "B", "C", "D", "E", "F1", "G2"]
+    metiers = [metier.nom_metier for metier in kb_loader.knowledge_base.metiers]
+    for numero in range(nb_eleves):
+        yield entree_depuis_profil({
+            "nom": f"Eleve{numero}",
+            "prenom": "Test",
+            "serie_bac": series[numero % len(series)],
+            "carriere_envisagee": metiers[(numero // len(series)) % len(metiers)]
+        })
+
+
+def mesurer_debit(nb_eleves: int, liste_processus: List[int], format_sortie: str = "zip",
+                  taille_lot: int = TAILLE_LOT_PAR_DEFAUT) -> List[Dict[str, Any]]:
+    """Rapports par seconde pour une classe fictive de nb_eleves, selon le nombre de processus"""
+    from recommendation_logic_student import obtenir_moteur_recommandation
+
+    kb_loader = obtenir_moteur_recommandation().kb_loader
+    ecrire = ecrire_zip if format_sortie == "zip" else ecrire_document
+    # Premier passage (index paresseux du moteur, blocs en cache) hors mesure
+    deque(rendre_rapports(classe_synthetique(kb_loader, taille_lot)), maxlen=0)
+    mesures = []
+    for nb_processus in liste_processus:
+        sortie = _SortieComptee()
+        debut = time.perf_counter()
+        nombre = ecrire(rendre_rapports(classe_synthetique(kb_loader, nb_eleves), nb_processus, taille_lot),
+                        sortie)
+        duree = time.perf_counter() - debut
+        mesures.append({
+            "processus": nb_processus,
+            "rapports": nombre,
+            "duree_s": round(duree, 2),
+            "rapports_par_s": round(nombre / duree),
+            "octets": sortie.octets
+        })
+    return mesures
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Exporte les rapports d'une classe (CSV ou JSONL) en ZIP ou en document unique, ou mesure le débit"""
+    analyseur = argparse.ArgumentParser(description="Export groupé des rapports d'orientation")
+    analyseur.add_argument("classe", nargs="?", help="fichier de la classe (.csv ou .jsonl)")
+    analyseur.add_argument("--sortie", default="-", help="fichier produit (- : sortie standard)")
+    analyseur.add_argument("--format", choices=["zip", "txt"], default="zip")
+    analyseur.add_argument("--processus", type=int, default=os.cpu_count() or 1)
+    analyseur.add_argument("--taille-lot", type=int, default=TAILLE_LOT_PAR_DEFAUT)
+    analyseur.add_argument("--mesurer", type=int, metavar="NB_ELEVES",
+                           help="débit sur une classe fictive (1 processus puis --processus)")
+    options = analyseur.parse_args(arguments)
+
+    if options.mesurer:
+        liste_processus = sorted({1, max(1, options.processus)})
+        print(f"{'processus':>10}{'rapports':>10}{'durée s':>10}{'rapports/s':>12}{'octets':>12}"
+              f"  ({os.cpu_count()} processeurs, format {options.format})")
+        for mesure in mesurer_debit(options.mesurer, liste_processus, options.format, options.taille_lot):
+            print(f"{mesure['processus']:>10}{mesure['rapports']:>10}{mesure['duree_s']:>10}"
+                  f"{mesure['rapports_par_s']:>12}{mesure['octets']:>12}")
+        return
+
+    if not options.classe:
+        analyseur.error("fichier de la classe manquant")
+    ecrire = ecrire_zip if options.format == "zip" else ecrire_document
+    debut = time.perf_counter()
+    rapports = rendre_rapports(lire_entrees(options.classe), options.processus, options.taille_lot)
+    if options.sortie == "-":
+        nombre = ecrire(rapports, sys.stdout.buffer)
+    else:
+        with open(options.sortie, "wb") as sortie:
+            nombre = ecrire(rapports, sortie)
+    duree = time.perf_counter() - debut
+    print(f"{nombre} rapports en {duree:.1f} s ({nombre / duree:.0f} rapports/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+"""
+Module modélisant les parcours d'études sous forme de graphe pondéré (durées en années)
+"""
+
+import heapq
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+from knowledge_base_loader import KnowledgeBaseLoader, serie_compatible
+from classificateur_texte import ClassificateurTexte
+from automate_motifs import normaliser_texte
+from autocompletion import RANG_DEMANDE
+
+# Un nœud est un couple (type, clé) : bac, filiere, diplome, formation, competence, metier
+Noeud = Tuple[str, object]
+Chemin = Tuple[float, List[Noeud]]
+
+DUREE_FORMATION_PAR_DEFAUT = 3
+
+# Années de formation complémentaire par compétence technique exigée restant à acquérir
+ANNEES_PAR_COMPETENCE_MANQUANTE = 1
+
+# Nombre de métiers cibles dont les plus courts chemins sont précalculés (les autres sont calculés à la demande)
+NB_CIBLES_PRECALCULEES = 64
+
+
+class GrapheParcours:
+    """Graphe métiers / compétences / filières / formations / diplômes pour le calcul de parcours"""
+
+    def __init__(self, knowledge_base_loader: KnowledgeBaseLoader,
+                 classificateur: Optional[ClassificateurTexte] = None):
+        """Construit le graphe à partir de la base de connaissances"""
+        self.kb_loader = knowledge_base_loader
+        self.classificateur = classificateur
+
+        self.adjacence: Dict[Noeud, List[Tuple[Noeud, float]]] = {}
+        self.adjacence_inverse: Dict[Noeud, List[Tuple[Noeud, float]]] = {}
+        self.exigences: Dict[Noeud, List[str]] = {}  # métier -> compétences techniques requises
+        self.libelles: Dict[Noeud, str] = {}
+        self.metiers_normalises: Dict[str, Noeud] = {}  # nom sans accents ni casse -> nœud métier
+        self.durees: Dict[Noeud, float] = {}
+
+        # Plus courts chemins précalculés vers les cibles fréquentes : cible -> {noeud: (distance, suivant)}
+        self.vers_cible: Dict[Noeud, Dict[Noeud, Tuple[float, Optional[Noeud]]]] = {}
+        self._recalcul: Optional[threading.Thread] = None
+        self._verrou_recalcul = threading.Lock()
+
+        self._construire()
+        self._precalculer_cibles_frequentes()
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def _ajouter_arc(self, origine: Noeud, destination: Noeud, poids: float) -> None:
+        """Ajoute un arc orienté (et son inverse pour les recherches vers une cible)"""
+        self.adjacence.setdefault(origine, []).append((destination, poids))
+        self.adjacence_inverse.setdefault(destination, []).append((origine, poids))
+        self.adjacence_inverse.setdefault(origine, [])
+        self.adjacence.setdefault(destination, [])
+
+    def _noeud_metier(self, nom_metier: str) -> Noeud:
+        """Retourne (et enregistre) le nœud d'un métier"""
+        noeud = ("metier", nom_metier.strip().lower())
+        self.libelles.setdefault(noeud, nom_metier.strip())
+        self.metiers_normalises.setdefault(self._normaliser(nom_metier), noeud)
+        return noeud
+
+    @staticmethod
+    def _normaliser(texte: str) -> str:
+        """Nom comparable : sans accents, casse ni espaces superflus"""
+        return " ".join(normaliser_texte(texte).split())
+
+    def _construire(self) -> None:
+        """Crée les nœuds et les arcs du graphe"""
+        kb = self.kb_loader.knowledge_base
+        if not kb:
+            return
+
+        competences = {("competence", c.nom_competence.lower()): c.nom_competence for c in kb.competences}
+        self.libelles.update(competences)
+
+        # Exigences des métiers : une compétence technique requise y mène, après formation aux autres
+        # (les compétences transversales, communes à tous les métiers, n'y donnent pas accès)
+        for metier in kb.metiers:
+            noeud_metier = self._noeud_metier(metier.nom_metier)
+            self.exigences[noeud_metier] = metier.competences_requises_techniques
+            for requise in metier.competences_requises_techniques:
+                noeud_competence = ("competence", requise.lower())
+                if noeud_competence in competences:
+                    manquantes = len(metier.competences_requises_techniques) - 1
+                    self._ajouter_arc(noeud_competence, noeud_metier,
+                                      max(1, manquantes * ANNEES_PAR_COMPETENCE_MANQUANTE))
+
+        filieres = []
+        noeuds_par_position: Dict[Tuple[int, int, int], Noeud] = {}
+        series: Set[str] = set()
+        for i, universite in enumerate(kb.universites):
+            for j, faculte in enumerate(universite.facultes_ecoles):
+                for k, filiere in enumerate(faculte.filieres):
+                    noeud = ("filiere", (universite.nom_universite, faculte.nom_faculte_ecole, filiere.nom_filiere))
+                    self.libelles[noeud] = (
+                        f"{filiere.nom_filiere} ({faculte.nom_faculte_ecole}, "
+                        f"{universite.sigle or universite.nom_universite})"
+                    )
+                    self.durees[noeud] = filiere.duree_etudes_ans
+                    filieres.append((noeud, filiere))
+                    noeuds_par_position[(i, j, k)] = noeud
+                    series.update(s.split()[0] for s in filiere.series_bac_requises if s and s != "Toutes")
+
+        for noeud, filiere in filieres:
+            # Les filières de second cycle exigent un diplôme préalable plutôt que le BAC
+            exige_licence = "licence" in filiere.conditions_admission_texte.lower()
+
+            if not exige_licence:
+                for serie in series:
+                    if serie_compatible(serie, filiere.series_bac_requises):
+                        self._ajouter_arc(("bac", serie), noeud, filiere.duree_etudes_ans)
+
+            diplome = ("diplome", filiere.diplome_delivre.strip().lower())
+            self.libelles.setdefault(diplome, filiere.diplome_delivre.strip())
+            self._ajouter_arc(noeud, diplome, 0)
+
+            # Métiers visés tels que cités par la filière
+            for metier_vise in filiere.metiers_vises_typiques:
+                self._ajouter_arc(noeud, self._noeud_metier(metier_vise), 0)
+
+            # Compétences développées par la filière (passerelles)
+            texte = f"{filiere.nom_filiere} {filiere.description_filiere}".lower()
+            for noeud_competence in competences:
+                if noeud_competence[1] in texte:
+                    self._ajouter_arc(noeud, noeud_competence, 0)
+                    # Une compétence acquise permet d'intégrer une autre filière avec une année validée
+                    self._ajouter_arc(noeud_competence, noeud, max(1, filiere.duree_etudes_ans - 1))
+
+        # Métiers de la base cités dans un métier visé (« Médecin » dans « Médecin généraliste ») :
+        # filières données par l'index du chargeur, sans comparer chaque métier visé à chaque métier
+        for metier in kb.metiers:
+            noeud_metier = self._noeud_metier(metier.nom_metier)
+            positions = self.kb_loader.index_filieres_par_metier.get(normaliser_texte(metier.nom_metier).strip(), ())
+            for position in sorted(positions):
+                noeud = noeuds_par_position[position]
+                if all(voisin != noeud_metier for voisin, _ in self.adjacence[noeud]):
+                    self._ajouter_arc(noeud, noeud_metier, 0)
+
+        # Passerelles par diplôme : une licence ouvre les filières de second cycle
+        licences = [n for n in self.adjacence if n[0] == "diplome" and n[1].startswith("licence")]
+        for noeud, filiere in filieres:
+            if "licence" in filiere.conditions_admission_texte.lower():
+                for diplome in licences:
+                    self._ajouter_arc(diplome, noeud, filiere.duree_etudes_ans)
+
+        # Formations générales : accessibles aux séries qui mènent déjà à leurs métiers
+        for formation in kb.formations_generales:
+            noeud = ("formation", formation.nom_formation_generale.lower())
+            self.libelles[noeud] = formation.nom_formation_generale
+            duree = re.search(r'(\d+)\s*ans', formation.description)
+            self.durees[noeud] = int(duree.group(1)) if duree else DUREE_FORMATION_PAR_DEFAUT
+
+            metiers_prepares = [self._noeud_metier(m) for m in formation.metiers_prepares]
+            for noeud_metier in metiers_prepares:
+                self._ajouter_arc(noeud, noeud_metier, 0)
+
+            series_formation = {
+                origine[1]
+                for noeud_metier in metiers_prepares
+                for filiere_noeud, _ in self.adjacence_inverse.get(noeud_metier, [])
+                for origine, _ in self.adjacence_inverse.get(filiere_noeud, [])
+                if origine[0] == "bac"
+            } or series
+            for serie in series_formation:
+                self._ajouter_arc(("bac", serie), noeud, self.durees[noeud])
+
+    def _cibles_frequentes(self, demandes: Optional[Dict[str, int]] = None) -> List[Noeud]:
+        """Métiers cibles à précalculer, au plus NB_CIBLES_PRECALCULEES"""
+        kb = self.kb_loader.knowledge_base
+        if not kb:
+            return []
+
+        # Carrières les plus demandées (saisies libres ramenées aux métiers du graphe, comptes cumulés),
+        # puis métiers clés des secteurs porteurs, puis demande du marché
+        comptes: Counter = Counter()
+        for carriere, nombre in (demandes or {}).items():
+            noeud = self.trouver_noeud_metier(carriere)
+            if noeud:
+                comptes[noeud] += nombre
+        candidats = [noeud for noeud, _ in comptes.most_common()]
+        for secteur in kb.secteurs_porteurs:
+            candidats.extend(("metier", m.strip().lower()) for m in secteur.metiers_cles)
+        candidats.extend(
+            ("metier", m.nom_metier.strip().lower())
+            for m in sorted(kb.metiers, key=lambda m: RANG_DEMANDE.get(m.niveau_demande_marche, len(RANG_DEMANDE)))
+        )
+
+        cibles: List[Noeud] = []
+        for noeud in candidats:
+            if noeud in self.adjacence and noeud not in cibles:
+                cibles.append(noeud)
+                if len(cibles) == NB_CIBLES_PRECALCULEES:
+                    break
+        return cibles
+
+    def _precalculer_cibles_frequentes(self, demandes: Optional[Dict[str, int]] = None) -> None:
+        """Précalcule les plus courts chemins de tous les nœuds vers les métiers fréquents"""
+        vers_cible = {
+            cible: self.vers_cible.get(cible) or self._dijkstra_inverse(cible)
+            for cible in self._cibles_frequentes(demandes)
+        }
+        # Remplacement en une fois : les recherches en cours gardent l'ancien précalcul
+        self.vers_cible = vers_cible
+
+    def ajuster_cibles_frequentes(self, demandes: Dict[str, int]) -> bool:
+        """Recentre le précalcul sur les carrières les plus demandées (nombre de demandes par carrière)
+
+        Le recalcul tourne dans un thread d'arrière-plan, un seul à la fois : retourne False
+        s'il est déjà en cours (les nouvelles demandes seront prises en compte au suivant).
+        """
+        with self._verrou_recalcul:
+            if self._recalcul is not None and self._recalcul.is_alive():
+                return False
+            self._recalcul = threading.Thread(target=self._recalculer, args=(dict(demandes),),
+                                              name="graphe-cibles-frequentes", daemon=True)
+            self._recalcul.start()
+            return True
+
+    def _recalculer(self, demandes: Dict[str, int]) -> None:
+        """Corps du thread de recalcul"""
+        try:
+            self._precalculer_cibles_frequentes(demandes)
+        except Exception as e:
+            print(f"Erreur lors du précalcul des parcours fréquents : {e}")
+
+    # ------------------------------------------------------------------
+    # Algorithmes
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _traversable(noeud: Noeud) -> bool:
+        """Un métier est une fin de parcours : on ne repart pas d'un métier"""
+        return noeud[0] != "metier"
+
+    def _dijkstra_inverse(self, cible: Noeud) -> Dict[Noeud, Tuple[float, Optional[Noeud]]]:
+        """Distances de chaque nœud vers la cible, avec le prochain nœud à emprunter"""
+        resultats: Dict[Noeud, Tuple[float, Optional[Noeud]]] = {cible: (0.0, None)}
+        file = [(0.0, cible)]
+        visites = set()
+
+        while file:
+            distance, noeud = heapq.heappop(file)
+            if noeud in visites:
+                continue
+            visites.add(noeud)
+
+            for precedent, poids in self.adjacence_inverse.get(noeud, []):
+                if not self._traversable(precedent):
+                    continue
+                nouvelle = distance + poids
+                if precedent not in resultats or nouvelle < resultats[precedent][0]:
+                    resultats[precedent] = (nouvelle, noeud)
+                    heapq.heappush(file, (nouvelle, precedent))
+
+        return resultats
+
+    def _dijkstra(self, depart: Noeud, cible: Noeud, noeuds_exclus: Set[Noeud] = frozenset(),
+                  arcs_exclus: Set[Tuple[Noeud, Noeud]] = frozenset()) -> Optional[Chemin]:
+        """Plus court chemin entre deux nœuds, en ignorant certains nœuds et arcs"""
+        distances = {depart: 0.0}
+        precedents: Dict[Noeud, Noeud] = {}
+        file = [(0.0, depart)]
+
+        while file:
+            distance, noeud = heapq.heappop(file)
+            if noeud == cible:
+                chemin = [cible]
+                while chemin[-1] != depart:
+                    chemin.append(precedents[chemin[-1]])
+                return distance, chemin[::-1]
+            if distance > distances.get(noeud, float("inf")):
+                continue
+            if noeud != depart and not self._traversable(noeud):
+                continue
+
+            for voisin, poids in self.adjacence.get(noeud, []):
+                if voisin in noeuds_exclus or (noeud, voisin) in arcs_exclus:
+                    continue
+                nouvelle = distance + poids
+                if nouvelle < distances.get(voisin, float("inf")):
+                    distances[voisin] = nouvelle
+                    precedents[voisin] = noeud
+                    heapq.heappush(file, (nouvelle, voisin))
+
+        return None
+
+    def _poids(self, origine: Noeud, destination: Noeud) -> float:
+        """Poids minimal de l'arc origine -> destination"""
+        return min(poids for voisin, poids in self.adjacence[origine] if voisin == destination)
+
+    def plus_court_chemin(self, depart: Noeud, cible: Noeud) -> Optional[Chemin]:
+        """Plus court chemin, servi depuis le précalcul lorsque la cible est fréquente"""
+        precalcul = self.vers_cible.get(cible)
+        if precalcul is None:
+            return self._dijkstra(depart, cible)
+
+        if depart not in precalcul:
+            return None
+
+        chemin = [depart]
+        while chemin[-1] != cible:
+            chemin.append(precalcul[chemin[-1]][1])
+        return precalcul[depart][0], chemin
+
+    def k_plus_courts_chemins(self, depart: Noeud, cible: Noeud, k: int = 3) -> List[Chemin]:
+        """Les k meilleurs chemins simples (algorithme de Yen)"""
+        premier = self.plus_court_chemin(depart, cible)
+        if not premier:
+            return []
+
+        retenus = [premier]
+        candidats: List[Chemin] = []
+        vus = {tuple(premier[1])}
+
+        while len(retenus) < k:
+            _, dernier = retenus[-1]
+            for i in range(len(dernier) - 1):
+                racine = dernier[:i + 1]
+                cout_racine = sum(self._poids(racine[j], racine[j + 1]) for j in range(i))
+
+                arcs_exclus = {
+                    (chemin[i], chemin[i + 1])
+                    for _, chemin in retenus
+                    if len(chemin) > i + 1 and chemin[:i + 1] == racine
+                }
+                deviation = self._dijkstra(racine[-1], cible, set(racine[:-1]), arcs_exclus)
+                if deviation:
+                    chemin_complet = racine[:-1] + deviation[1]
+                    if tuple(chemin_complet) not in vus:
+                        vus.add(tuple(chemin_complet))
+                        heapq.heappush(candidats, (cout_racine + deviation[0], chemin_complet))
+
+            if not candidats:
+                break
+            retenus.append(heapq.heappop(candidats))
+
+        return retenus
+
+    # ------------------------------------------------------------------
+    # Requêtes métier
+    # ------------------------------------------------------------------
+
+    def trouver_noeud_metier(self, carriere: str) -> Optional[Noeud]:
+        """Associe une carrière saisie librement à un nœud métier du graphe"""
+        # Nom du graphe aux accents et à la casse près (« medecin »), puis recherche du chargeur
+        noeud = self.metiers_normalises.get(self._normaliser(carriere))
+        if noeud in self.adjacence:
+            return noeud
+        metier = self.kb_loader.rechercher_metier(carriere)
+        noeud = ("metier", (metier.nom_metier if metier else carriere).strip().lower())
+        return noeud if noeud in self.adjacence else None
+
+    def trouver_noeuds_filiere(self, filiere_actuelle: str) -> List[Noeud]:
+        """Associe une filière saisie librement aux filières du catalogue"""
+        # Reconnaissance exacte des noms du catalogue, puis mots en commun à défaut
+        if self.classificateur:
+            noeuds = [("filiere", cle) for cle in self.classificateur.filieres(filiere_actuelle)]
+            if noeuds:
+                return noeuds
+
+        mots_saisie = set(re.findall(r'\w{3,}', filiere_actuelle.lower()))
+        scores = []
+        for noeud in self.durees:
+            if noeud[0] != "filiere":
+                continue
+            mots_filiere = set(re.findall(r'\w{3,}', noeud[1][2].lower()))
+            communs = mots_saisie & mots_filiere
+            if communs:
+                scores.append((len(communs) / len(mots_filiere), noeud))
+
+        if not scores:
+            return []
+        meilleur = max(score for score, _ in scores)
+        return [noeud for score, noeud in scores if score == meilleur]
+
+    def parcours_lyceen(self, serie_bac: str, carriere: str, k: int = 3) -> List[Chemin]:
+        """Parcours datés du BAC jusqu'au métier visé"""
+        cible = self.trouver_noeud_metier(carriere)
+        if not serie_bac or not cible:
+            return []
+        return self.k_plus_courts_chemins(("bac", serie_bac.split()[0]), cible, k)
+
+    def passerelle_etudiant(self, filiere_actuelle: str, carriere: str) -> Optional[Chemin]:
+        """Passerelle la moins coûteuse depuis la filière actuelle de l'étudiant"""
+        cible = self.trouver_noeud_metier(carriere)
+        if not filiere_actuelle or not cible:
+            return None
+
+        chemins = [
+            chemin for chemin in (
+                self.plus_court_chemin(depart, cible)
+                for depart in self.trouver_noeuds_filiere(filiere_actuelle)
+            ) if chemin
+        ]
+        return min(chemins, key=lambda c: c[0]) if chemins else None
+
+    def decrire_etapes(self, chemin: List[Noeud], filiere_en_cours: bool = False) -> List[str]:
+        """Traduit un chemin en étapes lisibles et numérotées"""
+        etapes = []
+        for position, noeud in enumerate(chemin):
+            libelle = self.libelles.get(noeud, str(noeud[1]))
+            if position == 0 and filiere_en_cours and noeud[0] == "filiere":
+                etapes.append(f"Terminer votre filière actuelle : {libelle}")
+            elif noeud[0] == "bac":
+                etapes.append(f"Réussir le BAC série {noeud[1]}")
+            elif noeud[0] == "filiere":
+                etapes.append(f"Suivre la filière {libelle} - {self.durees[noeud]} ans")
+            elif noeud[0] == "formation":
+                etapes.append(f"Suivre la formation {libelle} - {self.durees[noeud]} ans")
+            elif noeud[0] == "diplome":
+                etapes.append(f"Obtenir le diplôme : {libelle}")
+            elif noeud[0] == "competence" and position + 1 < len(chemin) and chemin[position + 1][0] == "metier":
+                metier = chemin[position + 1]
+                autres = [c for c in self.exigences.get(metier, []) if c.lower() != noeud[1]]
+                etapes.append(
+                    f"Compléter la compétence acquise en {libelle} par les autres compétences exigées "
+                    f"({', '.join(autres)}) - {self._poids(noeud, metier)} ans"
+                )
+            elif noeud[0] == "competence":
+                etapes.append(f"Faire valoir la compétence acquise en {libelle} (passerelle)")
+            elif noeud[0] == "metier":
+                etapes.append(f"Exercer le métier : {libelle}")
+
+        return [f"{i}. {etape}" for i, etape in enumerate(etapes, 1)]
@@ -2,11 +2,15 @@
 Module pour charger et interroger la base de connaissances knowledge_base_benin_v2.json
 """
 
+import hashlib
 import json
 import os
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Tuple
 from pydantic import BaseModel, Field
 import streamlit as st
+from automate_motifs import AutomateMotifs, normaliser_texte
+from autocompletion import SYNONYMES_METIERS, IndexAutocompletion
+from profilage import PROFILEUR
 
 class Metier(BaseModel):
     """Modèle de données pour un métier"""
@@ -67,11 +71,32 @@ class Universite(BaseModel):
 
 class KnowledgeBase(BaseModel):
     """Modèle de données pour la base de connaissances complète"""
+    version: str = ""
     metiers: List[Metier] = Field(default_factory=list)
     secteurs_porteurs: List[SecteurPorteur] = Field(default_factory=list)
     competences: List[Competence] = Field(default_factory=list)
     formations_generales: List[FormationGenerale] = Field(default_factory=list)
     universites: List[Universite] = Field(default_factory=list)
+    informations_pratiques: Dict[str, Any] = Field(default_factory=dict)
+
+def est_faculte_classique(nom_faculte_ecole: str) -> bool:
+    """Indique si un établissement est une Faculté Classique (et non une école ou un institut)"""
+    return nom_faculte_ecole.strip().lower().startswith("faculté")
+
+def serie_compatible(serie_bac: Optional[str], series_bac_requises: List[str]) -> bool:
+    """Vérifie qu'une série de BAC est acceptée par une filière"""
+    if not serie_bac or not series_bac_requises:
+        return True
+    # Extraire la lettre de la série (ex: "D" depuis "D (Mathématiques-Sciences Naturelles)")
+    serie_lettre = serie_bac.split()[0]
+    return (
+        any(serie_lettre in serie_req for serie_req in series_bac_requises) or
+        "Toutes" in str(series_bac_requises)
+    )
+
+def identifiant_universite(universite: Universite) -> str:
+    """Identifiant stable d'une université (indépendant de sa position dans le fichier)"""
+    return normaliser_texte(f"{universite.sigle}|{universite.nom_universite}").strip()
 
 class KnowledgeBaseLoader:
     """Classe pour charger et interroger la base de connaissances"""
@@ -94,8 +119,28 @@ class KnowledgeBaseLoader:
             self.fichier_path = fichier_path
             
         self.knowledge_base: Optional[KnowledgeBase] = None
+        # Version déclarée + empreinte du fichier : change dès que le contenu de la base change
+        self.version_contenu: str = ""
+        # Index métier (normalisé) -> positions (université, faculté, filière) des filières qui y préparent
+        self.index_filieres_par_metier: Dict[str, Set[Tuple[int, int, int]]] = {}
+        # Métier visé (normalisé) -> positions des filières qui le citent
+        self.filieres_par_metier_vise: Dict[str, Set[Tuple[int, int, int]]] = {}
+        # Identifiants des entités (positions dans la base, valables pour version_contenu)
+        self.positions_metiers: Dict[str, int] = {}
+        self.positions_universites: Dict[Tuple[str, str], int] = {}
+        self.filieres_par_id: List[Tuple[int, int, int]] = []
+        self.ids_filieres: Dict[Tuple[int, str, str], int] = {}
+        # Autocomplétion de la carrière envisagée (métiers, métiers visés et préparés, synonymes)
+        self.index_carrieres = IndexAutocompletion([])
+        # Statistiques de la page d'accueil, calculées une fois au chargement
+        self.statistiques: Dict[str, int] = {}
         self.charger_base_connaissances()
+        self._indexer_metiers_vises()
+        self._indexer_entites()
+        self._indexer_carrieres()
+        self.statistiques = self._calculer_statistiques()
     
+    @PROFILEUR.mesurer("kb.charger_base_connaissances")
     def charger_base_connaissances(self) -> None:
         """Charge la base de connaissances depuis le fichier JSON"""
         try:
@@ -103,8 +148,10 @@ class KnowledgeBaseLoader:
                 # Créer un fichier exemple si n'existe pas
                 self.creer_fichier_exemple()
             
-            with open(self.fichier_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(self.fichier_path, 'rb') as f:
+                contenu = f.read()
+            data = json.loads(contenu.decode('utf-8'))
+            self.version_contenu = f"{data.get('version', '')}-{hashlib.sha256(contenu).hexdigest()[:12]}"
             
             # Conversion des données en objets Pydantic avec gestion d'erreur
             try:
@@ -133,9 +180,102 @@ class KnowledgeBaseLoader:
                 print(f"❌ Erreur lors du chargement : {e}")
             self.knowledge_base = KnowledgeBase()
     
+    def _indexer_metiers_vises(self) -> None:
+        """Indexe les filières par métier visé en une seule passe d'automate sur les métiers visés distincts"""
+        self.index_filieres_par_metier = {}
+        self.filieres_par_metier_vise = {}
+        if not self.knowledge_base:
+            return
+        
+        # Métiers visés normalisés une fois : clés exactes, parcourues aussi pour les métiers inconnus
+        for i, universite in enumerate(self.knowledge_base.universites):
+            for j, faculte in enumerate(universite.facultes_ecoles):
+                for k, filiere in enumerate(faculte.filieres):
+                    for metier_vise in filiere.metiers_vises_typiques:
+                        self.filieres_par_metier_vise.setdefault(
+                            normaliser_texte(metier_vise).strip(), set()
+                        ).add((i, j, k))
+        
+        # Motifs distincts : noms des métiers de la base et métiers visés eux-mêmes
+        motifs = {normaliser_texte(metier.nom_metier).strip() for metier in self.knowledge_base.metiers}
+        motifs.update(self.filieres_par_metier_vise)
+        automate = AutomateMotifs()
+        automate.ajouter_tous((motif, motif) for motif in motifs)
+        automate.compiler()
+        
+        for metier_vise, positions in self.filieres_par_metier_vise.items():
+            for motif in automate.valeurs(metier_vise):
+                self.index_filieres_par_metier.setdefault(motif, set()).update(positions)
+    
+    def _indexer_entites(self) -> None:
+        """Numérote métiers, universités et filières pour les résultats compacts"""
+        self.positions_metiers = {}
+        self.positions_universites = {}
+        self.filieres_par_id = []
+        self.ids_filieres = {}
+        if not self.knowledge_base:
+            return
+        
+        for position, metier in enumerate(self.knowledge_base.metiers):
+            self.positions_metiers.setdefault(metier.nom_metier, position)
+        for i, universite in enumerate(self.knowledge_base.universites):
+            self.positions_universites.setdefault((universite.sigle, universite.nom_universite), i)
+            for j, faculte in enumerate(universite.facultes_ecoles):
+                for k, filiere in enumerate(faculte.filieres):
+                    self.ids_filieres.setdefault((i, faculte.nom_faculte_ecole, filiere.nom_filiere),
+                                                 len(self.filieres_par_id))
+                    self.filieres_par_id.append((i, j, k))
+    
+    @PROFILEUR.mesurer("kb.indexer_carrieres")
+    def _indexer_carrieres(self) -> None:
+        """Construit l'index d'autocomplétion de toutes les carrières citées par la base"""
+        if not self.knowledge_base:
+            return
+        
+        libelles = [(metier.nom_metier, metier.niveau_demande_marche) for metier in self.knowledge_base.metiers]
+        for universite in self.knowledge_base.universites:
+            for faculte in universite.facultes_ecoles:
+                for filiere in faculte.filieres:
+                    libelles.extend((metier_vise, "") for metier_vise in filiere.metiers_vises_typiques)
+        for formation in self.knowledge_base.formations_generales:
+            libelles.extend((metier, "") for metier in formation.metiers_prepares)
+        for secteur in self.knowledge_base.secteurs_porteurs:
+            libelles.extend((metier, "") for metier in secteur.metiers_cles)
+        self.index_carrieres = IndexAutocompletion(libelles, SYNONYMES_METIERS)
+    
+    def filiere_recommandee(self, i: int, j: int, k: int) -> Dict:
+        """Filière (avec sa faculté) telle que listée dans une université recommandée"""
+        faculte = self.knowledge_base.universites[i].facultes_ecoles[j]
+        return {"faculte": faculte.nom_faculte_ecole, **faculte.filieres[k].dict()}
+    
+    def universite_recommandee(self, i: int, filieres: List[Dict]) -> Dict:
+        """Université recommandée avec son identifiant stable et ses filières compatibles"""
+        universite = self.knowledge_base.universites[i]
+        return {
+            **universite.dict(),
+            "id_universite": identifiant_universite(universite),
+            "filieres_recommandees": filieres
+        }
+    
+    def filiere_accessible(self, i: int, j: int, k: int) -> Dict:
+        """Filière accompagnée des informations de son université et de sa faculté"""
+        universite = self.knowledge_base.universites[i]
+        faculte = universite.facultes_ecoles[j]
+        return {
+            "nom_universite": universite.nom_universite,
+            "sigle": universite.sigle,
+            "statut": universite.statut,
+            "faculte": faculte.nom_faculte_ecole,
+            "faculte_classique": est_faculte_classique(faculte.nom_faculte_ecole),
+            **faculte.filieres[k].dict()
+        }
+    
     def _load_raw_data(self, data: Dict) -> KnowledgeBase:
         """Charge les données même si elles ne sont pas parfaitement structurées"""
-        kb = KnowledgeBase()
+        kb = KnowledgeBase(
+            version=str(data.get('version', '')),
+            informations_pratiques=data.get('informations_pratiques') or {}
+        )
         
         # Chargement avec gestion d'erreur pour chaque section
         if 'metiers' in data:
@@ -276,6 +416,7 @@ class KnowledgeBaseLoader:
         
         st.info(f"Fichier exemple créé : {self.fichier_path}")
     
+    @PROFILEUR.mesurer("kb.rechercher_metier")
     def rechercher_metier(self, nom_metier: str) -> Optional[Metier]:
         """Recherche un métier par nom (recherche floue)"""
         if not self.knowledge_base:
@@ -295,6 +436,7 @@ class KnowledgeBaseLoader:
         
         return None
     
+    @PROFILEUR.mesurer("kb.rechercher_metiers_par_secteur")
     def rechercher_metiers_par_secteur(self, secteur: str) -> List[Metier]:
         """Recherche les métiers d'un secteur donné"""
         if not self.knowledge_base:
@@ -309,50 +451,57 @@ class KnowledgeBaseLoader:
         
         return metiers_secteur
     
+    @PROFILEUR.mesurer("kb.rechercher_universites_pour_metier")
     def rechercher_universites_pour_metier(self, nom_metier: str, serie_bac: Optional[str] = None) -> List[Dict]:
         """Recherche les universités et filières pour un métier donné"""
         if not self.knowledge_base:
             return []
         
-        resultats = []
-        nom_metier_lower = nom_metier.lower()
+        nom_metier_normalise = normaliser_texte(nom_metier).strip()
+        universites = self.knowledge_base.universites
         
-        for universite in self.knowledge_base.universites:
-            filieres_compatibles = []
-            
-            for faculte in universite.facultes_ecoles:
-                for filiere in faculte.filieres:
-                    # Vérifier si la filière prépare au métier
-                    metier_compatible = any(
-                        nom_metier_lower in metier_vise.lower() 
-                        for metier_vise in filiere.metiers_vises_typiques
-                    )
-                    
-                    if metier_compatible:
-                        # Vérifier la compatibilité avec la série de BAC
-                        serie_compatible = True
-                        if serie_bac and filiere.series_bac_requises:
-                            # Extraire la lettre de la série (ex: "D" depuis "D (Mathématiques-Sciences Naturelles)")
-                            serie_lettre = serie_bac.split()[0] if serie_bac else ""
-                            serie_compatible = (
-                                any(serie_lettre in serie_req for serie_req in filiere.series_bac_requises) or
-                                "Toutes" in str(filiere.series_bac_requises)
-                            )
-                        
-                        if serie_compatible:
-                            filieres_compatibles.append({
-                                "faculte": faculte.nom_faculte_ecole,
-                                **filiere.dict()
-                            })
-            
-            if filieres_compatibles:
-                resultats.append({
-                    **universite.dict(),
-                    "filieres_recommandees": filieres_compatibles
-                })
+        # Filières préparant au métier : index d'abord, parcours complet pour les métiers inconnus
+        positions = self.index_filieres_par_metier.get(nom_metier_normalise)
+        if positions is not None:
+            PROFILEUR.compter("kb.index_metiers.acces")
+        else:
+            PROFILEUR.compter("kb.index_metiers.parcours_complet")
+            positions = set()
+            for metier_vise, positions_metier_vise in self.filieres_par_metier_vise.items():
+                if nom_metier_normalise in metier_vise:
+                    positions.update(positions_metier_vise)
+        
+        filieres_par_universite: Dict[int, List[Dict]] = {}
+        for i, j, k in sorted(positions):
+            filiere = universites[i].facultes_ecoles[j].filieres[k]
+            if serie_compatible(serie_bac, filiere.series_bac_requises):
+                filieres_par_universite.setdefault(i, []).append(self.filiere_recommandee(i, j, k))
         
-        return resultats
+        return [
+            self.universite_recommandee(i, filieres_compatibles)
+            for i, filieres_compatibles in filieres_par_universite.items()
+        ]
     
+    @PROFILEUR.mesurer("kb.rechercher_filieres_par_serie")
+    def rechercher_filieres_par_serie(self, serie_bac: Optional[str] = None) -> List[Dict]:
+        """Liste toutes les filières accessibles avec une série de BAC donnée"""
+        if not self.knowledge_base:
+            return []
+        
+        universites = self.knowledge_base.universites
+        return [
+            self.filiere_accessible(i, j, k)
+            for i, j, k in self.filieres_par_id
+            if serie_compatible(serie_bac, universites[i].facultes_ecoles[j].filieres[k].series_bac_requises)
+        ]
+    
+    def get_regles_importantes(self) -> List[str]:
+        """Retourne les règles officielles d'inscription (plateforme apresmonbac)"""
+        if not self.knowledge_base:
+            return []
+        return list(self.knowledge_base.informations_pratiques.get("regles_importantes", []))
+    
+    @PROFILEUR.mesurer("kb.get_metiers_alternatifs")
     def get_metiers_alternatifs(self, metier_principal: str, limite: int = 5) -> List[Metier]:
         """Propose des métiers alternatifs basés sur le secteur ou les compétences"""
         if not self.knowledge_base:
@@ -383,7 +532,11 @@ class KnowledgeBaseLoader:
         return alternatives[:limite]
     
     def get_statistics(self) -> Dict[str, int]:
-        """Retourne des statistiques sur la base de données"""
+        """Retourne des statistiques sur la base de données (calculées au chargement)"""
+        return dict(self.statistiques)
+    
+    def _calculer_statistiques(self) -> Dict[str, int]:
+        """Compte métiers, universités, secteurs, compétences, formations et filières"""
         if not self.knowledge_base:
             return {}
         
@@ -402,6 +555,7 @@ class KnowledgeBaseLoader:
             "nb_filieres": nb_filieres
         }
     
+    @PROFILEUR.mesurer("kb.valider_base_connaissances")
     def valider_base_connaissances(self) -> Dict[str, List[str]]:
         """Valide la base de connaissances et retourne les erreurs trouvées"""
         erreurs = {"avertissements": [], "erreurs": []}
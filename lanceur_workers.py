@@ -0,0 +1,277 @@
+"""
+Module de déploiement multi-workers : préchargement, sondes de santé et de disponibilité, redémarrage progressif
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Valeurs par défaut (les ports suivent supervisord.conf et haproxy.cfg : worker i sur 8510 + i)
+CONFIG_WORKERS_PAR_DEFAUT = {
+    "nb_workers": 4,
+    "port_base": 8510,          # port Streamlit du worker i : port_base + i
+    "port_etat_base": 9510,     # sondes /sante et /pret du worker i : port_etat_base + i
+    "delai_drainage": 10,       # secondes laissées au proxy pour retirer un worker avant son arrêt
+    "delai_pret_max": 120       # attente maximale de la disponibilité d'un worker redémarré
+}
+
+# Réponses mises en mémoire au démarrage (les plus récemment servies par les autres workers)
+NB_REPONSES_PRECHARGEES = 256
+
+# Nom des workers dans supervisord.conf (groupe:programme_numéro)
+PROGRAMME_SUPERVISORD = "mode_workers:orientation_worker_{}"
+
+
+def profils_representatifs(kb_loader, nombre: int = 12) -> List[Dict]:
+    """Profils variés (une série par métier) servant au préchauffage et aux mesures"""
+    series = ["A1", "A2", "B", "C", "D", "E", "F1", "G2"]
+    metiers = kb_loader.knowledge_base.metiers if kb_loader.knowledge_base else []
+    pas = max(1, len(metiers) // nombre) if metiers else 1
+    return [
+        {"statut": "Élève (Futur Bachelier)", "serie_bac": series[i % len(series)], "filiere_actuelle": None,
+         "carriere_envisagee": metier.nom_metier, "notes": {}}
+        for i, metier in enumerate(metiers[::pas][:nombre])
+    ]
+
+
+def precharger() -> Dict[str, Any]:
+    """Charge dans le processus ce que les sessions partagent : modules, base, index, caches"""
+    mesures = {}
+    debut = time.perf_counter()
+
+    import app_student  # noqa: F401  (Streamlit et les modules du premier affichage)
+    from demarrage import lancer_chargement
+    mesures["imports_s"] = round(time.perf_counter() - debut, 3)
+
+    # Modules différés par l'application et base : chargés ici avant la première session
+    etape = time.perf_counter()
+    moteur = lancer_chargement().attendre()
+    from llm_interface import LLMInterface
+    from schema_resultats import compacter
+    mesures["base_s"] = round(time.perf_counter() - etape, 3)
+    mesures["version_kb"] = moteur.kb_loader.version_contenu
+
+    etape = time.perf_counter()
+    llm_interface = LLMInterface(moteur.kb_loader.version_contenu)
+    mesures["reponses_prechargees"] = (
+        llm_interface.cache.precharger(NB_REPONSES_PRECHARGEES) if llm_interface.cache else 0
+    )
+    mesures["caches_s"] = round(time.perf_counter() - etape, 3)
+
+    # Premier passage dans le moteur (chemins de code, index paresseux) hors de toute session
+    etape = time.perf_counter()
+    for profil in profils_representatifs(moteur.kb_loader):
+        compacter(moteur.generer_recommandations(profil), moteur.kb_loader)
+    mesures["moteur_s"] = round(time.perf_counter() - etape, 3)
+
+    mesures["total_s"] = round(time.perf_counter() - debut, 3)
+    return mesures
+
+
+class EtatWorker:
+    """Disponibilité d'un worker : préchargé, Streamlit à l'écoute et pas en cours de drainage"""
+
+    def __init__(self, port_streamlit: int):
+        self.port_streamlit = port_streamlit
+        self.precharge: Optional[Dict[str, Any]] = None
+        self.drainage = False
+        self.debut = time.time()
+
+    def streamlit_repond(self) -> bool:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{self.port_streamlit}/_stcore/health", timeout=1) as r:
+                return r.status == 200
+        except OSError:
+            return False
+
+    def pret(self) -> bool:
+        return self.precharge is not None and not self.drainage and self.streamlit_repond()
+
+    def description(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "port": self.port_streamlit,
+            "depuis_s": round(time.time() - self.debut),
+            "drainage": self.drainage,
+            "prechargement": self.precharge
+        }
+
+
+class GestionnaireEtat(BaseHTTPRequestHandler):
+    """GET /sante (processus vivant), GET /pret (prêt à recevoir des sessions), POST /drainer"""
+
+    def do_GET(self) -> None:
+        etat: EtatWorker = self.server.etat
+        if self.path == "/sante":
+            self._repondre(200, {"statut": "vivant", **etat.description()})
+        elif self.path == "/pret":
+            pret = etat.pret()
+            self._repondre(200 if pret else 503, {"pret": pret, **etat.description()})
+        else:
+            self._repondre(404, {"erreur": "Route inconnue"})
+
+    def do_POST(self) -> None:
+        # Drainage réservé à la machine locale (script de redémarrage progressif)
+        if self.path == "/drainer" and self.client_address[0] == "127.0.0.1":
+            self.server.etat.drainage = True
+            self._repondre(200, {"drainage": True})
+        else:
+            self._repondre(404, {"erreur": "Route inconnue"})
+
+    def _repondre(self, code: int, contenu: Dict[str, Any]) -> None:
+        corps = json.dumps(contenu, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corps)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def log_message(self, format: str, *args) -> None:
+        # Sondées toutes les secondes par le proxy : pas de journal d'accès
+        pass
+
+
+def lancer_worker(port: int, port_etat: int, adresse: str = "127.0.0.1") -> None:
+    """Sondes d'abord (le proxy voit le worker vivant mais pas prêt), préchargement, puis Streamlit"""
+    etat = EtatWorker(port)
+    serveur_etat = ThreadingHTTPServer((adresse, port_etat), GestionnaireEtat)
+    serveur_etat.etat = etat
+    serveur_etat.daemon_threads = True
+    threading.Thread(target=serveur_etat.serve_forever, name="sondes-worker", daemon=True).start()
+
+    etat.precharge = precharger()
+    print(f"Worker {port} préchargé : {json.dumps(etat.precharge, ensure_ascii=False)}", flush=True)
+
+    # Même processus : les sessions Streamlit retrouvent les modules et singletons préchargés
+    from streamlit.web import cli as streamlit_cli
+    sys.argv = [
+        "streamlit", "run", os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_student.py"),
+        "--server.port", str(port), "--server.address", adresse, "--server.headless", "true"
+    ]
+    sys.exit(streamlit_cli.main())
+
+
+def _appeler_sonde(url: str, methode: str = "GET") -> Optional[int]:
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, method=methode), timeout=2) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def redemarrer_progressivement(nb_workers: int, port_etat_base: int, delai_drainage: float,
+                               delai_pret_max: float, configuration: str) -> bool:
+    """Redémarre les workers un par un : drainage, redémarrage, attente de /pret avant le suivant"""
+    for numero in range(1, nb_workers + 1):
+        sonde = f"http://127.0.0.1:{port_etat_base + numero}"
+        print(f"Worker {numero} : drainage ({delai_drainage} s)", flush=True)
+        _appeler_sonde(f"{sonde}/drainer", "POST")
+        time.sleep(delai_drainage)
+
+        subprocess.run(["supervisorctl", "-c", configuration, "restart", PROGRAMME_SUPERVISORD.format(numero)],
+                       check=True)
+
+        limite = time.time() + delai_pret_max
+        while _appeler_sonde(f"{sonde}/pret") != 200:
+            if time.time() > limite:
+                print(f"Worker {numero} pas prêt après {delai_pret_max} s : arrêt du redémarrage", flush=True)
+                return False
+            time.sleep(1)
+        print(f"Worker {numero} prêt", flush=True)
+    return True
+
+
+def _travailleur_mesure(depart, duree: float, resultats) -> None:
+    """Analyses de base (recommandations, format compact, rapport) en boucle pendant la durée donnée"""
+    precharger()
+    from app_student import generer_rapport_export
+    from recommendation_logic_student import obtenir_moteur_recommandation
+    from schema_resultats import compacter
+
+    moteur = obtenir_moteur_recommandation()
+    profils = profils_representatifs(moteur.kb_loader)
+    depart.wait()
+    fin = time.perf_counter() + duree
+    nombre = 0
+    while time.perf_counter() < fin:
+        profil = profils[nombre % len(profils)]
+        recommandations = moteur.generer_recommandations(profil)
+        compacter(recommandations, moteur.kb_loader)
+        generer_rapport_export(profil, recommandations, "")
+        nombre += 1
+    resultats.put(nombre)
+
+
+def mesurer_montee_en_charge(max_workers: int, duree: float) -> List[Dict[str, Any]]:
+    """Débit d'analyses de 1 à max_workers processus (contexte spawn, comme des workers séparés)"""
+    contexte = multiprocessing.get_context("spawn")
+    mesures = []
+    for nb in range(1, max_workers + 1):
+        depart = contexte.Barrier(nb + 1)
+        resultats = contexte.Queue()
+        processus = [contexte.Process(target=_travailleur_mesure, args=(depart, duree, resultats))
+                     for _ in range(nb)]
+        for p in processus:
+            p.start()
+        depart.wait()
+        total = sum(resultats.get() for _ in processus)
+        for p in processus:
+            p.join()
+
+        debit = total / duree
+        mesures.append({
+            "workers": nb,
+            "analyses_par_s": round(debit, 1),
+            "acceleration": round(debit / mesures[0]["analyses_par_s"], 2) if mesures else 1.0
+        })
+    return mesures
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """worker : lance un worker ; redemarrer : redémarrage progressif ; mesurer : montée en charge"""
+    config = CONFIG_WORKERS_PAR_DEFAUT
+    analyseur = argparse.ArgumentParser(description="Déploiement multi-workers de l'application")
+    commandes = analyseur.add_subparsers(dest="commande", required=True)
+
+    worker = commandes.add_parser("worker", help="précharge puis lance un worker Streamlit")
+    worker.add_argument("--numero", type=int, required=True, help="numéro du worker (à partir de 1)")
+    worker.add_argument("--adresse", default="127.0.0.1")
+
+    redemarrer = commandes.add_parser("redemarrer", help="redémarre les workers un par un")
+    redemarrer.add_argument("--workers", type=int, default=config["nb_workers"])
+    redemarrer.add_argument("--drainage", type=float, default=config["delai_drainage"])
+    redemarrer.add_argument("--configuration", default="supervisord.conf")
+
+    mesurer = commandes.add_parser("mesurer", help="débit d'analyses de 1 à N processus")
+    mesurer.add_argument("--workers", type=int, default=config["nb_workers"])
+    mesurer.add_argument("--duree", type=float, default=5.0, help="secondes de mesure par palier")
+
+    options = analyseur.parse_args(arguments)
+
+    if options.commande == "worker":
+        lancer_worker(config["port_base"] + options.numero, config["port_etat_base"] + options.numero,
+                      options.adresse)
+    elif options.commande == "redemarrer":
+        succes = redemarrer_progressivement(options.workers, config["port_etat_base"], options.drainage,
+                                            config["delai_pret_max"], options.configuration)
+        sys.exit(0 if succes else 1)
+    else:
+        print(f"{'workers':>8}{'analyses/s':>14}{'accélération':>15}  ({os.cpu_count()} processeurs)")
+        for mesure in mesurer_montee_en_charge(options.workers, options.duree):
+            print(f"{mesure['workers']:>8}{mesure['analyses_par_s']:>14}{mesure['acceleration']:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Module de limitation du débit vers l'API (seau à jetons partagé entre processus et file d'attente à priorités)
+"""
+
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Plateforme sans verrous de fichiers POSIX : seau à jetons propre au processus
+    fcntl = None
+
+# Valeurs par défaut, surchargeables dans la section [debit] de .streamlit/secrets.toml
+CONFIG_DEBIT_PAR_DEFAUT = {
+    "requetes_par_minute": 20,
+    "rafale": 5,
+    "taille_file": 50,
+    "delai_max_attente": 15,
+    # Les requêtes d'arrière-plan (analyses par lots) attendent leur tour au lieu d'être abandonnées
+    "delai_max_arriere_plan": 3600
+}
+
+# Priorités (la plus petite valeur passe en premier)
+PRIORITE_INTERACTIVE = 0
+PRIORITE_SECONDAIRE = 1
+PRIORITE_ARRIERE_PLAN = 2
+
+# Backoff exponentiel (avec gigue complète) quand l'API ne donne pas de délai
+BACKOFF_BASE = 1.0
+BACKOFF_PLAFOND = 30.0
+
+
+class ChargeExcessive(Exception):
+    """File d'attente saturée ou attente estimée trop longue : la requête est abandonnée"""
+
+
+def _delai_entete(valeur: Optional[str], maintenant: float) -> Optional[float]:
+    """Délai en secondes d'un en-tête Retry-After ou X-RateLimit-Reset (durée, date HTTP ou horodatage)"""
+    if not valeur:
+        return None
+    try:
+        nombre = float(valeur)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(valeur).timestamp() - maintenant)
+        except (TypeError, ValueError):
+            return None
+
+    if nombre > 1e12:
+        # Horodatage en millisecondes (format OpenRouter)
+        return max(0.0, nombre / 1000 - maintenant)
+    if nombre > 1e9:
+        return max(0.0, nombre - maintenant)
+    return max(0.0, nombre)
+
+
+class LimiteurDebit:
+    """Seau à jetons partagé (fichier verrouillé) devant lequel les requêtes attendent par priorité"""
+
+    def __init__(self, requetes_par_minute: float = 20, rafale: int = 5, taille_file: int = 50,
+                 delai_max_attente: float = 15, delai_max_arriere_plan: float = 3600,
+                 chemin_etat: Optional[str] = None):
+        """Initialise le seau (plein) et la file d'attente du processus"""
+        self.debit = requetes_par_minute / 60
+        self.rafale = rafale
+        self.taille_file = taille_file
+        self.delai_max_attente = delai_max_attente
+        self.delai_max_arriere_plan = delai_max_arriere_plan
+        self.chemin_etat = chemin_etat if fcntl else None
+
+        self._condition = threading.Condition()
+        self._file: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._verrou_etat = threading.Lock()
+        self._etat_local = {"jetons": float(rafale), "horodatage": time.time(), "bloque_jusqua": 0.0}
+        self._attentes = deque(maxlen=500)
+        self._compteurs = {"acquisitions": 0, "rejets": 0, "suspensions": 0}
+
+        if self.chemin_etat:
+            try:
+                os.makedirs(os.path.dirname(self.chemin_etat) or ".", exist_ok=True)
+            except OSError:
+                self.chemin_etat = None
+
+    @contextmanager
+    def _etat(self):
+        """État du seau, partagé entre processus via un fichier verrouillé quand c'est possible"""
+        with self._verrou_etat:
+            if not self.chemin_etat:
+                yield self._etat_local
+                return
+
+            with open(self.chemin_etat, "a+") as fichier:
+                fcntl.flock(fichier, fcntl.LOCK_EX)
+                try:
+                    fichier.seek(0)
+                    try:
+                        etat = json.loads(fichier.read() or "{}")
+                    except ValueError:
+                        etat = {}
+                    if not etat:
+                        etat = dict(self._etat_local)
+                    yield etat
+                    fichier.seek(0)
+                    fichier.truncate()
+                    fichier.write(json.dumps(etat))
+                    fichier.flush()
+                finally:
+                    fcntl.flock(fichier, fcntl.LOCK_UN)
+
+    def _remplir(self, etat: Dict[str, float], maintenant: float) -> None:
+        """Ajoute les jetons accumulés depuis la dernière mise à jour"""
+        ecoule = max(0.0, maintenant - etat["horodatage"])
+        etat["jetons"] = min(self.rafale, etat["jetons"] + ecoule * self.debit)
+        etat["horodatage"] = maintenant
+
+    def _prendre_jeton(self) -> float:
+        """Prend un jeton ; retourne 0 en cas de succès, sinon le temps d'attente nécessaire"""
+        maintenant = time.time()
+        with self._etat() as etat:
+            self._remplir(etat, maintenant)
+            if etat["bloque_jusqua"] > maintenant:
+                return etat["bloque_jusqua"] - maintenant
+            if etat["jetons"] >= 1:
+                etat["jetons"] -= 1
+                return 0.0
+            return (1 - etat["jetons"]) / self.debit
+
+    def estimer_attente(self, position: int) -> float:
+        """Attente estimée pour une requête précédée de position requêtes"""
+        maintenant = time.time()
+        with self._etat() as etat:
+            self._remplir(etat, maintenant)
+            blocage = max(0.0, etat["bloque_jusqua"] - maintenant)
+            jetons = etat["jetons"]
+        return blocage + max(0.0, position + 1 - jetons) / self.debit
+
+    def delai_max_attente_priorite(self, priorite: int) -> float:
+        """Attente maximale par défaut : longue pour l'arrière-plan, courte pour les élèves connectés"""
+        return self.delai_max_arriere_plan if priorite >= PRIORITE_ARRIERE_PLAN else self.delai_max_attente
+
+    def acquerir(self, priorite: int = PRIORITE_INTERACTIVE, delai_max: Optional[float] = None) -> float:
+        """Attend son tour et un jeton ; lève ChargeExcessive si l'attente dépasse le délai maximal"""
+        if delai_max is None:
+            delai_max = self.delai_max_attente_priorite(priorite)
+        ticket = (priorite, next(self._sequence))
+        debut = time.monotonic()
+
+        with self._condition:
+            if len(self._file) >= self.taille_file:
+                self._compteurs["rejets"] += 1
+                raise ChargeExcessive("Forte affluence : file d'attente de l'API saturée")
+            position = sum(1 for autre in self._file if autre < ticket)
+            if self.estimer_attente(position) > delai_max:
+                self._compteurs["rejets"] += 1
+                raise ChargeExcessive("Forte affluence : attente estimée trop longue")
+            heapq.heappush(self._file, ticket)
+
+        limite = debut + delai_max
+        try:
+            while True:
+                with self._condition:
+                    # Seule la requête la plus prioritaire du processus tente de prendre un jeton
+                    while self._file[0] != ticket:
+                        restant = limite - time.monotonic()
+                        if restant <= 0:
+                            raise ChargeExcessive("Forte affluence : délai d'attente dépassé")
+                        self._condition.wait(restant)
+
+                attente = self._prendre_jeton()
+                if attente == 0:
+                    break
+                if time.monotonic() + attente > limite:
+                    raise ChargeExcessive("Forte affluence : délai d'attente dépassé")
+                time.sleep(min(attente, 1.0))
+        except ChargeExcessive:
+            with self._condition:
+                self._compteurs["rejets"] += 1
+            raise
+        finally:
+            with self._condition:
+                self._file.remove(ticket)
+                heapq.heapify(self._file)
+                self._condition.notify_all()
+
+        duree = time.monotonic() - debut
+        with self._condition:
+            self._compteurs["acquisitions"] += 1
+            self._attentes.append(duree)
+        return duree
+
+    def suspendre(self, secondes: float) -> None:
+        """Bloque tous les processus pendant la durée indiquée et vide le seau (reprise progressive)"""
+        maintenant = time.time()
+        with self._etat() as etat:
+            self._remplir(etat, maintenant)
+            etat["bloque_jusqua"] = max(etat["bloque_jusqua"], maintenant + secondes)
+            etat["jetons"] = 0.0
+        with self._condition:
+            self._compteurs["suspensions"] += 1
+
+    def observer_entetes(self, entetes: Mapping[str, str]) -> None:
+        """Suspend les envois jusqu'à la réinitialisation annoncée quand le quota est épuisé"""
+        restant = entetes.get("X-RateLimit-Remaining")
+        if restant is None:
+            return
+        try:
+            epuise = float(restant) <= 0
+        except ValueError:
+            return
+        if epuise:
+            delai = _delai_entete(entetes.get("X-RateLimit-Reset"), time.time())
+            if delai:
+                self.suspendre(delai)
+
+    def delai_reessai(self, entetes: Mapping[str, str], tentative: int) -> float:
+        """Délai avant nouvelle tentative après un 429 : Retry-After, X-RateLimit-Reset ou backoff avec gigue"""
+        maintenant = time.time()
+        delai = _delai_entete(entetes.get("Retry-After"), maintenant)
+        if delai is None:
+            delai = _delai_entete(entetes.get("X-RateLimit-Reset"), maintenant)
+        if delai is None:
+            return random.uniform(0, min(BACKOFF_PLAFOND, BACKOFF_BASE * 2 ** (tentative + 1)))
+        # Gigue : les processus suspendus ne repartent pas tous au même instant
+        return delai + random.uniform(0, min(1.0, 0.1 * delai + 0.2))
+
+    def metriques(self) -> Dict[str, Any]:
+        """Profondeur de la file, attentes observées et estimées, rejets et suspensions"""
+        with self._condition:
+            profondeur = len(self._file)
+            attentes = sorted(self._attentes)
+            metriques: Dict[str, Any] = dict(self._compteurs)
+
+        maintenant = time.time()
+        with self._etat() as etat:
+            self._remplir(etat, maintenant)
+            metriques["jetons_disponibles"] = round(etat["jetons"], 2)
+            metriques["suspendu_pendant_s"] = round(max(0.0, etat["bloque_jusqua"] - maintenant), 1)
+
+        metriques["profondeur_file"] = profondeur
+        metriques["attente_estimee_s"] = round(self.estimer_attente(profondeur), 2)
+        metriques["attente_moyenne_s"] = round(sum(attentes) / len(attentes), 3) if attentes else 0.0
+        metriques["attente_max_s"] = round(attentes[-1], 3) if attentes else 0.0
+        metriques["partage_entre_processus"] = bool(self.chemin_etat)
+        return metriques
+
+
+_limiteur_partage: Optional[LimiteurDebit] = None
+_verrou_limiteur = threading.Lock()
+
+
+def obtenir_limiteur(**config) -> LimiteurDebit:
+    """Retourne le limiteur unique du processus (créé au premier appel)"""
+    global _limiteur_partage
+    if _limiteur_partage is None:
+        with _verrou_limiteur:
+            if _limiteur_partage is None:
+                _limiteur_partage = LimiteurDebit(**{**CONFIG_DEBIT_PAR_DEFAUT, **config})
+    return _limiteur_partage
@@ -2,22 +2,196 @@
 Module pour gérer les interactions avec l'API DeepSeek via OpenRouter
 """
 
-import requests
+import asyncio
+import functools
 import json
+import os
+import random
+import re
+import sqlite3
 import streamlit as st
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import time
+from concurrent.futures import ThreadPoolExecutor
+from profilage import PROFILEUR
+from demarrage import module_differe
+from client_http import obtenir_client_http, CONFIG_HTTP_PAR_DEFAUT
+from cache_llm import obtenir_cache_llm, cle_cache, CONFIG_CACHE_PAR_DEFAUT
+from coalescence import obtenir_coalesceur
+from limiteur_debit import (obtenir_limiteur, ChargeExcessive, CONFIG_DEBIT_PAR_DEFAUT,
+                            PRIORITE_INTERACTIVE, PRIORITE_SECONDAIRE, PRIORITE_ARRIERE_PLAN)
+from disjoncteur import obtenir_disjoncteur, CircuitOuvert, CONFIG_DISJONCTEUR_PAR_DEFAUT
+from execution_concurrente import CONCURRENCE_PAR_DEFAUT
+from admission import obtenir_controle_admission, FileSaturee, Tache, CONFIG_ADMISSION_PAR_DEFAUT
+from automate_motifs import normaliser_texte
+from comptabilite_tokens import (obtenir_comptabilite, estimer_tokens, estimer_tokens_messages,
+                                 max_tokens_pour_mots, BudgetTokensEpuise, CONFIG_TOKENS_PAR_DEFAUT)
+
+# Importé au premier appel à l'API (exceptions de requests) : inutile pour l'analyse de base
+requests = module_differe("requests")
+
+# Budgets de latence par défaut (secondes) : durée maximale de toutes les tentatives réunies
+BUDGET_LATENCE_ANALYSE = 45
+BUDGET_LATENCE_CONSEIL = 15
+
+# Longueurs de réponse demandées : max_tokens est dimensionné en conséquence
+NB_MOTS_ANALYSE = 400
+NB_MOTS_CONSEIL = 80
+
+# Paramètres de génération de l'analyse du profil et des conseils par domaine
+CONFIG_ANALYSE = {"max_tokens": max_tokens_pour_mots(NB_MOTS_ANALYSE)}
+CONFIG_CONSEIL = {"max_tokens": max_tokens_pour_mots(NB_MOTS_CONSEIL), "temperature": 0.8}
+
+# Octets du corps d'une erreur en flux repris dans le message
+TAILLE_MAX_ERREUR = 500
+
+# Conseils de plusieurs domaines demandés en une seule requête (objet JSON indexé par domaine)
+TAILLE_LOT_CONSEILS = 6
+
+# Gabarits du prompt d'analyse (le rôle de conseiller est donné par le message système)
+MODELE_LIGNE_METIER = (
+    "MÉTIER: secteur {secteur} | demande {demande} | pertinence Bénin: {pertinence}\n"
+    "Compétences: {techniques} | transversales: {transversales}"
+)
+MODELE_LIGNE_SCORES = (
+    "COMPATIBILITÉ: série-métier {serie_metier:.0%} | marché béninois {marche:.0%} | formations {formation:.0%}"
+)
+CONSIGNES_ANALYSE = """
+Rédige une analyse d'orientation personnalisée pour cet étudiant (300-{nb_mots} mots), en 4 parties :
+1. **ÉVALUATION DU CHOIX DE CARRIÈRE** (2-3 phrases) : pertinence pour le profil et le contexte béninois, forces et défis
+2. **RECOMMANDATIONS D'UNIVERSITÉS** (3-4 phrases) : pourquoi ces universités, critères de choix (public/privé, localisation)
+3. **PARCOURS PERSONNALISÉ** (4-5 points) : étapes clés, compétences prioritaires, conseils propres au Bénin
+4. **CONSEILS PRATIQUES** (2-3 recommandations) : actions immédiates, ressources ou contacts utiles
+Style professionnel et bienveillant, concret et actionnable, adapté au marché du travail et au système éducatif béninois."""
+
+def analyse_de_base(profil: Dict, recommandations: Dict) -> str:
+    """Analyse de base sans IA (repli en cas d'échec de l'API, rapports groupés)"""
+    
+    carriere = profil["carriere_envisagee"]
+    serie = profil.get("serie_bac", "Non spécifié")
+    statut = profil["statut"]
+    
+    analyse = f"""**🎯 Évaluation de votre choix : {carriere}**
+
+Votre profil ({serie if serie != "Non spécifié" else statut}) a été analysé en fonction de notre base de données des opportunités au Bénin.
+
+**📊 Analyse de compatibilité :**
+"""
+    
+    # Informations sur le métier si trouvé
+    metier_analyse = recommandations.get("metier_analyse", {})
+    if metier_analyse.get("metier_trouve"):
+        metier = metier_analyse["metier_obj"]
+        analyse += f"""
+- **Secteur d'activité :** {metier.secteur_activite}
+- **Demande sur le marché :** {metier.niveau_demande_marche or 'À évaluer'}
+- **Pertinence au Bénin :** {metier.pertinence_realites_africaines_benin or 'Secteur en développement'}
+"""
+    else:
+        analyse += f"\nLe métier '{carriere}' nécessite une analyse plus approfondie. "
+    
+    # Universités disponibles
+    universites = recommandations.get("universites_recommandees", [])
+    if universites:
+        analyse += f"""
+
+**🏛️ Formations disponibles :**
+Nous avons identifié {len(universites)} institution(s) proposant des formations dans ce domaine, incluant des options publiques et privées agréées.
+"""
+    else:
+        analyse += f"""
+
+**🏛️ Formations :**
+Les formations pour ce métier pourraient nécessiter des recherches supplémentaires ou être disponibles dans des institutions spécialisées.
+"""
+    
+    # Recommandations générales
+    analyse += f"""
+
+**📋 Recommandations personnalisées :**
+
+1. **Validation du choix :** Rencontrez des professionnels du domaine pour confirmer votre intérêt
+2. **Préparation académique :** Renforcez vos compétences dans les matières clés de votre série
+3. **Exploration d'alternatives :** Considérez des métiers connexes dans le même secteur
+4. **Recherche d'informations :** Contactez directement les universités pour les conditions d'admission
+
+**🔍 Prochaines étapes :**
+- Visitez les universités recommandées lors de leurs journées portes ouvertes
+- Consultez un conseiller d'orientation dans votre établissement
+- Préparez-vous aux éventuels concours d'entrée
+"""
+    
+    return analyse
+
+class RepliAnalyse(str):
+    """Analyse de base produite par le flux à la place de la réponse de l'IA (remplace un texte partiel)"""
+
+class BudgetLatenceEpuise(Exception):
+    """Le budget de latence accordé par l'appelant est écoulé"""
+
+# Indisponibilités signalées par un simple message : l'analyse de base est affichée sans alerte
+INDISPONIBILITES = (ChargeExcessive, CircuitOuvert, BudgetTokensEpuise, FileSaturee)
 
 class LLMInterface:
     """Interface pour communiquer avec l'API DeepSeek via OpenRouter"""
     
-    def __init__(self):
+    def __init__(self, version_kb: str, concurrence_async: int = CONCURRENCE_PAR_DEFAUT):
         """Initialise l'interface LLM avec les paramètres de configuration"""
         self.api_key = self._get_api_key()
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
         self.model = "deepseek/deepseek-chat"  # Modèle DeepSeek via OpenRouter
         self.max_retries = 3
-        self.timeout = 30
+        self.dernier_temps_premier_token: Optional[float] = None
+        # Dernière analyse anticipée (position dans la file, annulation)
+        self.derniere_tache: Optional[Tache] = None
+        
+        # Variantes asynchrones : appels exécutés dans un pool borné (créé au premier appel)
+        self.concurrence_async = concurrence_async
+        self._executeur_async: Optional[ThreadPoolExecutor] = None
+        
+        # Client HTTP partagé (keep-alive) : délais de connexion et de lecture distincts
+        config_http = self._get_config_http()
+        self.timeout_connexion = config_http["timeout_connexion"]
+        self.timeout_lecture = config_http["timeout_lecture"]
+        self.client_http = obtenir_client_http(**config_http)
+        
+        # Cache des réponses partagé (mémoire + SQLite), lu pour la version courante de la base
+        config_cache = self._get_config_cache()
+        try:
+            self.cache = obtenir_cache_llm(version_kb=version_kb, **config_cache)
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Cache des réponses indisponible : {e}")
+            self.cache = None
+        
+        # Regroupement des requêtes identiques simultanées (threads et processus via verrous de fichiers)
+        self.coalesceur = obtenir_coalesceur(
+            os.path.join(os.path.dirname(config_cache["chemin"]), "verrous")
+        )
+        
+        # Débit vers l'API partagé par toutes les sessions et tous les processus
+        self.limiteur = obtenir_limiteur(
+            chemin_etat=os.path.join(os.path.dirname(config_cache["chemin"]), "limiteur_debit.json"),
+            **self.lire_config_secrets("debit", CONFIG_DEBIT_PAR_DEFAUT)
+        )
+        
+        # Disjoncteur partagé : l'API défaillante n'est plus sollicitée pendant le refroidissement
+        self.disjoncteur = obtenir_disjoncteur(
+            **self.lire_config_secrets("disjoncteur", CONFIG_DISJONCTEUR_PAR_DEFAUT)
+        )
+        
+        # Analyses IA interactives menées par un nombre borné d'exécutants, file équitable par session
+        self.admission = obtenir_controle_admission(
+            **self.lire_config_secrets("admission", CONFIG_ADMISSION_PAR_DEFAUT)
+        )
+        
+        # Tokens et coût par point d'accès et par jour, budget quotidien facultatif
+        try:
+            self.comptabilite = obtenir_comptabilite(
+                config_cache["chemin"], **self.lire_config_secrets("tokens", CONFIG_TOKENS_PAR_DEFAUT)
+            )
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Comptabilité des tokens indisponible : {e}")
+            self.comptabilite = None
         
         # Configuration par défaut
         self.default_config = {
@@ -55,7 +229,26 @@ class LLMInterface:
                 print(f"Erreur lors de la récupération de la clé API: {e}")
             return None
     
-    def analyser_profil(self, profil_utilisateur: Dict, recommandations: Dict) -> str:
+    def lire_config_secrets(self, section: str, config_par_defaut: Dict[str, Any]) -> Dict[str, Any]:
+        """Valeurs par défaut surchargées par une section facultative des secrets"""
+        config = dict(config_par_defaut)
+        try:
+            config.update({cle: st.secrets[section][cle] for cle in config if cle in st.secrets[section]})
+        except Exception:
+            pass
+        return config
+    
+    def _get_config_http(self) -> Dict[str, Any]:
+        """Récupère la configuration HTTP (section [http] des secrets, facultative)"""
+        return self.lire_config_secrets("http", CONFIG_HTTP_PAR_DEFAUT)
+    
+    def _get_config_cache(self) -> Dict[str, Any]:
+        """Récupère la configuration du cache (section [cache] des secrets, facultative)"""
+        return self.lire_config_secrets("cache", CONFIG_CACHE_PAR_DEFAUT)
+    
+    @PROFILEUR.mesurer("llm.analyser_profil")
+    def analyser_profil(self, profil_utilisateur: Dict, recommandations: Dict,
+                        budget_latence: Optional[float] = BUDGET_LATENCE_ANALYSE) -> str:
         """Analyse le profil utilisateur avec l'aide de l'IA"""
         
         if not self.api_key:
@@ -69,18 +262,58 @@ class LLMInterface:
         
         # Faire l'appel API
         try:
-            response = self._appeler_api(prompt)
+            response = self._appeler_api(prompt, CONFIG_ANALYSE, budget_latence=budget_latence,
+                                         point_acces="analyse")
             return response
+        except INDISPONIBILITES as e:
+            st.info(f"⏳ {e}. Analyse de base affichée.")
+            return self._fallback_analyse(profil_utilisateur, recommandations)
         except Exception as e:
             st.warning(f"Erreur API : {e}. Utilisation de l'analyse de base.")
             return self._fallback_analyse(profil_utilisateur, recommandations)
     
+    async def analyser_profil_async(self, profil_utilisateur: Dict, recommandations: Dict,
+                                    budget_latence: Optional[float] = BUDGET_LATENCE_ANALYSE,
+                                    priorite: int = PRIORITE_INTERACTIVE) -> str:
+        """Variante asynchrone de analyser_profil (sans affichage Streamlit) ; le repli est une RepliAnalyse"""
+        
+        if not self.api_key:
+            return RepliAnalyse(self._fallback_analyse(profil_utilisateur, recommandations))
+        
+        donnees_contexte = self._preparer_donnees_contexte(profil_utilisateur, recommandations)
+        prompt = self._construire_prompt_analyse(donnees_contexte)
+        
+        try:
+            return await self._executer_async(
+                self._appeler_api, prompt, CONFIG_ANALYSE,
+                priorite=priorite, budget_latence=budget_latence, point_acces="analyse"
+            )
+        except Exception:
+            PROFILEUR.compter("llm.async.replis")
+            return RepliAnalyse(self._fallback_analyse(profil_utilisateur, recommandations))
+    
+    async def generer_conseil_supplementaire_async(self, domaine: str,
+                                                   priorite: int = PRIORITE_SECONDAIRE) -> str:
+        """Variante asynchrone de generer_conseil_supplementaire"""
+        return await self._executer_async(self.generer_conseil_supplementaire, domaine, priorite=priorite)
+    
+    async def generer_conseils_supplementaires_async(self, domaines: List[str],
+                                                     priorite: int = PRIORITE_SECONDAIRE) -> Dict[str, str]:
+        """Variante asynchrone de generer_conseils_supplementaires"""
+        return await self._executer_async(self.generer_conseils_supplementaires, domaines, priorite=priorite)
+    
+    async def _executer_async(self, fonction, *args, **kwargs):
+        """Exécute un appel bloquant dans le pool borné sans bloquer la boucle d'événements"""
+        if self._executeur_async is None:
+            self._executeur_async = ThreadPoolExecutor(
+                max_workers=self.concurrence_async, thread_name_prefix="llm-async"
+            )
+        boucle = asyncio.get_running_loop()
+        return await boucle.run_in_executor(self._executeur_async, functools.partial(fonction, *args, **kwargs))
+    
     def _preparer_donnees_contexte(self, profil: Dict, recommandations: Dict) -> Dict:
         """Prépare les données contextuelles pour le LLM"""
         
-        from recommendation_logic_student import RecommendationEngine
-        # Simuler le moteur pour avoir accès à la méthode
-        
         return {
             "profil": {
                 "statut": profil["statut"],
@@ -96,85 +329,65 @@ class LLMInterface:
         }
     
     def _construire_prompt_analyse(self, donnees: Dict) -> str:
-        """Construit le prompt pour l'analyse du profil"""
+        """Construit le prompt compact de l'analyse du profil (lignes absentes quand la donnée manque)"""
         
         profil = donnees["profil"]
         metier_analyse = donnees["analyse_metier"]
         universites = donnees["universites_recommandees"]
         alternatives = donnees["carrieres_alternatives"]
         scores = donnees["scores_compatibilite"]
+        parcours = donnees.get("parcours_suggere", {})
+        
+        lignes = [
+            "PROFIL: " + " | ".join(
+                f"{libelle}: {valeur}" for libelle, valeur in (
+                    ("Statut", profil["statut"]),
+                    ("Bac", profil.get("serie_bac")),
+                    ("Filière", profil.get("filiere_actuelle")),
+                    ("Carrière visée", profil["carriere_envisagee"])
+                ) if valeur
+            )
+        ]
         
-        prompt = f"""Tu es un conseiller d'orientation professionnel expert du système éducatif et du marché du travail au Bénin. 
-
-PROFIL ÉTUDIANT:
-- Statut: {profil['statut']}
-- Série de BAC: {profil.get('serie_bac', 'Non spécifié')}
-- Filière actuelle: {profil.get('filiere_actuelle', 'Non applicable')}
-- Carrière envisagée: {profil['carriere_envisagee']}
-
-ANALYSE DU MÉTIER ENVISAGÉ:
-- Métier trouvé dans la base: {'Oui' if metier_analyse.get('metier_trouve') else 'Non'}
-"""
-        
-        if metier_analyse.get('metier_trouve'):
-            metier = metier_analyse['metier_obj']
-            prompt += f"""- Secteur d'activité: {metier.secteur_activite}
-- Demande sur le marché: {metier.niveau_demande_marche}
-- Pertinence pour le Bénin: {metier.pertinence_realites_africaines_benin}
-- Compétences techniques requises: {', '.join(metier.competences_requises_techniques[:5])}
-- Compétences transversales: {', '.join(metier.competences_requises_transversales[:3])}
-"""
-
-        prompt += f"""
-UNIVERSITÉS ET FILIÈRES DISPONIBLES: {len(universites)} options trouvées
-"""
+        if metier_analyse.get("metier_trouve"):
+            metier = metier_analyse["metier_obj"]
+            lignes.append(MODELE_LIGNE_METIER.format(
+                secteur=metier.secteur_activite,
+                demande=metier.niveau_demande_marche,
+                pertinence=metier.pertinence_realites_africaines_benin,
+                techniques=", ".join(metier.competences_requises_techniques[:5]),
+                transversales=", ".join(metier.competences_requises_transversales[:3])
+            ))
+        else:
+            lignes.append("MÉTIER: absent de la base")
         
-        if universites:
-            prompt += "Top 3 recommandations:\n"
-            for i, univ in enumerate(universites[:3], 1):
-                prompt += f"{i}. {univ['nom_universite']} ({univ['statut']}) - {len(univ.get('filieres_recommandees', []))} filières compatibles\n"
+        lignes.append(f"UNIVERSITÉS ({len(universites)}): " + ("; ".join(
+            f"{univ['nom_universite']} ({univ['statut']}, {len(univ.get('filieres_recommandees', []))} filières)"
+            for univ in universites[:3]
+        ) or "aucune"))
         
         if alternatives:
-            prompt += f"\nCARRIÈRES ALTERNATIVES IDENTIFIÉES: {len(alternatives)}\n"
-            for alt in alternatives[:3]:
-                prompt += f"- {alt.nom_metier} (Secteur: {alt.secteur_activite})\n"
+            lignes.append("ALTERNATIVES: " + "; ".join(
+                f"{alt.nom_metier} ({alt.secteur_activite})" for alt in alternatives[:3]
+            ))
         
         if scores:
-            prompt += f"\nSCORES DE COMPATIBILITÉ:\n"
-            prompt += f"- Compatibilité série-métier: {scores.get('serie_metier', 0):.1%}\n"
-            prompt += f"- Pertinence marché béninois: {scores.get('marche_benin', 0):.1%}\n"
-            prompt += f"- Formations disponibles: {scores.get('formation_disponible', 0):.1%}\n"
-        
-        prompt += f"""
-MISSION:
-Fournis une analyse personnalisée et des conseils d'orientation pour cet étudiant béninois. Ton analyse doit inclure:
-
-1. **ÉVALUATION DU CHOIX DE CARRIÈRE** (2-3 phrases)
-   - Pertinence du choix par rapport au profil et au contexte béninois
-   - Forces et défis potentiels
-
-2. **RECOMMANDATIONS D'UNIVERSITÉS** (3-4 phrases)
-   - Pourquoi les universités recommandées sont adaptées
-   - Conseils sur les critères de choix (public vs privé, localisation, etc.)
-
-3. **PARCOURS PERSONNALISÉ** (4-5 points concrets)
-   - Étapes clés à suivre
-   - Compétences prioritaires à développer
-   - Conseils spécifiques au contexte béninois
-
-4. **CONSEILS PRATIQUES** (2-3 recommandations)
-   - Actions immédiates à entreprendre
-   - Ressources ou contacts utiles
-
-STYLE: Professionnel mais bienveillant, concret et actionnable. Adapte tes conseils à la réalité du marché du travail et du système éducatif béninois.
-
-LONGUEUR: 300-400 mots maximum.
-"""
-        
-        return prompt
+            lignes.append(MODELE_LIGNE_SCORES.format(
+                serie_metier=scores.get("serie_metier", 0),
+                marche=scores.get("marche_benin", 0),
+                formation=scores.get("formation_disponible", 0)
+            ))
+        
+        if parcours.get("etapes") and parcours.get("duree_totale") != "À déterminer":
+            lignes.append(f"PARCOURS LE PLUS COURT ({parcours['duree_totale']}): " + " → ".join(
+                re.sub(r"^\d+\.\s*", "", etape) for etape in parcours["etapes"]
+            ))
+        
+        lignes.append(CONSIGNES_ANALYSE.format(nb_mots=NB_MOTS_ANALYSE))
+        return "\n".join(lignes)
     
-    def _appeler_api(self, prompt: str, config_custom: Optional[Dict] = None) -> str:
-        """Effectue l'appel API vers OpenRouter/DeepSeek"""
+    def _construire_requete(self, prompt: str, config_custom: Optional[Dict] = None) -> Tuple[Dict, Dict]:
+        """Construit les en-têtes et le corps de la requête OpenRouter/DeepSeek"""
         
         config = self.default_config.copy()
         if config_custom:
@@ -202,105 +415,358 @@ LONGUEUR: 300-400 mots maximum.
             **config
         }
         
+        return headers, payload
+    
+    def _lire_cache(self, payload: Dict) -> Tuple[str, Optional[str]]:
+        """Retourne la clé de la requête et la réponse déjà en cache (ou None)"""
+        cle = cle_cache(payload["model"], payload, payload["messages"])
+        if not self.cache:
+            return cle, None
+        
+        reponse = self.cache.lire(cle)
+        PROFILEUR.compter("llm.cache.succes" if reponse is not None else "llm.cache.echecs")
+        return cle, reponse
+    
+    def _relire_cache(self, cle: str) -> Optional[str]:
+        """Relit le cache après l'attente d'un autre processus ayant traité la même requête"""
+        return self.cache.lire(cle) if self.cache else None
+    
+    @PROFILEUR.mesurer("llm.appeler_api")
+    def _appeler_api(self, prompt: str, config_custom: Optional[Dict] = None, utiliser_cache: bool = True,
+                     priorite: int = PRIORITE_INTERACTIVE, budget_latence: Optional[float] = None,
+                     point_acces: str = "autre") -> str:
+        """Effectue l'appel API vers OpenRouter/DeepSeek"""
+        
+        headers, payload = self._construire_requete(prompt, config_custom)
+        echeance = time.monotonic() + budget_latence if budget_latence else None
+        
+        if not utiliser_cache:
+            return self._envoyer_requete(headers, payload, priorite=priorite, echeance=echeance,
+                                         point_acces=point_acces)
+        
+        cle, reponse_cache = self._lire_cache(payload)
+        if reponse_cache is not None:
+            return reponse_cache
+        
+        # Requêtes identiques simultanées : un seul appel, résultat partagé
+        return self.coalesceur.executer(
+            cle,
+            lambda: self._envoyer_requete(headers, payload, cle, priorite, echeance, point_acces),
+            relire=lambda: self._relire_cache(cle),
+            delai=budget_latence
+        )
+    
+    def _verifier_budget_tokens(self, payload: Dict) -> int:
+        """Estime localement les tokens d'entrée ; lève BudgetTokensEpuise si le budget du jour serait dépassé"""
+        tokens_entree = estimer_tokens_messages(payload["messages"])
+        if self.comptabilite:
+            self.comptabilite.verifier_budget(tokens_entree, payload.get("max_tokens", 0))
+        return tokens_entree
+    
+    def _enregistrer_usage(self, point_acces: str, usage: Optional[Dict], tokens_entree: int, reponse: str) -> None:
+        """Comptabilise le bloc usage de la réponse (estimation locale s'il est absent)"""
+        if self.comptabilite:
+            self.comptabilite.enregistrer(point_acces, usage, tokens_entree, estimer_tokens(reponse))
+    
+    def _temps_restant(self, echeance: Optional[float]) -> Optional[float]:
+        """Temps restant avant l'échéance (None sans budget) ; lève BudgetLatenceEpuise s'il est écoulé"""
+        if echeance is None:
+            return None
+        restant = echeance - time.monotonic()
+        if restant <= 0:
+            raise BudgetLatenceEpuise("Budget de latence épuisé")
+        return restant
+    
+    def _preparer_tentative(self, priorite: int, echeance: Optional[float]) -> Tuple[float, float]:
+        """Vérifie le disjoncteur et le budget, attend son tour et retourne les délais (connexion, lecture)"""
+        
+        # Circuit ouvert : échec immédiat, sans attendre dans la file
+        if not self.disjoncteur.disponible():
+            raise CircuitOuvert("Service IA momentanément indisponible")
+        
+        # Attente de son tour dans la file partagée (ChargeExcessive si trop longue)
+        restant = self._temps_restant(echeance)
+        self.limiteur.acquerir(priorite, None if restant is None
+                               else min(self.limiteur.delai_max_attente_priorite(priorite), restant))
+        
+        # Budget vérifié avant de réserver l'appel d'essai du semi-ouvert : un essai réservé
+        # puis abandonné bloquerait les autres appelants jusqu'à la fin du refroidissement
+        restant = self._temps_restant(echeance)
+        if not self.disjoncteur.autoriser():
+            raise CircuitOuvert("Service IA momentanément indisponible")
+        
+        if restant is None:
+            return self.timeout_connexion, self.timeout_lecture
+        return min(self.timeout_connexion, restant), min(self.timeout_lecture, restant)
+    
+    def _patienter(self, echeance: Optional[float]) -> None:
+        """Courte pause avec gigue avant une nouvelle tentative, bornée par le budget"""
+        pause = random.uniform(0.5, 1.5)
+        restant = self._temps_restant(echeance)
+        time.sleep(pause if restant is None else min(pause, restant))
+    
+    def _envoyer_requete(self, headers: Dict, payload: Dict, cle: Optional[str] = None,
+                         priorite: int = PRIORITE_INTERACTIVE, echeance: Optional[float] = None,
+                         point_acces: str = "autre") -> str:
+        """Envoie la requête avec nouvelles tentatives et met la réponse en cache"""
+        
+        tokens_entree = self._verifier_budget_tokens(payload)
+        
         # Tentatives avec retry
         for tentative in range(self.max_retries):
+            timeout = self._preparer_tentative(priorite, echeance)
+            PROFILEUR.compter("llm.tentatives")
             try:
-                response = requests.post(
+                response = self.client_http.post(
                     self.base_url,
                     headers=headers,
                     json=payload,
-                    timeout=self.timeout
+                    timeout=timeout
                 )
+                self.limiteur.observer_entetes(response.headers)
                 
                 if response.status_code == 200:
-                    result = response.json()
+                    try:
+                        result = response.json()
+                    except ValueError:
+                        self.disjoncteur.echec()
+                        raise Exception("Réponse API invalide (JSON illisible)")
                     
                     if 'choices' in result and len(result['choices']) > 0:
-                        return result['choices'][0]['message']['content'].strip()
+                        self.disjoncteur.succes()
+                        contenu = result['choices'][0]['message']['content'].strip()
+                        self._enregistrer_usage(point_acces, result.get("usage"), tokens_entree, contenu)
+                        if cle and contenu and self.cache:
+                            self.cache.ecrire(cle, contenu)
+                        return contenu
                     else:
+                        self.disjoncteur.echec()
                         raise Exception("Réponse API invalide")
                 
                 elif response.status_code == 429:
-                    # Rate limit - attendre avant de réessayer
-                    wait_time = 2 ** tentative  # Backoff exponentiel
-                    time.sleep(wait_time)
+                    # Rate limit : l'API répond, toutes les sessions attendent le délai annoncé
+                    self.disjoncteur.succes()
+                    self.limiteur.suspendre(self.limiteur.delai_reessai(response.headers, tentative))
                     continue
                 
                 else:
+                    # Seules les erreurs serveur indiquent une API défaillante
+                    if response.status_code >= 500:
+                        self.disjoncteur.echec()
+                    else:
+                        self.disjoncteur.succes()
                     raise Exception(f"Erreur API {response.status_code}: {response.text}")
             
             except requests.exceptions.Timeout:
+                self.disjoncteur.echec()
                 if tentative < self.max_retries - 1:
-                    time.sleep(1)
+                    self._patienter(echeance)
                     continue
                 raise Exception("Timeout - API non disponible")
             
             except requests.exceptions.RequestException as e:
+                self.disjoncteur.echec()
                 if tentative < self.max_retries - 1:
-                    time.sleep(1)
+                    self._patienter(echeance)
                     continue
                 raise Exception(f"Erreur de connexion: {str(e)}")
         
         raise Exception("Échec après plusieurs tentatives")
     
-    def _fallback_analyse(self, profil: Dict, recommandations: Dict) -> str:
-        """Analyse de base sans IA en cas d'échec de l'API"""
-        
-        carriere = profil["carriere_envisagee"]
-        serie = profil.get("serie_bac", "Non spécifié")
-        statut = profil["statut"]
+    def _appeler_api_flux(self, prompt: str, config_custom: Optional[Dict] = None,
+                          priorite: int = PRIORITE_INTERACTIVE,
+                          budget_latence: Optional[float] = None,
+                          point_acces: str = "autre") -> Iterator[str]:
+        """Effectue l'appel API en mode flux (SSE) et produit le texte au fil des tokens"""
+        
+        headers, payload = self._construire_requete(prompt, config_custom)
+        debut = time.perf_counter()
+        echeance = time.monotonic() + budget_latence if budget_latence else None
+        
+        # Réponse déjà en cache : restituée d'un seul bloc
+        cle, reponse_cache = self._lire_cache(payload)
+        if reponse_cache is not None:
+            self._noter_premier_token(debut)
+            yield reponse_cache
+            return
+        
+        # Même requête déjà en cours dans ce processus : sa réponse complète est restituée d'un bloc
+        futur, meneur = self.coalesceur.rejoindre(cle)
+        if not meneur:
+            reponse = self.coalesceur.attendre(futur, budget_latence)
+            self._noter_premier_token(debut)
+            yield reponse
+            return
+        
+        morceaux = []
+        try:
+            with self.coalesceur.verrou_processus(cle, self._temps_restant(echeance)) as a_attendu:
+                reponse_cache = self._relire_cache(cle) if a_attendu else None
+                if reponse_cache is not None:
+                    self._noter_premier_token(debut)
+                    morceaux.append(reponse_cache)
+                    yield reponse_cache
+                else:
+                    for morceau in self._diffuser_reponse(headers, payload, cle, debut, priorite, echeance,
+                                                          point_acces):
+                        morceaux.append(morceau)
+                        yield morceau
+        except BaseException as e:
+            self.coalesceur.terminer(cle, futur, erreur=e)
+            raise
+        
+        self.coalesceur.terminer(cle, futur, resultat="".join(morceaux).strip())
+    
+    def _noter_premier_token(self, debut: float) -> None:
+        """Enregistre le temps écoulé jusqu'au premier texte affiché"""
+        self.dernier_temps_premier_token = time.perf_counter() - debut
+        PROFILEUR.enregistrer("llm.temps_premier_token", self.dernier_temps_premier_token)
+    
+    def _diffuser_reponse(self, headers: Dict, payload: Dict, cle: str, debut: float,
+                          priorite: int = PRIORITE_INTERACTIVE, echeance: Optional[float] = None,
+                          point_acces: str = "autre") -> Iterator[str]:
+        """Ouvre le flux SSE (nouvelles tentatives avant le premier token) et produit les tokens"""
         
-        analyse = f"""**🎯 Évaluation de votre choix : {carriere}**
-
-Votre profil ({serie if serie != "Non spécifié" else statut}) a été analysé en fonction de notre base de données des opportunités au Bénin.
-
-**📊 Analyse de compatibilité :**
-"""
+        tokens_entree = self._verifier_budget_tokens(payload)
+        # Le bloc usage n'est envoyé en fin de flux que sur demande
+        payload = {**payload, "stream": True, "usage": {"include": True}}
         
-        # Informations sur le métier si trouvé
-        metier_analyse = recommandations.get("metier_analyse", {})
-        if metier_analyse.get("metier_trouve"):
-            metier = metier_analyse["metier_obj"]
-            analyse += f"""
-- **Secteur d'activité :** {metier.secteur_activite}
-- **Demande sur le marché :** {metier.niveau_demande_marche or 'À évaluer'}
-- **Pertinence au Bénin :** {metier.pertinence_realites_africaines_benin or 'Secteur en développement'}
-"""
+        # Les nouvelles tentatives ne sont possibles qu'avant le premier token
+        for tentative in range(self.max_retries):
+            timeout = self._preparer_tentative(priorite, echeance)
+            PROFILEUR.compter("llm.tentatives")
+            try:
+                response = self.client_http.post(
+                    self.base_url,
+                    headers=headers,
+                    json=payload,
+                    timeout=timeout,
+                    stream=True
+                )
+                self.limiteur.observer_entetes(response.headers)
+            except requests.exceptions.RequestException as e:
+                self.disjoncteur.echec()
+                if tentative < self.max_retries - 1:
+                    self._patienter(echeance)
+                    continue
+                raise Exception(f"Erreur de connexion: {str(e)}")
+            
+            if response.status_code == 429:
+                response.close()
+                self.disjoncteur.succes()
+                self.limiteur.suspendre(self.limiteur.delai_reessai(response.headers, tentative))
+                continue
+            
+            if response.status_code != 200:
+                # Corps d'erreur lu (borné) avant la fermeture du flux
+                detail = self._lire_erreur(response)
+                response.close()
+                if response.status_code >= 500:
+                    self.disjoncteur.echec()
+                else:
+                    self.disjoncteur.succes()
+                raise Exception(f"Erreur API {response.status_code}: {detail}")
+            
+            break
         else:
-            analyse += f"\nLe métier '{carriere}' nécessite une analyse plus approfondie. "
+            raise Exception("Échec après plusieurs tentatives")
         
-        # Universités disponibles
-        universites = recommandations.get("universites_recommandees", [])
-        if universites:
-            analyse += f"""
-
-**🏛️ Formations disponibles :**
-Nous avons identifié {len(universites)} institution(s) proposant des formations dans ce domaine, incluant des options publiques et privées agréées.
-"""
-        else:
-            analyse += f"""
+        with response:
+            premier_token = True
+            morceaux = []
+            usage = None
+            try:
+                for ligne in response.iter_lines(decode_unicode=True):
+                    # Les lignes commençant par ':' sont des commentaires SSE (maintien de connexion)
+                    if not ligne or not ligne.startswith("data:"):
+                        continue
+                    
+                    donnees = ligne[len("data:"):].strip()
+                    if donnees == "[DONE]":
+                        self._enregistrer_usage(point_acces, usage, tokens_entree, "".join(morceaux))
+                        # Seules les réponses complètes sont mises en cache
+                        if morceaux and self.cache:
+                            self.cache.ecrire(cle, "".join(morceaux).strip())
+                        return
+                    
+                    evenement = json.loads(donnees)
+                    if evenement.get("error"):
+                        raise Exception(f"Erreur API en cours de flux: {evenement['error']}")
+                    usage = evenement.get("usage") or usage
+                    
+                    choix = evenement.get("choices") or [{}]
+                    contenu = choix[0].get("delta", {}).get("content")
+                    if contenu:
+                        if premier_token:
+                            premier_token = False
+                            self.disjoncteur.succes()
+                            self._noter_premier_token(debut)
+                        morceaux.append(contenu)
+                        yield contenu
+                
+                # Fin de flux sans [DONE] : réponse tronquée, traitée comme un échec (ni cache ni partage)
+                raise Exception("Flux interrompu avant la fin de la réponse")
+            except Exception:
+                self.disjoncteur.echec()
+                raise
+    
+    @staticmethod
+    def _lire_erreur(response) -> str:
+        """Début du corps d'une réponse d'erreur en flux (sans lire un corps démesuré)"""
+        try:
+            contenu = next(response.iter_content(TAILLE_MAX_ERREUR), b"")
+        except requests.exceptions.RequestException:
+            return ""
+        return contenu.decode("utf-8", errors="replace")
+    
+    def analyser_profil_flux(self, profil_utilisateur: Dict, recommandations: Dict,
+                             budget_latence: Optional[float] = BUDGET_LATENCE_ANALYSE,
+                             anticiper: bool = False, locataire: str = "") -> Iterator[str]:
+        """Analyse le profil avec l'IA en produisant la réponse token par token
 
-**🏛️ Formations :**
-Les formations pour ce métier pourraient nécessiter des recherches supplémentaires ou être disponibles dans des institutions spécialisées.
-"""
+        Avec anticiper, l'analyse est confiée au contrôle d'admission : elle démarre dès qu'un
+        exécutant est libre (à tour de rôle entre locataires) et les tokens reçus sont conservés
+        jusqu'à leur lecture. File pleine : l'analyse de base est servie (derniere_tache refusée).
+        """
         
-        # Recommandations générales
-        analyse += f"""
-
-**📋 Recommandations personnalisées :**
-
-1. **Validation du choix :** Rencontrez des professionnels du domaine pour confirmer votre intérêt
-2. **Préparation académique :** Renforcez vos compétences dans les matières clés de votre série
-3. **Exploration d'alternatives :** Considérez des métiers connexes dans le même secteur
-4. **Recherche d'informations :** Contactez directement les universités pour les conditions d'admission
-
-**🔍 Prochaines étapes :**
-- Visitez les universités recommandées lors de leurs journées portes ouvertes
-- Consultez un conseiller d'orientation dans votre établissement
-- Préparez-vous aux éventuels concours d'entrée
-"""
+        self.dernier_temps_premier_token = None
+        self.derniere_tache = None
+        if not self.api_key:
+            return iter([self._fallback_analyse(profil_utilisateur, recommandations)])
         
-        return analyse
+        donnees_contexte = self._preparer_donnees_contexte(profil_utilisateur, recommandations)
+        prompt = self._construire_prompt_analyse(donnees_contexte)
+        
+        morceaux = self._appeler_api_flux(prompt, CONFIG_ANALYSE, budget_latence=budget_latence,
+                                          point_acces="analyse")
+        if anticiper:
+            morceaux = self.derniere_tache = self.admission.soumettre(locataire, morceaux)
+        return self._diffuser_avec_repli(morceaux, profil_utilisateur, recommandations)
+    
+    def _diffuser_avec_repli(self, morceaux: Iterator[str], profil_utilisateur: Dict,
+                             recommandations: Dict) -> Iterator[str]:
+        """Relaie les tokens ; en cas d'échec, produit l'analyse de base"""
+        
+        texte_recu = False
+        try:
+            for morceau in morceaux:
+                texte_recu = True
+                yield morceau
+            if not texte_recu:
+                raise Exception("Réponse API vide")
+        except Exception as e:
+            PROFILEUR.compter("llm.flux_interrompus")
+            if not texte_recu:
+                if isinstance(e, INDISPONIBILITES):
+                    st.info(f"⏳ {e}. Analyse de base affichée.")
+                else:
+                    st.warning(f"Erreur API : {e}. Utilisation de l'analyse de base.")
+            # RepliAnalyse : remplace le texte partiel éventuel et signale une analyse de base
+            yield RepliAnalyse(self._fallback_analyse(profil_utilisateur, recommandations))
+    
+    def _fallback_analyse(self, profil: Dict, recommandations: Dict) -> str:
+        """Analyse de base sans IA en cas d'échec de l'API"""
+        return analyse_de_base(profil, recommandations)
     
     def tester_connexion(self) -> Dict[str, Any]:
         """Test la connexion à l'API"""
@@ -310,7 +776,8 @@ Les formations pour ce métier pourraient nécessiter des recherches supplément
         
         try:
             test_prompt = "Bonjour, veuillez répondre simplement 'Test réussi' pour confirmer la connexion."
-            response = self._appeler_api(test_prompt, {"max_tokens": 20, "temperature": 0})
+            response = self._appeler_api(test_prompt, {"max_tokens": 20, "temperature": 0}, utiliser_cache=False,
+                                         point_acces="test_connexion")
             
             return {
                 "success": True, 
@@ -324,13 +791,121 @@ Les formations pour ce métier pourraient nécessiter des recherches supplément
                 "message": f"Erreur de connexion : {str(e)}"
             }
     
-    def generer_conseil_supplementaire(self, domaine: str) -> str:
+    @PROFILEUR.mesurer("llm.generer_conseil_supplementaire")
+    def generer_conseil_supplementaire(self, domaine: str, priorite: int = PRIORITE_SECONDAIRE) -> str:
         """Génère un conseil supplémentaire pour un domaine spécifique"""
         
         if not self.api_key:
             return f"Conseil : Explorez davantage les opportunités dans le domaine {domaine} au Bénin."
         
-        prompt = f"""Donne un conseil pratique et spécifique de 2-3 phrases pour un étudiant béninois intéressé par le domaine {domaine}. 
+        prompt = self._construire_prompt_conseil(domaine)
+        
+        try:
+            return self._appeler_api(
+                prompt, CONFIG_CONSEIL,
+                priorite=priorite, budget_latence=BUDGET_LATENCE_CONSEIL, point_acces="conseil"
+            )
+        except:
+            return self._conseil_de_repli(domaine)
+    
+    def _conseil_de_repli(self, domaine: str) -> str:
+        """Conseil générique utilisé quand l'API n'a pas fourni celui du domaine"""
+        return f"Explorez les opportunités croissantes dans le domaine {domaine} en vous rapprochant des professionnels locaux et des associations sectorielles."
+    
+    @PROFILEUR.mesurer("llm.generer_conseils_supplementaires")
+    def generer_conseils_supplementaires(self, domaines: List[str],
+                                         priorite: int = PRIORITE_SECONDAIRE) -> Dict[str, str]:
+        """Conseils de plusieurs domaines en une seule requête ; repli pour chaque domaine absent de la réponse"""
+        
+        domaines = list(dict.fromkeys(domaines))
+        if not self.api_key:
+            return {domaine: f"Conseil : Explorez davantage les opportunités dans le domaine {domaine} au Bénin."
+                    for domaine in domaines}
+        
+        try:
+            conseils = self._generer_conseils_groupes(domaines, priorite, "conseils_groupes")
+        except Exception:
+            PROFILEUR.compter("llm.conseils_groupes.replis")
+            conseils = {}
+        return {domaine: conseils.get(domaine) or self._conseil_de_repli(domaine) for domaine in domaines}
+    
+    def _generer_conseils_groupes(self, domaines: List[str], priorite: int, point_acces: str) -> Dict[str, str]:
+        """Conseils en cache, puis un appel par lot pour les autres ; chaque conseil reçu est mis en cache seul"""
+        
+        conseils: Dict[str, str] = {}
+        manquants = []
+        for domaine in domaines:
+            _, payload = self._construire_requete(self._construire_prompt_conseil(domaine), CONFIG_CONSEIL)
+            cle, reponse = self._lire_cache(payload)
+            if reponse is not None:
+                conseils[domaine] = reponse
+            else:
+                manquants.append((domaine, cle))
+        
+        for debut in range(0, len(manquants), TAILLE_LOT_CONSEILS):
+            lot = manquants[debut:debut + TAILLE_LOT_CONSEILS]
+            if len(lot) == 1:
+                # Un seul domaine : requête unitaire, mise en cache sous sa propre clé
+                conseils[lot[0][0]] = self._appeler_api(
+                    self._construire_prompt_conseil(lot[0][0]), CONFIG_CONSEIL,
+                    priorite=priorite, budget_latence=BUDGET_LATENCE_CONSEIL, point_acces=point_acces
+                )
+                continue
+            
+            reponse = self._appeler_api(
+                self._construire_prompt_conseils_groupes([domaine for domaine, _ in lot]),
+                {**CONFIG_CONSEIL, "max_tokens": max_tokens_pour_mots((NB_MOTS_CONSEIL + 10) * len(lot)),
+                 "response_format": {"type": "json_object"}},
+                # Seuls les conseils validés sont mis en cache, chacun sous la clé de sa requête unitaire
+                utiliser_cache=False,
+                priorite=priorite, budget_latence=BUDGET_LATENCE_CONSEIL * 2, point_acces=point_acces
+            )
+            recus = self._extraire_conseils(reponse, [domaine for domaine, _ in lot])
+            for domaine, cle in lot:
+                if domaine in recus:
+                    conseils[domaine] = recus[domaine]
+                    if self.cache:
+                        self.cache.ecrire(cle, recus[domaine])
+                else:
+                    PROFILEUR.compter("llm.conseils_groupes.manquants")
+        
+        return conseils
+    
+    def _construire_prompt_conseils_groupes(self, domaines: List[str]) -> str:
+        """Construit le prompt demandant un objet JSON {domaine: conseil}"""
+        return (
+            "Pour chacun des domaines suivants, donne un conseil pratique et spécifique de 2-3 phrases "
+            "pour un étudiant béninois intéressé par ce domaine : actionnable, adapté au contexte béninois, "
+            "encourageant, sans préambule.\n"
+            f"Domaines : {json.dumps(domaines, ensure_ascii=False)}\n"
+            "Réponds uniquement par un objet JSON dont les clés sont exactement ces domaines "
+            "et les valeurs les conseils."
+        )
+    
+    def _extraire_conseils(self, reponse: str, domaines: List[str]) -> Dict[str, str]:
+        """Valide la réponse JSON et retourne les conseils non vides des domaines demandés"""
+        debut, fin = reponse.find("{"), reponse.rfind("}")
+        try:
+            objet = json.loads(reponse[debut:fin + 1]) if 0 <= debut < fin else None
+        except ValueError:
+            objet = None
+        if not isinstance(objet, dict):
+            PROFILEUR.compter("llm.conseils_groupes.json_invalide")
+            return {}
+        
+        # Clés comparées sans casse ni accents : le modèle ne les recopie pas toujours à l'identique
+        recus = {
+            normaliser_texte(" ".join(str(cle).split())): valeur.strip()
+            for cle, valeur in objet.items() if isinstance(valeur, str) and valeur.strip()
+        }
+        return {
+            domaine: recus[normaliser_texte(" ".join(domaine.split()))]
+            for domaine in domaines if normaliser_texte(" ".join(domaine.split())) in recus
+        }
+    
+    def _construire_prompt_conseil(self, domaine: str) -> str:
+        """Construit le prompt du conseil supplémentaire pour un domaine"""
+        return f"""Donne un conseil pratique et spécifique de 2-3 phrases pour un étudiant béninois intéressé par le domaine {domaine}. 
         
         Le conseil doit être:
         - Actionnable
@@ -338,8 +913,33 @@ Les formations pour ce métier pourraient nécessiter des recherches supplément
         - Encourageant
         
         Commence directement par le conseil sans préambule."""
-        
-        try:
-            return self._appeler_api(prompt, {"max_tokens": 150, "temperature": 0.8})
-        except:
-            return f"Explorez les opportunités croissantes dans le domaine {domaine} en vous rapprochant des professionnels locaux et des associations sectorielles."
+    
+    def prechauffer(self, prompt: str, config_custom: Optional[Dict] = None,
+                    point_acces: str = "prechauffage") -> bool:
+        """Place la réponse d'un prompt en cache à basse priorité ; retourne False si elle y était déjà"""
+        headers, payload = self._construire_requete(prompt, config_custom)
+        if not self.api_key or not self.cache:
+            return False
+        if self.cache.contient(cle_cache(payload["model"], payload, payload["messages"])):
+            return False
+        self._appeler_api(prompt, config_custom, priorite=PRIORITE_ARRIERE_PLAN, point_acces=point_acces)
+        return True
+    
+    def prechauffer_analyse(self, profil_utilisateur: Dict, recommandations: Dict) -> bool:
+        """Pré-génère l'analyse d'un profil (même prompt, donc même clé de cache, qu'une vraie demande)"""
+        donnees_contexte = self._preparer_donnees_contexte(profil_utilisateur, recommandations)
+        return self.prechauffer(self._construire_prompt_analyse(donnees_contexte), CONFIG_ANALYSE)
+    
+    def prechauffer_conseils(self, domaines: List[str]) -> bool:
+        """Pré-génère les conseils de domaines (une requête par lot) ; retourne False s'ils étaient en cache"""
+        if not self.api_key or not self.cache:
+            return False
+        manquants = []
+        for domaine in dict.fromkeys(domaines):
+            _, payload = self._construire_requete(self._construire_prompt_conseil(domaine), CONFIG_CONSEIL)
+            if not self.cache.contient(cle_cache(payload["model"], payload, payload["messages"])):
+                manquants.append(domaine)
+        if not manquants:
+            return False
+        self._generer_conseils_groupes(manquants, PRIORITE_ARRIERE_PLAN, "prechauffage")
+        return True
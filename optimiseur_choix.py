@@ -0,0 +1,209 @@
+"""
+Module d'optimisation des 3 choix de filières à soumettre sur la plateforme apresmonbac
+"""
+
+import heapq
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+from knowledge_base_loader import KnowledgeBaseLoader
+
+# Nombre de choix imposé par la plateforme apresmonbac
+NB_CHOIX = 3
+
+# Seuils indicatifs de moyenne (sur 20) selon la sélectivité de l'admission
+SEUILS_SELECTIVITE = {
+    "très sélectif": 15.0,
+    "sélectif": 13.5,
+    "concours": 12.5,
+    "licence": 12.0,
+    "classement national": 11.0
+}
+SEUIL_PAR_DEFAUT = 11.5
+
+# Valeur relative des types de places selon le statut de l'établissement
+# (bourse / FPP possibles dans le public, formation entièrement payante dans le privé)
+VALEUR_TYPE_PLACE = {
+    "Public": 1.0,
+    "Privé Agréé": 0.6
+}
+
+# Synonymes des matières rencontrés dans les prérequis des filières
+SYNONYMES_MATIERES = {
+    "maths": ["maths", "mathématiques", "math"],
+    "pct": ["pct", "spct", "physique", "sciences physiques"],
+    "svt": ["svt", "sciences naturelles", "biologie"],
+    "français": ["français", "francais"],
+    "anglais": ["anglais"],
+    "histoire": ["histoire", "histoire-géographie"],
+    "philosophie": ["philosophie", "philo"],
+    "économie": ["économie", "economie"]
+}
+
+
+class OptimiseurChoix:
+    """Recherche les triplets de filières qui maximisent l'espérance de résultat d'un candidat"""
+
+    def __init__(self, knowledge_base_loader: KnowledgeBaseLoader):
+        """Initialise l'optimiseur avec une base de connaissances"""
+        self.kb_loader = knowledge_base_loader
+
+        regles = " ".join(self.kb_loader.get_regles_importantes()).lower()
+        self.exiger_faculte_classique = "faculté classique" in regles
+
+    def optimiser(self, serie_bac: str, carriere_envisagee: str,
+                  notes: Optional[Dict[str, float]] = None, nb_resultats: int = 3) -> List[Dict]:
+        """Retourne les meilleurs triplets de choix, classés par espérance décroissante"""
+
+        candidats = self._evaluer_candidats(serie_bac, carriere_envisagee, notes or {})
+        if len(candidats) < NB_CHOIX:
+            return []
+
+        meilleurs = self._rechercher_triplets(candidats, nb_resultats)
+
+        return [
+            {
+                "score": round(score, 4),
+                "choix": [candidats[i] for i in indices]
+            }
+            for score, indices in sorted(meilleurs, reverse=True)
+        ]
+
+    def _evaluer_candidats(self, serie_bac: str, carriere: str, notes: Dict[str, float]) -> List[Dict]:
+        """Calcule probabilité d'admission et valeur de chaque filière accessible"""
+
+        filieres = self.kb_loader.rechercher_filieres_par_serie(serie_bac)
+
+        # Filières préparant directement au métier envisagé
+        cibles_directes = {
+            (univ["nom_universite"], filiere["faculte"], filiere["nom_filiere"])
+            for univ in self.kb_loader.rechercher_universites_pour_metier(carriere, serie_bac)
+            for filiere in univ["filieres_recommandees"]
+        }
+
+        # Métiers du même secteur que le métier envisagé
+        metier = self.kb_loader.rechercher_metier(carriere) if carriere else None
+        metiers_secteur = set()
+        if metier:
+            metiers_secteur = {
+                m.nom_metier.lower()
+                for m in self.kb_loader.rechercher_metiers_par_secteur(metier.secteur_activite)
+            }
+
+        candidats = []
+        for filiere in filieres:
+            cle = (filiere["nom_universite"], filiere["faculte"], filiere["nom_filiere"])
+
+            if cle in cibles_directes:
+                adequation = 1.0
+            elif any(m.lower() in metiers_secteur for m in filiere["metiers_vises_typiques"]):
+                adequation = 0.6
+            else:
+                adequation = 0.2
+
+            probabilite = self._probabilite_admission(filiere, notes)
+            valeur = adequation * VALEUR_TYPE_PLACE.get(filiere["statut"], 0.6)
+
+            candidats.append({
+                **filiere,
+                "adequation_metier": adequation,
+                "probabilite_admission": round(probabilite, 4),
+                "valeur": valeur
+            })
+
+        # L'ordre optimal des choix pour des admissions indépendantes est la valeur décroissante
+        candidats.sort(key=lambda c: (-c["valeur"], -c["probabilite_admission"]))
+        return candidats
+
+    def _probabilite_admission(self, filiere: Dict, notes: Dict[str, float]) -> float:
+        """Estime la probabilité d'admission à partir des notes et de la sélectivité"""
+
+        conditions = f"{filiere.get('conditions_admission_texte', '')} {filiere.get('autres_prerequis', '')}".lower()
+
+        seuil = SEUIL_PAR_DEFAUT
+        for mot_cle, valeur_seuil in SEUILS_SELECTIVITE.items():
+            if mot_cle in conditions:
+                seuil = valeur_seuil
+                break
+
+        moyenne = self._moyenne_ponderee(conditions, notes)
+        if moyenne is None:
+            # Sans notes, seule la sélectivité est prise en compte
+            moyenne = 12.0
+
+        return 1.0 / (1.0 + math.exp(-(moyenne - seuil) / 1.2))
+
+    def _moyenne_ponderee(self, conditions: str, notes: Dict[str, float]) -> Optional[float]:
+        """Moyenne des notes dans les matières citées par la filière (toutes les notes à défaut)"""
+
+        notes_valides = {m.lower(): n for m, n in notes.items() if n is not None}
+        if not notes_valides:
+            return None
+
+        mots_conditions = set(re.findall(r'\w+', conditions))
+        retenues = []
+        for matiere, note in notes_valides.items():
+            synonymes = SYNONYMES_MATIERES.get(matiere, [matiere])
+            if any(set(re.findall(r'\w+', synonyme)) <= mots_conditions for synonyme in synonymes):
+                retenues.append(note)
+
+        if not retenues:
+            retenues = list(notes_valides.values())
+
+        return sum(retenues) / len(retenues)
+
+    def _rechercher_triplets(self, candidats: List[Dict], nb_resultats: int) -> List[Tuple[float, Tuple[int, int, int]]]:
+        """Séparation et évaluation (branch and bound) sur les triplets ordonnés par valeur"""
+
+        n = len(candidats)
+        p = [c["probabilite_admission"] for c in candidats]
+        v = [c["valeur"] for c in candidats]
+        classique = [c["faculte_classique"] for c in candidats]
+
+        # Meilleur gain p*v atteignable à partir de l'indice k (toutes filières / facultés classiques)
+        gain_max = [0.0] * (n + 1)
+        gain_max_classique = [0.0] * (n + 1)
+        for k in range(n - 1, -1, -1):
+            gain = p[k] * v[k]
+            gain_max[k] = max(gain_max[k + 1], gain)
+            gain_max_classique[k] = max(gain_max_classique[k + 1], gain if classique[k] else 0.0)
+
+        if self.exiger_faculte_classique and not any(classique):
+            return []
+
+        meilleurs: List[Tuple[float, Tuple[int, int, int]]] = []
+
+        def seuil_courant() -> float:
+            return meilleurs[0][0] if len(meilleurs) >= nb_resultats else -1.0
+
+        for i in range(n - 2):
+            # Les valeurs étant triées, aucun choix ultérieur ne rapporte plus que v[i + 1]
+            if p[i] * v[i] + (1 - p[i]) * v[i + 1] <= seuil_courant():
+                continue
+
+            for j in range(i + 1, n - 1):
+                if p[i] * v[i] + (1 - p[i]) * v[j] <= seuil_courant():
+                    break
+
+                rang_2 = p[i] * v[i] + (1 - p[i]) * p[j] * v[j]
+                reste = (1 - p[i]) * (1 - p[j])
+
+                besoin_classique = self.exiger_faculte_classique and not (classique[i] or classique[j])
+                borne = rang_2 + reste * (gain_max_classique[j + 1] if besoin_classique else gain_max[j + 1])
+                if borne <= seuil_courant():
+                    continue
+
+                gains_restants = gain_max_classique if besoin_classique else gain_max
+                for k in range(j + 1, n):
+                    if rang_2 + reste * gains_restants[k] <= seuil_courant():
+                        break
+                    if besoin_classique and not classique[k]:
+                        continue
+
+                    score = rang_2 + reste * p[k] * v[k]
+                    if len(meilleurs) < nb_resultats:
+                        heapq.heappush(meilleurs, (score, (i, j, k)))
+                    elif score > meilleurs[0][0]:
+                        heapq.heapreplace(meilleurs, (score, (i, j, k)))
+
+        return meilleurs
@@ -0,0 +1,384 @@
+"""
+Module de préchauffage du cache IA : pré-génération des analyses des profils les plus demandés
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from limiteur_debit import ChargeExcessive
+from disjoncteur import CircuitOuvert
+from comptabilite_tokens import BudgetTokensEpuise
+from llm_interface import TAILLE_LOT_CONSEILS
+
+try:
+    import fcntl
+except ImportError:
+    # Plateforme sans verrous de fichiers POSIX : chaque processus peut préchauffer
+    fcntl = None
+
+# Valeurs par défaut, surchargeables dans la section [prechauffage] de .streamlit/secrets.toml
+CONFIG_PRECHAUFFAGE_PAR_DEFAUT = {
+    "actif": False,               # désactivé par défaut : chaque pré-génération est facturée
+    "profils": [],                # combinaisons configurées "série du BAC|métier", prioritaires
+    "nb_profils": 100,            # combinaisons les plus demandées reprises du journal
+    "budget_requetes": 200,       # requêtes API au maximum par passe
+    "requetes_par_minute": 10,    # débit propre au préchauffage (sous celui de [debit])
+    "heures_creuses": [1, 6],     # plage horaire locale [début, fin[
+    "intervalle_minutes": 30      # fréquence de vérification du besoin d'une passe
+}
+
+STATUT_ELEVE = "Élève (Futur Bachelier)"
+
+# Délai minimal entre deux passes sur une même version de la base
+DELAI_ENTRE_PASSES = 20 * 3600
+
+CHAMPS_DEMANDE = ("statut", "serie_bac", "filiere_actuelle", "carriere_envisagee")
+
+
+class JournalDemande:
+    """Compte les combinaisons de profil demandées (jamais le nom, le prénom ni les notes)"""
+
+    def __init__(self, chemin: str):
+        """Ouvre (ou crée) les tables du journal dans la base SQLite du cache"""
+        self.chemin = chemin
+        self._local = threading.local()
+
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+        connexion = self._connexion()
+        connexion.execute(
+            "CREATE TABLE IF NOT EXISTS demande ("
+            " statut TEXT NOT NULL, serie_bac TEXT NOT NULL, filiere_actuelle TEXT NOT NULL,"
+            " carriere_envisagee TEXT NOT NULL, nb INTEGER NOT NULL, derniere_demande REAL NOT NULL,"
+            " PRIMARY KEY (statut, serie_bac, filiere_actuelle, carriere_envisagee))"
+        )
+        connexion.execute(
+            "CREATE TABLE IF NOT EXISTS prechauffage ("
+            " id INTEGER PRIMARY KEY CHECK (id = 1), version_kb TEXT NOT NULL, fin REAL NOT NULL,"
+            " requetes INTEGER NOT NULL)"
+        )
+        connexion.commit()
+
+    def _connexion(self) -> sqlite3.Connection:
+        """Connexion SQLite propre au thread courant (mode WAL pour les accès concurrents)"""
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin, timeout=10)
+            connexion.execute("PRAGMA journal_mode=WAL")
+            self._local.connexion = connexion
+        return connexion
+
+    def enregistrer(self, profil: Dict) -> None:
+        """Compte une demande pour la combinaison du profil"""
+        valeurs = tuple((profil.get(champ) or "").strip() for champ in CHAMPS_DEMANDE)
+        if not valeurs[-1]:
+            return
+        try:
+            connexion = self._connexion()
+            connexion.execute(
+                "INSERT INTO demande VALUES (?, ?, ?, ?, 1, ?)"
+                " ON CONFLICT (statut, serie_bac, filiere_actuelle, carriere_envisagee) DO UPDATE SET"
+                " nb = nb + 1, derniere_demande = excluded.derniere_demande",
+                (*valeurs, time.time())
+            )
+            connexion.commit()
+        except sqlite3.Error:
+            pass
+
+    def plus_demandes(self, nombre: int) -> List[Dict[str, Any]]:
+        """Combinaisons les plus demandées, de la plus fréquente à la moins fréquente"""
+        try:
+            lignes = self._connexion().execute(
+                "SELECT statut, serie_bac, filiere_actuelle, carriere_envisagee, nb FROM demande"
+                " ORDER BY nb DESC, derniere_demande DESC LIMIT ?",
+                (nombre,)
+            ).fetchall()
+        except sqlite3.Error:
+            return []
+
+        return [
+            {
+                **{champ: valeur or None for champ, valeur in zip(CHAMPS_DEMANDE, ligne[:4])},
+                "nb_demandes": ligne[4]
+            }
+            for ligne in lignes
+        ]
+
+    def demandes_par_carriere(self) -> Dict[str, int]:
+        """Nombre de demandes par carrière envisagée, toutes séries et filières confondues"""
+        try:
+            lignes = self._connexion().execute(
+                "SELECT carriere_envisagee, SUM(nb) FROM demande GROUP BY carriere_envisagee"
+            ).fetchall()
+        except sqlite3.Error:
+            return {}
+        return dict(lignes)
+
+    def derniere_passe(self) -> Optional[Dict[str, Any]]:
+        """Version de la base et date de fin de la dernière passe de préchauffage (None si aucune)"""
+        try:
+            ligne = self._connexion().execute(
+                "SELECT version_kb, fin, requetes FROM prechauffage WHERE id = 1"
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return {"version_kb": ligne[0], "fin": ligne[1], "requetes": ligne[2]} if ligne else None
+
+    def noter_passe(self, version_kb: str, requetes: int) -> None:
+        """Enregistre la fin d'une passe de préchauffage"""
+        connexion = self._connexion()
+        connexion.execute(
+            "INSERT OR REPLACE INTO prechauffage (id, version_kb, fin, requetes) VALUES (1, ?, ?, ?)",
+            (version_kb, time.time(), requetes)
+        )
+        connexion.commit()
+
+
+def _dans_plage(heure: int, plage: List[int]) -> bool:
+    """Vrai si l'heure est dans la plage [début, fin[ (la plage peut passer minuit)"""
+    debut, fin = plage
+    if debut <= fin:
+        return debut <= heure < fin
+    return heure >= debut or heure < fin
+
+
+class Prechauffeur:
+    """Pré-génère en basse priorité les analyses et conseils des combinaisons les plus demandées"""
+
+    def __init__(self, moteur, llm_interface, journal: JournalDemande, version_kb: str = "",
+                 profils: Optional[List[str]] = None, nb_profils: int = 100, budget_requetes: int = 200,
+                 requetes_par_minute: float = 10, heures_creuses: Optional[List[int]] = None,
+                 intervalle_minutes: float = 30):
+        """Prépare le préchauffage (aucune requête n'est envoyée avant executer ou demarrer)"""
+        self.moteur = moteur
+        self.llm_interface = llm_interface
+        self.journal = journal
+        self.version_kb = version_kb
+        self.profils = list(profils or [])
+        self.nb_profils = nb_profils
+        self.budget_requetes = budget_requetes
+        self.intervalle_requetes = 60.0 / requetes_par_minute if requetes_par_minute > 0 else 0.0
+        self.heures_creuses = list(heures_creuses or CONFIG_PRECHAUFFAGE_PAR_DEFAUT["heures_creuses"])
+        self.intervalle_verification = intervalle_minutes * 60
+
+        self._thread: Optional[threading.Thread] = None
+        self._verrou = threading.Lock()
+        self.derniere_execution: Dict[str, Any] = {}
+
+    def candidats(self) -> List[Dict]:
+        """Profils configurés puis les plus demandés, sans doublon"""
+        candidats: List[Dict] = []
+        vus = set()
+
+        configures = []
+        for entree in self.profils:
+            serie_bac, _, metier = entree.partition("|")
+            configures.append({
+                "statut": STATUT_ELEVE, "serie_bac": serie_bac.strip(),
+                "filiere_actuelle": None, "carriere_envisagee": metier.strip()
+            })
+
+        for profil in configures + self.journal.plus_demandes(self.nb_profils):
+            cle = tuple((profil.get(champ) or "").lower() for champ in CHAMPS_DEMANDE)
+            if not profil.get("carriere_envisagee") or cle in vus:
+                continue
+            vus.add(cle)
+            candidats.append({champ: profil.get(champ) for champ in CHAMPS_DEMANDE})
+        return candidats
+
+    def doit_executer(self, maintenant: Optional[datetime] = None) -> bool:
+        """Passe nécessaire si la base a changé, ou en heures creuses si la dernière passe est ancienne"""
+        passe = self.journal.derniere_passe()
+        if passe is None or passe["version_kb"] != self.version_kb:
+            return True
+
+        maintenant = maintenant or datetime.now()
+        return (_dans_plage(maintenant.hour, self.heures_creuses)
+                and maintenant.timestamp() - passe["fin"] >= DELAI_ENTRE_PASSES)
+
+    def executer(self, budget_requetes: Optional[int] = None) -> Dict[str, Any]:
+        """Exécute une passe complète (un seul processus à la fois) et retourne son bilan"""
+        budget = self.budget_requetes if budget_requetes is None else budget_requetes
+        with self._verrou_processus() as obtenu:
+            if not obtenu:
+                return {"ignore": "passe en cours dans un autre processus"}
+            bilan = self._executer(budget)
+            self.journal.noter_passe(self.version_kb, bilan["requetes"])
+
+        self.derniere_execution = bilan
+        return bilan
+
+    def _executer(self, budget: int) -> Dict[str, Any]:
+        """Analyses des candidats puis conseils de leurs secteurs, dans la limite du budget"""
+        debut = time.monotonic()
+        bilan: Dict[str, Any] = {"candidats": 0, "requetes": 0, "deja_en_cache": 0, "arret": None}
+        domaines: List[str] = []
+
+        def prechauffer(fonction, *args) -> bool:
+            """Une pré-génération ; faux s'il faut arrêter la passe"""
+            if bilan["requetes"] >= budget:
+                bilan["arret"] = "budget atteint"
+                return False
+            try:
+                if fonction(*args):
+                    bilan["requetes"] += 1
+                    time.sleep(self.intervalle_requetes)
+                else:
+                    bilan["deja_en_cache"] += 1
+            except (ChargeExcessive, CircuitOuvert, BudgetTokensEpuise) as e:
+                # File pleine, API indisponible ou budget du jour atteint : reprise à la prochaine passe
+                bilan["arret"] = str(e)
+                return False
+            return True
+
+        for profil in self.candidats():
+            bilan["candidats"] += 1
+            recommandations = self.moteur.generer_recommandations(profil)
+            if not prechauffer(self.llm_interface.prechauffer_analyse, profil, recommandations):
+                break
+
+            metier_analyse = recommandations.get("metier_analyse", {})
+            if metier_analyse.get("metier_trouve"):
+                domaine = metier_analyse["metier_obj"].secteur_activite
+                if domaine not in domaines:
+                    domaines.append(domaine)
+        else:
+            # Conseils demandés par lots : une requête pour TAILLE_LOT_CONSEILS domaines
+            for indice in range(0, len(domaines), TAILLE_LOT_CONSEILS):
+                lot = domaines[indice:indice + TAILLE_LOT_CONSEILS]
+                if not prechauffer(self.llm_interface.prechauffer_conseils, lot):
+                    break
+
+        bilan["domaines"] = len(domaines)
+        bilan["duree_s"] = round(time.monotonic() - debut, 1)
+        return bilan
+
+    def _verrou_processus(self):
+        """Verrou de fichier non bloquant : un seul processus préchauffe à la fois"""
+        return _VerrouNonBloquant(os.path.join(os.path.dirname(self.journal.chemin), "prechauffage.lock"))
+
+    def demarrer(self) -> None:
+        """Lance la boucle de préchauffage dans un thread d'arrière-plan (une seule fois)"""
+        with self._verrou:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._boucle, name="llm-prechauffage", daemon=True)
+            self._thread.start()
+
+    def _boucle(self) -> None:
+        """Vérifie périodiquement si une passe est nécessaire"""
+        while True:
+            try:
+                if self.doit_executer():
+                    self.executer()
+            except Exception as e:
+                print(f"Erreur lors du préchauffage du cache IA : {e}")
+            time.sleep(self.intervalle_verification)
+
+    def statistiques(self) -> Dict[str, Any]:
+        """Dernière passe enregistrée et bilan de la dernière passe de ce processus"""
+        return {
+            "actif": self._thread is not None,
+            "derniere_passe": self.journal.derniere_passe(),
+            "derniere_execution": self.derniere_execution,
+            "combinaisons_suivies": len(self.journal.plus_demandes(10 ** 6))
+        }
+
+
+class _VerrouNonBloquant:
+    """Verrou de fichier exclusif tenté une seule fois ; indique s'il a été obtenu"""
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self._fichier = None
+
+    def __enter__(self) -> bool:
+        if not fcntl:
+            return True
+        self._fichier = open(self.chemin, "a")
+        try:
+            fcntl.flock(self._fichier, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            self._fichier.close()
+            self._fichier = None
+            return False
+
+    def __exit__(self, *exc) -> None:
+        if self._fichier:
+            fcntl.flock(self._fichier, fcntl.LOCK_UN)
+            self._fichier.close()
+            self._fichier = None
+
+
+_journal_partage: Optional[JournalDemande] = None
+_prechauffeur_partage: Optional[Prechauffeur] = None
+_verrou_prechauffage = threading.Lock()
+
+
+def obtenir_journal_demande(llm_interface) -> Optional[JournalDemande]:
+    """Retourne le journal unique du processus, stocké avec le cache IA (None sans cache)"""
+    global _journal_partage
+    if _journal_partage is None and llm_interface.cache:
+        with _verrou_prechauffage:
+            if _journal_partage is None:
+                _journal_partage = JournalDemande(llm_interface.cache.chemin)
+    return _journal_partage
+
+
+def obtenir_prechauffeur(moteur, llm_interface, version_kb: str = "") -> Optional[Prechauffeur]:
+    """Retourne le préchauffeur unique du processus (None sans cache IA ou sans clé API)"""
+    global _prechauffeur_partage
+    journal = obtenir_journal_demande(llm_interface)
+    if journal is None or not llm_interface.api_key:
+        return None
+    if _prechauffeur_partage is None:
+        with _verrou_prechauffage:
+            if _prechauffeur_partage is None:
+                config = llm_interface.lire_config_secrets("prechauffage", CONFIG_PRECHAUFFAGE_PAR_DEFAUT)
+                config.pop("actif")
+                _prechauffeur_partage = Prechauffeur(moteur, llm_interface, journal, version_kb, **config)
+    return _prechauffeur_partage
+
+
+def demarrer_prechauffage(moteur, llm_interface, version_kb: str = "") -> Optional[Prechauffeur]:
+    """Démarre le préchauffage en arrière-plan s'il est activé dans les secrets"""
+    config = llm_interface.lire_config_secrets("prechauffage", CONFIG_PRECHAUFFAGE_PAR_DEFAUT)
+    if not config["actif"]:
+        return None
+    prechauffeur = obtenir_prechauffeur(moteur, llm_interface, version_kb)
+    if prechauffeur:
+        prechauffeur.demarrer()
+    return prechauffeur
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Exécute immédiatement une passe de préchauffage et affiche son bilan"""
+    analyseur = argparse.ArgumentParser(description="Préchauffage du cache des réponses IA")
+    analyseur.add_argument("--budget", type=int, default=None, help="requêtes API au maximum")
+    options = analyseur.parse_args(arguments)
+
+    from knowledge_base_loader import KnowledgeBaseLoader
+    from recommendation_logic_student import RecommendationEngine
+    from llm_interface import LLMInterface
+
+    kb_loader = KnowledgeBaseLoader()
+    llm_interface = LLMInterface(kb_loader.version_contenu)
+    prechauffeur = obtenir_prechauffeur(RecommendationEngine(kb_loader), llm_interface, kb_loader.version_contenu)
+    if prechauffeur is None:
+        print("Préchauffage impossible : clé API ou cache des réponses indisponible")
+        return
+
+    print(json.dumps(prechauffeur.executer(options.budget), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Module d'instrumentation légère du pipeline de recommandation (durées par étape et compteurs)
+"""
+
+import functools
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+# Nombre d'échantillons conservés par étape pour le calcul des percentiles
+TAILLE_FENETRE = 2000
+
+
+def _percentile(valeurs_triees: List[float], p: float) -> float:
+    """Percentile par la méthode du rang le plus proche"""
+    if not valeurs_triees:
+        return 0.0
+    rang = max(0, math.ceil(p / 100 * len(valeurs_triees)) - 1)
+    return valeurs_triees[rang]
+
+
+class Profileur:
+    """Agrégateur de mesures partagé par tout le processus"""
+
+    def __init__(self, actif: bool = False):
+        """Initialise un profileur (inactif par défaut : coût quasi nul)"""
+        self.actif = actif
+        self._verrou = threading.Lock()
+        self._local = threading.local()
+        self._durees: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=TAILLE_FENETRE))
+        self._appels: Dict[str, int] = defaultdict(int)
+        self._totaux: Dict[str, float] = defaultdict(float)
+        self._parents: Dict[str, Optional[str]] = {}
+        self._compteurs: Dict[str, int] = defaultdict(int)
+
+    def _pile(self) -> List[str]:
+        """Pile des étapes en cours pour le thread courant (mesures imbriquées)"""
+        pile = getattr(self._local, "pile", None)
+        if pile is None:
+            pile = self._local.pile = []
+        return pile
+
+    def _enregistrer(self, etape: str, duree: float, parent: Optional[str]) -> None:
+        """Enregistre la durée d'une étape"""
+        with self._verrou:
+            self._durees[etape].append(duree)
+            self._appels[etape] += 1
+            self._totaux[etape] += duree
+            self._parents.setdefault(etape, parent)
+
+    @contextmanager
+    def mesure(self, etape: str):
+        """Mesure la durée d'un bloc avec une horloge monotone"""
+        if not self.actif:
+            yield
+            return
+
+        pile = self._pile()
+        parent = pile[-1] if pile else None
+        pile.append(etape)
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            duree = time.perf_counter() - debut
+            pile.pop()
+            self._enregistrer(etape, duree, parent)
+
+    def enregistrer(self, etape: str, duree: float) -> None:
+        """Enregistre une durée mesurée ailleurs (ex: temps jusqu'au premier token)"""
+        if not self.actif:
+            return
+        pile = self._pile()
+        self._enregistrer(etape, duree, pile[-1] if pile else None)
+
+    def mesurer(self, etape: str) -> Callable:
+        """Décorateur : mesure chaque appel de la fonction décorée"""
+        def decorateur(fonction: Callable) -> Callable:
+            @functools.wraps(fonction)
+            def enveloppe(*args, **kwargs):
+                if not self.actif:
+                    return fonction(*args, **kwargs)
+                with self.mesure(etape):
+                    return fonction(*args, **kwargs)
+            return enveloppe
+        return decorateur
+
+    def compter(self, compteur: str, increment: int = 1) -> None:
+        """Incrémente un compteur (ex: accès à un index ou parcours complet)"""
+        if not self.actif:
+            return
+        with self._verrou:
+            self._compteurs[compteur] += increment
+
+    def statistiques(self) -> List[Dict[str, Any]]:
+        """Statistiques par étape : appels, total et percentiles p50/p95/p99 en millisecondes"""
+        with self._verrou:
+            instantane = {etape: sorted(durees) for etape, durees in self._durees.items()}
+            appels = dict(self._appels)
+            totaux = dict(self._totaux)
+            parents = dict(self._parents)
+
+        return sorted(
+            (
+                {
+                    "etape": etape,
+                    "parent": parents.get(etape) or "",
+                    "appels": appels[etape],
+                    "total_ms": round(totaux[etape] * 1000, 3),
+                    "p50_ms": round(_percentile(durees, 50) * 1000, 3),
+                    "p95_ms": round(_percentile(durees, 95) * 1000, 3),
+                    "p99_ms": round(_percentile(durees, 99) * 1000, 3)
+                }
+                for etape, durees in instantane.items()
+            ),
+            key=lambda ligne: -ligne["total_ms"]
+        )
+
+    def compteurs(self) -> Dict[str, int]:
+        """Valeurs courantes des compteurs"""
+        with self._verrou:
+            return dict(self._compteurs)
+
+    def reinitialiser(self) -> None:
+        """Efface toutes les mesures et tous les compteurs"""
+        with self._verrou:
+            self._durees.clear()
+            self._appels.clear()
+            self._totaux.clear()
+            self._parents.clear()
+            self._compteurs.clear()
+
+
+# Profileur unique du processus (activable avec ORIENTATION_PROFILAGE=1 ou depuis l'application)
+PROFILEUR = Profileur(actif=os.environ.get("ORIENTATION_PROFILAGE", "0") == "1")
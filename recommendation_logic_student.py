@@ -2,9 +2,77 @@
 Module contenant la logique de recommandation pour le système d'orientation
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterator, Tuple
 from knowledge_base_loader import KnowledgeBaseLoader, Metier
+from optimiseur_choix import OptimiseurChoix
+from graphe_parcours import GrapheParcours
+from classificateur_texte import ClassificateurTexte
+from profilage import PROFILEUR
+import heapq
 import re
+import threading
+
+# Nombre d'universités retenues dans les recommandations (première page)
+NB_UNIVERSITES_RECOMMANDEES = 10
+
+def decrire_metier(metier: Metier) -> Dict[str, Any]:
+    """Analyse d'un métier trouvé dans la base"""
+    return {
+        "metier_trouve": True,
+        "metier_obj": metier,
+        "secteur": metier.secteur_activite,
+        "demande_marche": metier.niveau_demande_marche,
+        "pertinence_benin": metier.pertinence_realites_africaines_benin,
+        "competences_requises": {
+            "techniques": metier.competences_requises_techniques,
+            "transversales": metier.competences_requises_transversales
+        },
+        "formations_typiques": metier.formations_typiques_generales
+    }
+
+def cle_classement_universite(universite: Dict) -> Tuple:
+    """Clé de tri : nombre de filières compatibles, statut public, durée d'études la plus courte"""
+    filieres = universite.get("filieres_recommandees", [])
+    return (
+        -len(filieres),
+        universite["statut"] != "Public",
+        min((f["duree_etudes_ans"] for f in filieres), default=99),
+        universite["nom_universite"]
+    )
+
+class PaginateurUniversites:
+    """Parcourt un classement d'universités page par page sans recalculer les pages déjà servies"""
+    
+    def __init__(self, classement: Iterator[Dict], taille_page: int = 5):
+        """Initialise le paginateur à partir d'un générateur classé"""
+        self._classement = classement
+        self._deja_servies: List[Dict] = []
+        self._epuise = False
+        self.taille_page = taille_page
+    
+    def _charger_jusqua(self, nombre: int) -> None:
+        """Consomme le générateur jusqu'à disposer de `nombre` universités (ou épuisement)"""
+        while not self._epuise and len(self._deja_servies) < nombre:
+            try:
+                self._deja_servies.append(next(self._classement))
+            except StopIteration:
+                self._epuise = True
+    
+    def page(self, numero: int) -> List[Dict]:
+        """Retourne la page demandée (numérotée à partir de 0)"""
+        debut = numero * self.taille_page
+        self._charger_jusqua(debut + self.taille_page)
+        return self._deja_servies[debut:debut + self.taille_page]
+    
+    def jusqua_page(self, numero: int) -> List[Dict]:
+        """Retourne toutes les universités des pages 0 à `numero` inclus"""
+        self._charger_jusqua((numero + 1) * self.taille_page)
+        return self._deja_servies[:(numero + 1) * self.taille_page]
+    
+    def a_page_suivante(self, numero: int) -> bool:
+        """Indique s'il reste des universités après la page `numero`"""
+        self._charger_jusqua((numero + 1) * self.taille_page + 1)
+        return len(self._deja_servies) > (numero + 1) * self.taille_page
 
 class RecommendationEngine:
     """Moteur de recommandation pour l'orientation professionnelle"""
@@ -12,6 +80,9 @@ class RecommendationEngine:
     def __init__(self, knowledge_base_loader: KnowledgeBaseLoader):
         """Initialise le moteur avec une base de connaissances"""
         self.kb_loader = knowledge_base_loader
+        self.classificateur = ClassificateurTexte(knowledge_base_loader)
+        self.optimiseur_choix = OptimiseurChoix(knowledge_base_loader)
+        self.graphe_parcours = GrapheParcours(knowledge_base_loader, self.classificateur)
         
         # Mapping des séries de BAC vers leurs domaines
         self.series_bac_mapping = {
@@ -31,20 +102,24 @@ class RecommendationEngine:
             "G3": {"domaine": "Commerce", "type": "tertiaire"}
         }
     
-    def generer_recommandations(self, profil_utilisateur: Dict) -> Dict[str, Any]:
-        """Génère des recommandations personnalisées basées sur le profil utilisateur"""
+    @PROFILEUR.mesurer("moteur.generer_recommandations")
+    def generer_recommandations(self, profil_utilisateur: Dict,
+                                classement: Optional[List[Tuple]] = None) -> Dict[str, Any]:
+        """Génère des recommandations personnalisées (classement : candidates déjà classées, réutilisées)"""
         
         recommandations = {
             "profil_analyse": self._analyser_profil(profil_utilisateur),
             "metier_analyse": self._analyser_metier_envisage(profil_utilisateur["carriere_envisagee"]),
-            "universites_recommandees": self._recommander_universites(profil_utilisateur),
+            "universites_recommandees": self._recommander_universites(profil_utilisateur, classement),
             "carrieres_alternatives": self._proposer_carrieres_alternatives(profil_utilisateur),
             "compatibilite_scores": self._calculer_compatibilite(profil_utilisateur),
-            "parcours_suggere": self._suggerer_parcours(profil_utilisateur)
+            "parcours_suggere": self._suggerer_parcours(profil_utilisateur),
+            "choix_optimises": self._optimiser_choix(profil_utilisateur)
         }
         
         return recommandations
     
+    @PROFILEUR.mesurer("moteur.analyser_profil")
     def _analyser_profil(self, profil: Dict) -> Dict[str, Any]:
         """Analyse le profil de l'utilisateur"""
         
@@ -80,63 +155,80 @@ class RecommendationEngine:
         
         return analyse
     
+    @PROFILEUR.mesurer("moteur.analyser_metier_envisage")
     def _analyser_metier_envisage(self, carriere_envisagee: str) -> Dict[str, Any]:
         """Analyse le métier envisagé par l'utilisateur"""
         
         metier = self.kb_loader.rechercher_metier(carriere_envisagee)
         
         if metier:
-            return {
-                "metier_trouve": True,
-                "metier_obj": metier,
-                "secteur": metier.secteur_activite,
-                "demande_marche": metier.niveau_demande_marche,
-                "pertinence_benin": metier.pertinence_realites_africaines_benin,
-                "competences_requises": {
-                    "techniques": metier.competences_requises_techniques,
-                    "transversales": metier.competences_requises_transversales
-                },
-                "formations_typiques": metier.formations_typiques_generales
-            }
+            return decrire_metier(metier)
         else:
             return {
                 "metier_trouve": False,
                 "suggestions_similaires": self._chercher_metiers_similaires(carriere_envisagee)
             }
     
-    def _recommander_universites(self, profil: Dict) -> List[Dict]:
+    @PROFILEUR.mesurer("moteur.recommander_universites")
+    def _recommander_universites(self, profil: Dict, classement: Optional[List[Tuple]] = None) -> List[Dict]:
         """Recommande des universités basées sur le profil et la carrière envisagée"""
         
+        if classement is None:
+            # Tas borné : seules les meilleures universités sont conservées
+            return heapq.nsmallest(
+                NB_UNIVERSITES_RECOMMANDEES,
+                self._iterer_universites_candidates(profil),
+                key=cle_classement_universite
+            )
+        
+        # Classement déjà calculé : lu sans être consommé (il sert ensuite à la pagination)
+        return [univ for _, _, univ in heapq.nsmallest(NB_UNIVERSITES_RECOMMANDEES, classement)]
+    
+    def _iterer_universites_candidates(self, profil: Dict) -> Iterator[Dict]:
+        """Produit les universités candidates, dédoublonnées par identifiant stable"""
+        
         carriere = profil["carriere_envisagee"]
         serie_bac = profil.get("serie_bac")
+        ids_vus = set()
         
         # Rechercher directement dans la base de connaissances
-        universites_directes = self.kb_loader.rechercher_universites_pour_metier(carriere, serie_bac)
-        
-        # Si peu de résultats, élargir la recherche
-        if len(universites_directes) < 3:
-            # Rechercher des métiers similaires
-            metiers_similaires = self._chercher_metiers_similaires(carriere)
-            for metier_similaire in metiers_similaires[:3]:
-                universites_similaires = self.kb_loader.rechercher_universites_pour_metier(
-                    metier_similaire, serie_bac
-                )
-                universites_directes.extend(universites_similaires)
-        
-        # Dédoublonner et limiter
-        universites_uniques = []
-        noms_vus = set()
-        
-        for univ in universites_directes:
-            if univ["nom_universite"] not in noms_vus:
-                universites_uniques.append(univ)
-                noms_vus.add(univ["nom_universite"])
-        
-        # Prioriser les universités publiques
-        universites_uniques.sort(key=lambda x: (x["statut"] != "Public", x["nom_universite"]))
-        
-        return universites_uniques[:10]  # Limiter à 10 recommandations
+        for univ in self.kb_loader.rechercher_universites_pour_metier(carriere, serie_bac):
+            if univ["id_universite"] not in ids_vus:
+                ids_vus.add(univ["id_universite"])
+                yield univ
+        
+        # Si peu de résultats, élargir la recherche aux métiers similaires
+        if len(ids_vus) < 3:
+            PROFILEUR.compter("moteur.expansion_metiers_similaires")
+            for metier_similaire in self._chercher_metiers_similaires(carriere)[:3]:
+                for univ in self.kb_loader.rechercher_universites_pour_metier(metier_similaire, serie_bac):
+                    if univ["id_universite"] not in ids_vus:
+                        ids_vus.add(univ["id_universite"])
+                        yield univ
+    
+    def classer_candidates(self, profil: Dict) -> List[Tuple]:
+        """Universités candidates en tas (clé de classement, ordre, université), en un seul passage"""
+        
+        tas = [
+            (cle_classement_universite(univ), ordre, univ)
+            for ordre, univ in enumerate(self._iterer_universites_candidates(profil))
+        ]
+        heapq.heapify(tas)
+        return tas
+    
+    def classer_universites(self, profil: Dict, classement: Optional[List[Tuple]] = None) -> Iterator[Dict]:
+        """Générateur paresseux des universités, de la mieux classée à la moins bien classée"""
+        
+        tas = self.classer_candidates(profil) if classement is None else classement
+        while tas:
+            yield heapq.heappop(tas)[2]
+    
+    def paginer_universites(self, profil: Dict, taille_page: int = 5,
+                            classement: Optional[List[Tuple]] = None) -> PaginateurUniversites:
+        """Crée un paginateur sur le classement des universités (consomme le classement fourni)"""
+        return PaginateurUniversites(self.classer_universites(profil, classement), taille_page)
     
+    @PROFILEUR.mesurer("moteur.proposer_carrieres_alternatives")
     def _proposer_carrieres_alternatives(self, profil: Dict) -> List[Metier]:
         """Propose des carrières alternatives basées sur le profil"""
         
@@ -162,6 +254,7 @@ class RecommendationEngine:
         
         return alternatives[:5]
     
+    @PROFILEUR.mesurer("moteur.calculer_compatibilite")
     def _calculer_compatibilite(self, profil: Dict) -> Dict[str, float]:
         """Calcule des scores de compatibilité pour différents aspects"""
         
@@ -198,6 +291,7 @@ class RecommendationEngine:
         
         return scores
     
+    @PROFILEUR.mesurer("moteur.suggerer_parcours")
     def _suggerer_parcours(self, profil: Dict) -> Dict[str, Any]:
         """Suggère un parcours personnalisé"""
         
@@ -205,25 +299,46 @@ class RecommendationEngine:
             "etapes": [],
             "duree_totale": "À déterminer",
             "competences_a_developper": [],
-            "conseils_specifiques": []
+            "conseils_specifiques": [],
+            "parcours_alternatifs": []
         }
         
+        carriere = profil["carriere_envisagee"]
+        
         if profil["statut"] == "Élève (Futur Bachelier)":
-            parcours["etapes"] = [
-                "1. Réussir le Baccalauréat avec une mention appropriée",
-                "2. S'inscrire dans une université/filière recommandée",
-                "3. Compléter la formation initiale",
-                "4. Effectuer des stages pratiques",
-                "5. Obtenir le diplôme et rechercher un emploi/stage professionnel"
-            ]
+            # Parcours datés du BAC jusqu'au métier, du plus court au plus long
+            chemins = self.graphe_parcours.parcours_lyceen(profil.get("serie_bac"), carriere)
+            if chemins:
+                duree, chemin = chemins[0]
+                parcours["etapes"] = self.graphe_parcours.decrire_etapes(chemin)
+                parcours["duree_totale"] = f"{duree:g} ans"
+                parcours["parcours_alternatifs"] = [
+                    {"etapes": self.graphe_parcours.decrire_etapes(autre), "duree_totale": f"{autre_duree:g} ans"}
+                    for autre_duree, autre in chemins[1:]
+                ]
+            else:
+                parcours["etapes"] = [
+                    "1. Réussir le Baccalauréat avec une mention appropriée",
+                    "2. S'inscrire dans une université/filière recommandée",
+                    "3. Compléter la formation initiale",
+                    "4. Effectuer des stages pratiques",
+                    "5. Obtenir le diplôme et rechercher un emploi/stage professionnel"
+                ]
         else:
-            parcours["etapes"] = [
-                "1. Terminer la formation actuelle",
-                "2. Évaluer les possibilités de spécialisation",
-                "3. Considérer une formation complémentaire si nécessaire",
-                "4. Développer l'expérience pratique",
-                "5. Rechercher des opportunités dans le domaine visé"
-            ]
+            # Passerelle la moins coûteuse depuis la filière actuelle
+            passerelle = self.graphe_parcours.passerelle_etudiant(profil.get("filiere_actuelle") or "", carriere)
+            if passerelle:
+                duree, chemin = passerelle
+                parcours["etapes"] = self.graphe_parcours.decrire_etapes(chemin, filiere_en_cours=True)
+                parcours["duree_totale"] = f"{duree:g} ans supplémentaires" if duree else "Accès direct après votre diplôme"
+            else:
+                parcours["etapes"] = [
+                    "1. Terminer la formation actuelle",
+                    "2. Évaluer les possibilités de spécialisation",
+                    "3. Considérer une formation complémentaire si nécessaire",
+                    "4. Développer l'expérience pratique",
+                    "5. Rechercher des opportunités dans le domaine visé"
+                ]
         
         # Analyser le métier pour des conseils spécifiques
         metier_analyse = self._analyser_metier_envisage(profil["carriere_envisagee"])
@@ -236,24 +351,24 @@ class RecommendationEngine:
         
         return parcours
     
-    def _extraire_domaine_filiere(self, filiere: str) -> str:
-        """Extrait le domaine d'étude d'une filière universitaire"""
-        filiere_lower = filiere.lower()
-        
-        domaines = {
-            "médecine": "Santé", "pharmacie": "Santé", "infirmier": "Santé",
-            "informatique": "Technologies", "génie": "Ingénierie", "math": "Sciences",
-            "droit": "Juridique", "avocat": "Juridique",
-            "économie": "Économie", "gestion": "Gestion", "commerce": "Commerce",
-            "lettres": "Lettres", "langue": "Langues", "communication": "Communication"
-        }
+    @PROFILEUR.mesurer("moteur.optimiser_choix")
+    def _optimiser_choix(self, profil: Dict) -> List[Dict]:
+        """Propose les meilleures combinaisons de 3 choix de filières (élèves uniquement)"""
         
-        for mot_cle, domaine in domaines.items():
-            if mot_cle in filiere_lower:
-                return domaine
+        if not profil.get("serie_bac"):
+            return []
         
-        return "Général"
+        return self.optimiseur_choix.optimiser(
+            profil["serie_bac"],
+            profil["carriere_envisagee"],
+            profil.get("notes")
+        )
     
+    def _extraire_domaine_filiere(self, filiere: str) -> str:
+        """Extrait le domaine d'étude d'une filière universitaire"""
+        return self.classificateur.domaine_filiere(filiere) or "Général"
+    
+    @PROFILEUR.mesurer("moteur.chercher_metiers_similaires")
     def _chercher_metiers_similaires(self, carriere: str) -> List[str]:
         """Recherche des métiers avec des noms similaires"""
         if not self.kb_loader.knowledge_base:
@@ -281,19 +396,7 @@ class RecommendationEngine:
         if not serie_type:
             return True  # Si pas de série définie, considérer compatible
         
-        secteur_lower = metier.secteur_activite.lower()
-        
-        # Règles de compatibilité simplifiées
-        compatibilites = {
-            "scientifique": ["santé", "sciences", "ingénierie", "technique", "médecine", "recherche"],
-            "littéraire": ["communication", "education", "langues", "culture", "média", "enseignement"],
-            "économique": ["économie", "banque", "finance", "administration", "gestion"],
-            "technique": ["technique", "ingénierie", "industrie", "construction", "technologie"],
-            "tertiaire": ["commerce", "service", "vente", "administration", "secrétariat"]
-        }
-        
-        mots_cles = compatibilites.get(serie_type, [])
-        return any(mot in secteur_lower for mot in mots_cles)
+        return serie_type in self.classificateur.types_serie_compatibles(metier.secteur_activite)
     
     def _calculer_score_serie_metier(self, serie_lettre: str, metier: Metier) -> float:
         """Calcule un score de compatibilité entre série de BAC et métier"""
@@ -332,4 +435,16 @@ class RecommendationEngine:
             ],
             "scores_compatibilite": recommandations["compatibilite_scores"],
             "contexte_benin": True
-        }
\ No newline at end of file
+        }
+
+_moteur_partage: Optional[RecommendationEngine] = None
+_verrou_moteur = threading.Lock()
+
+def obtenir_moteur_recommandation() -> RecommendationEngine:
+    """Retourne le moteur unique du processus (base et index chargés une seule fois, partagés par les sessions)"""
+    global _moteur_partage
+    if _moteur_partage is None:
+        with _verrou_moteur:
+            if _moteur_partage is None:
+                _moteur_partage = RecommendationEngine(KnowledgeBaseLoader())
+    return _moteur_partage
\ No newline at end of file
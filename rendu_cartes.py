@@ -0,0 +1,144 @@
+"""
+Module de rendu des cartes (universités, filières, carrières) en fragments HTML mis en cache par version de la base
+"""
+
+import html
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Fragments conservés par processus (une carte d'université par combinaison de filières affichée)
+TAILLE_CACHE_FRAGMENTS = 4000
+
+
+def _texte(valeur: Any) -> str:
+    return html.escape(str(valeur), quote=False)
+
+
+def _ligne(libelle: str, valeur: Any) -> str:
+    return f"<strong>{libelle} :</strong> {_texte(valeur)}"
+
+
+class CacheFragments:
+    """Fragments HTML déjà construits : LRU borné, vidé quand la version de la base change"""
+
+    def __init__(self, taille: int = TAILLE_CACHE_FRAGMENTS, version_kb: str = ""):
+        self.taille = taille
+        self.version_kb = version_kb
+        self._fragments: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._verrou = threading.Lock()
+        self._compteurs = {"succes": 0, "constructions": 0}
+
+    def obtenir(self, cle: Hashable, construire: Callable[[], str]) -> str:
+        """Fragment en cache, ou construit puis conservé"""
+        with self._verrou:
+            fragment = self._fragments.get(cle)
+            if fragment is not None:
+                self._fragments.move_to_end(cle)
+                self._compteurs["succes"] += 1
+                return fragment
+
+        # Construction hors verrou : deux sessions peuvent construire le même fragment, sans effet
+        fragment = construire()
+        with self._verrou:
+            self._fragments[cle] = fragment
+            self._compteurs["constructions"] += 1
+            while len(self._fragments) > self.taille:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def invalider_version(self, version_kb: str) -> None:
+        """Adopte une nouvelle version de la base et oublie les fragments de l'ancienne"""
+        with self._verrou:
+            self.version_kb = version_kb
+            self._fragments.clear()
+
+    def statistiques(self) -> Dict[str, Any]:
+        with self._verrou:
+            lectures = self._compteurs["succes"] + self._compteurs["constructions"]
+            return {
+                **self._compteurs,
+                "fragments": len(self._fragments),
+                "taux_succes": round(self._compteurs["succes"] / lectures, 3) if lectures else 0.0,
+                "version_kb": self.version_kb
+            }
+
+    def filiere(self, filiere: Dict) -> str:
+        cle = ("filiere", filiere.get("faculte"), filiere["nom_filiere"], filiere["diplome_delivre"])
+        return self.obtenir(cle, lambda: html_filiere(filiere))
+
+    def universite(self, universite: Dict) -> str:
+        # Les filières retenues dépendent du profil (série du BAC) : elles font partie de la clé
+        cle = ("universite", universite.get("id_universite") or universite["nom_universite"],
+               tuple((filiere.get("faculte"), filiere["nom_filiere"])
+                     for filiere in universite.get("filieres_recommandees", [])))
+        return self.obtenir(cle, lambda: html_universite(universite, self))
+
+    def carriere(self, numero: int, metier) -> str:
+        return self.obtenir(("carriere", numero, metier.nom_metier), lambda: html_carriere(numero, metier))
+
+
+def html_filiere(filiere: Dict) -> str:
+    """Filière repliable : durée, séries acceptées, prérequis, description et métiers visés"""
+    lignes = [_ligne("Durée", f"{filiere['duree_etudes_ans']} ans")]
+    if filiere.get("series_bac_requises"):
+        lignes.append(_ligne("Séries BAC acceptées", ", ".join(filiere["series_bac_requises"])))
+    if filiere.get("autres_prerequis"):
+        lignes.append(_ligne("Autres prérequis", filiere["autres_prerequis"]))
+    if filiere.get("description_filiere"):
+        lignes.append(_ligne("Description", filiere["description_filiere"]))
+    if filiere.get("metiers_vises_typiques"):
+        lignes.append(_ligne("Métiers visés", ", ".join(filiere["metiers_vises_typiques"])))
+    return (
+        f"<details><summary>• {_texte(filiere['nom_filiere'])} ({_texte(filiere['diplome_delivre'])})</summary>"
+        f"<p>{'<br>'.join(lignes)}</p></details>"
+    )
+
+
+def html_universite(universite: Dict, cache: Optional[CacheFragments] = None) -> str:
+    """Carte d'une université et de ses filières recommandées (fragments de filière du cache)"""
+    sigle = f" <em>({_texte(universite['sigle'])})</em>" if universite.get("sigle") else ""
+    pastille = "🟢" if universite["statut"] == "Public" else "🔵"
+    parties = [
+        '<div class="university-card">',
+        f'<div class="university-header"><span><strong>🏛️ {_texte(universite["nom_universite"])}</strong>'
+        f'{sigle}</span><span>{pastille} {_texte(universite["statut"])}</span></div>'
+    ]
+    if universite.get("localisation"):
+        parties.append(f"<p>📍 {_ligne('Localisation', universite['localisation'])}</p>")
+    if universite.get("filieres_recommandees"):
+        parties.append("<p><strong>📚 Filières adaptées à votre profil :</strong></p>")
+        parties.extend(
+            cache.filiere(filiere) if cache else html_filiere(filiere)
+            for filiere in universite["filieres_recommandees"]
+        )
+    parties.append("</div>")
+    return "".join(parties)
+
+
+def html_carriere(numero: int, metier) -> str:
+    """Carrière alternative repliable : secteur, description, demande et pertinence au Bénin"""
+    lignes = [_ligne("Secteur", metier.secteur_activite), _ligne("Description", metier.description)]
+    if metier.niveau_demande_marche:
+        lignes.append(_ligne("Demande sur le marché", metier.niveau_demande_marche))
+    if metier.pertinence_realites_africaines_benin:
+        lignes.append(_ligne("Pertinence au Bénin", metier.pertinence_realites_africaines_benin))
+    return (
+        f"<details><summary>{numero}. {_texte(metier.nom_metier)}</summary>"
+        f"<p>{'<br>'.join(lignes)}</p></details>"
+    )
+
+
+_cache_partage: Optional[CacheFragments] = None
+_verrou_cache = threading.Lock()
+
+
+def obtenir_cache_fragments(version_kb: str = "") -> CacheFragments:
+    """Retourne le cache unique du processus ; un changement de version de la base l'invalide"""
+    global _cache_partage
+    with _verrou_cache:
+        if _cache_partage is None:
+            _cache_partage = CacheFragments(version_kb=version_kb)
+        elif _cache_partage.version_kb != version_kb:
+            _cache_partage.invalider_version(version_kb)
+    return _cache_partage
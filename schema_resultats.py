@@ -0,0 +1,207 @@
+"""
+Module de format compact et versionné des recommandations (entités référencées par identifiant)
+"""
+
+import argparse
+import json
+import pickle
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from recommendation_logic_student import decrire_metier
+
+try:
+    import orjson
+except ImportError:
+    # Encodeur JSON de la bibliothèque standard (plus lent, même format)
+    orjson = None
+
+# Version du format : à incrémenter à chaque changement de structure
+VERSION_SCHEMA = 1
+
+# En-tête du format binaire : signature + version du format
+ENTETE_BINAIRE = b"ORC" + bytes([VERSION_SCHEMA])
+
+
+class ResultatIncompatible(ValueError):
+    """Le résultat compact vient d'une autre version du format ou de la base : il faut le recalculer"""
+
+
+def compacter(recommandations: Dict[str, Any], kb_loader) -> Dict[str, Any]:
+    """Remplace métiers, universités et filières par leurs identifiants dans la base partagée"""
+
+    def id_filiere(i: int, filiere: Dict) -> int:
+        return kb_loader.ids_filieres[(i, filiere["faculte"], filiere["nom_filiere"])]
+
+    def position_universite(universite: Dict) -> int:
+        return kb_loader.positions_universites[(universite["sigle"], universite["nom_universite"])]
+
+    metier_analyse = recommandations.get("metier_analyse", {})
+    compact: Dict[str, Any] = {
+        "schema": VERSION_SCHEMA,
+        "version_kb": kb_loader.version_contenu,
+        "profil_analyse": recommandations.get("profil_analyse", {}),
+        "metier": (kb_loader.positions_metiers[metier_analyse["metier_obj"].nom_metier]
+                   if metier_analyse.get("metier_trouve") else None),
+        "suggestions": metier_analyse.get("suggestions_similaires", []),
+        "universites": [],
+        "alternatives": [kb_loader.positions_metiers[metier.nom_metier]
+                         for metier in recommandations.get("carrieres_alternatives", [])],
+        "scores": recommandations.get("compatibilite_scores", {}),
+        "parcours": recommandations.get("parcours_suggere", {}),
+        "choix": []
+    }
+
+    for universite in recommandations.get("universites_recommandees", []):
+        i = position_universite(universite)
+        compact["universites"].append(
+            [i, [id_filiere(i, filiere) for filiere in universite["filieres_recommandees"]]]
+        )
+
+    for combinaison in recommandations.get("choix_optimises", []):
+        compact["choix"].append([combinaison["score"], [
+            [id_filiere(position_universite(choix), choix), choix["adequation_metier"],
+             choix["probabilite_admission"], choix["valeur"]]
+            for choix in combinaison["choix"]
+        ]])
+
+    if recommandations.get("mode") == "degrade":
+        compact["mode"] = "degrade"
+    return compact
+
+
+def resoudre(compact: Dict[str, Any], kb_loader) -> Dict[str, Any]:
+    """Reconstruit les recommandations complètes à partir de la base partagée"""
+
+    if compact.get("schema") != VERSION_SCHEMA:
+        raise ResultatIncompatible(f"Format {compact.get('schema')} non pris en charge")
+    if compact.get("version_kb") != kb_loader.version_contenu:
+        raise ResultatIncompatible("Résultat calculé sur une autre version de la base")
+
+    if compact.get("mode") == "degrade":
+        return {"mode": "degrade"}
+
+    metiers = kb_loader.knowledge_base.metiers
+    filieres = kb_loader.filieres_par_id
+
+    def choix(id_filiere: int, adequation: float, probabilite: float, valeur: float) -> Dict:
+        return {
+            **kb_loader.filiere_accessible(*filieres[id_filiere]),
+            "adequation_metier": adequation,
+            "probabilite_admission": probabilite,
+            "valeur": valeur
+        }
+
+    return {
+        "profil_analyse": compact["profil_analyse"],
+        "metier_analyse": (
+            decrire_metier(metiers[compact["metier"]]) if compact["metier"] is not None
+            else {"metier_trouve": False, "suggestions_similaires": compact["suggestions"]}
+        ),
+        "universites_recommandees": [
+            kb_loader.universite_recommandee(i, [kb_loader.filiere_recommandee(*filieres[f]) for f in ids])
+            for i, ids in compact["universites"]
+        ],
+        "carrieres_alternatives": [metiers[position] for position in compact["alternatives"]],
+        "compatibilite_scores": compact["scores"],
+        "parcours_suggere": compact["parcours"],
+        "choix_optimises": [
+            {"score": score, "choix": [choix(*element) for element in elements]}
+            for score, elements in compact["choix"]
+        ]
+    }
+
+
+def encoder_json(compact: Dict[str, Any]) -> bytes:
+    """Encodage JSON sans espaces (orjson s'il est installé)"""
+    if orjson:
+        return orjson.dumps(compact)
+    return json.dumps(compact, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decoder_json(donnees: bytes) -> Dict[str, Any]:
+    """Décodage du format JSON"""
+    return orjson.loads(donnees) if orjson else json.loads(donnees)
+
+
+def encoder_binaire(compact: Dict[str, Any]) -> bytes:
+    """Format binaire : en-tête versionné + JSON compressé (zlib niveau 1, rapide)"""
+    return ENTETE_BINAIRE + zlib.compress(encoder_json(compact), 1)
+
+
+def decoder_binaire(donnees: bytes) -> Dict[str, Any]:
+    """Décodage du format binaire (ResultatIncompatible si l'en-tête ne correspond pas)"""
+    if donnees[:len(ENTETE_BINAIRE)] != ENTETE_BINAIRE:
+        raise ResultatIncompatible("En-tête binaire inconnu")
+    return decoder_json(zlib.decompress(donnees[len(ENTETE_BINAIRE):]))
+
+
+def _chronometrer(fonction, repetitions: int) -> float:
+    """Durée moyenne d'un appel en microsecondes"""
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        fonction()
+    return (time.perf_counter() - debut) / repetitions * 1e6
+
+
+def mesurer(kb_loader, moteur, profils: List[Dict], repetitions: int = 200) -> List[Dict[str, Any]]:
+    """Taille moyenne et temps d'encodage/décodage de chaque format sur les profils donnés"""
+    resultats = [moteur.generer_recommandations(profil) for profil in profils]
+    compacts = [compacter(resultat, kb_loader) for resultat in resultats]
+
+    formats = [
+        ("pickle (objets complets)", resultats, lambda r: pickle.dumps(r, pickle.HIGHEST_PROTOCOL), pickle.loads),
+        ("JSON compact", compacts, encoder_json, decoder_json),
+        ("binaire compact", compacts, encoder_binaire, decoder_binaire)
+    ]
+
+    mesures = []
+    for nom, donnees, encoder, decoder in formats:
+        encodes = [encoder(element) for element in donnees]
+        mesures.append({
+            "format": nom,
+            "octets": round(sum(map(len, encodes)) / len(encodes)),
+            "encodage_us": round(sum(_chronometrer(lambda e=e: encoder(e), repetitions) for e in donnees)
+                                 / len(donnees), 1),
+            "decodage_us": round(sum(_chronometrer(lambda b=b: decoder(b), repetitions) for b in encodes)
+                                 / len(encodes), 1)
+        })
+
+    mesures.append({
+        "format": "résolution dans la base",
+        "octets": None,
+        "encodage_us": round(sum(_chronometrer(lambda r=r: compacter(r, kb_loader), repetitions)
+                                 for r in resultats) / len(resultats), 1),
+        "decodage_us": round(sum(_chronometrer(lambda c=c: resoudre(c, kb_loader), repetitions)
+                                 for c in compacts) / len(compacts), 1)
+    })
+    return mesures
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Compare taille et vitesse des formats sur un métier par série de BAC"""
+    analyseur = argparse.ArgumentParser(description="Mesure du format compact des recommandations")
+    analyseur.add_argument("--repetitions", type=int, default=200)
+    options = analyseur.parse_args(arguments)
+
+    from knowledge_base_loader import KnowledgeBaseLoader
+    from recommendation_logic_student import RecommendationEngine
+
+    kb_loader = KnowledgeBaseLoader()
+    moteur = RecommendationEngine(kb_loader)
+    series = ["A1", "B", "C", "D", "E", "G2"]
+    profils = [
+        {"statut": "Élève (Futur Bachelier)", "serie_bac": serie, "filiere_actuelle": None,
+         "carriere_envisagee": metier.nom_metier, "notes": {}}
+        for serie, metier in zip(series, kb_loader.knowledge_base.metiers[::7])
+    ]
+
+    print(f"{'format':<28}{'octets':>10}{'encodage µs':>14}{'décodage µs':>14}")
+    for mesure in mesurer(kb_loader, moteur, profils, options.repetitions):
+        octets = "" if mesure["octets"] is None else mesure["octets"]
+        print(f"{mesure['format']:<28}{octets:>10}{mesure['encodage_us']:>14}{mesure['decodage_us']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Module des sessions partagées : résultats d'analyse d'un navigateur retrouvés par n'importe quel processus
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Cookie opaque posé par le proxy (un identifiant aléatoire par navigateur, voir haproxy.cfg)
+COOKIE_SESSION = "orientation_session"
+
+# Durée de conservation des résultats d'un navigateur
+TTL_HEURES = 24
+
+# Champs d'un résultat de session conservés (le paginateur, non sérialisable, et le rapport
+# personnalisé sont reconstruits à la lecture)
+CHAMPS_CONSERVES = ("profil", "recommandations", "analyse_ia", "repli", "nom_fichier")
+
+# Données personnelles de l'élève, jamais écrites dans la base partagée
+CHAMPS_PERSONNELS = ("nom", "prenom")
+
+
+class MagasinSessions:
+    """Résultats d'analyse par navigateur dans la base SQLite du cache, partagée entre processus"""
+
+    def __init__(self, chemin: str, ttl_heures: float = TTL_HEURES):
+        """Ouvre (ou crée) la table des sessions"""
+        self.chemin = chemin
+        self.ttl = ttl_heures * 3600
+        self._local = threading.local()
+
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+        connexion = self._connexion()
+        # Ancienne table : profils nominatifs et rapports personnalisés
+        connexion.execute("DROP TABLE IF EXISTS session_resultat")
+        connexion.execute(
+            "CREATE TABLE IF NOT EXISTS session_resultat_anonyme ("
+            " navigateur TEXT NOT NULL, cle_profil TEXT NOT NULL, resultat TEXT NOT NULL, maj REAL NOT NULL,"
+            " PRIMARY KEY (navigateur, cle_profil))"
+        )
+        connexion.commit()
+
+    def _connexion(self) -> sqlite3.Connection:
+        """Connexion SQLite propre au thread courant (mode WAL pour les accès concurrents)"""
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin, timeout=10)
+            connexion.execute("PRAGMA journal_mode=WAL")
+            self._local.connexion = connexion
+        return connexion
+
+    def enregistrer(self, navigateur: str, cle_profil: str, resultat: Dict[str, Any]) -> None:
+        """Conserve un résultat anonymisé (profil sans nom ni prénom, sous une clé qui les ignore)"""
+        donnees = {champ: resultat[champ] for champ in CHAMPS_CONSERVES}
+        donnees["profil"] = {
+            champ: valeur for champ, valeur in resultat["profil"].items() if champ not in CHAMPS_PERSONNELS
+        }
+        try:
+            connexion = self._connexion()
+            connexion.execute(
+                "INSERT OR REPLACE INTO session_resultat_anonyme VALUES (?, ?, ?, ?)",
+                (navigateur, cle_profil, json.dumps(donnees, ensure_ascii=False), time.time())
+            )
+            connexion.execute("DELETE FROM session_resultat_anonyme WHERE maj <= ?", (time.time() - self.ttl,))
+            connexion.commit()
+        except sqlite3.Error:
+            pass
+
+    def lire(self, navigateur: str, nombre: int) -> Dict[str, Dict[str, Any]]:
+        """Derniers résultats du navigateur, du plus ancien au plus récent (ordre de la session, sans rapport)"""
+        try:
+            lignes = self._connexion().execute(
+                "SELECT cle_profil, resultat FROM session_resultat_anonyme WHERE navigateur = ? AND maj > ?"
+                " ORDER BY maj DESC LIMIT ?",
+                (navigateur, time.time() - self.ttl, nombre)
+            ).fetchall()
+        except sqlite3.Error:
+            return {}
+
+        return {cle_profil: json.loads(donnees) for cle_profil, donnees in reversed(lignes)}
+
+
+_magasin_partage: Optional[MagasinSessions] = None
+_verrou_magasin = threading.Lock()
+
+
+def obtenir_magasin_sessions(llm_interface) -> Optional[MagasinSessions]:
+    """Retourne le magasin unique du processus, stocké avec le cache IA (None sans cache)"""
+    global _magasin_partage
+    if _magasin_partage is None and llm_interface.cache:
+        with _verrou_magasin:
+            if _magasin_partage is None:
+                _magasin_partage = MagasinSessions(llm_interface.cache.chemin)
+    return _magasin_partage
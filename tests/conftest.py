@@ -0,0 +1,187 @@
+"""
+Fixtures communes : serveur bouchon local (API compatible OpenRouter) et interface LLM isolée
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import admission  # noqa: E402
+import cache_llm  # noqa: E402
+import client_http  # noqa: E402
+import coalescence  # noqa: E402
+import comptabilite_tokens  # noqa: E402
+import disjoncteur  # noqa: E402
+import limiteur_debit  # noqa: E402
+import llm_interface  # noqa: E402
+
+# Singletons du processus recréés pour chaque test (configuration et fichiers propres au test)
+SINGLETONS = [
+    (admission, "_controle_partage"),
+    (cache_llm, "_cache_partage"),
+    (client_http, "_client_partage"),
+    (coalescence, "_coalesceur_partage"),
+    (comptabilite_tokens, "_comptabilite_partagee"),
+    (disjoncteur, "_disjoncteur_partage"),
+    (limiteur_debit, "_limiteur_partage"),
+]
+
+TEXTE_PAR_DEFAUT = "Réponse du serveur bouchon."
+
+
+class ServeurBouchon:
+    """Serveur HTTP/1.1 local rejouant des scénarios de réponse (contenu, erreur, lenteur, flux SSE)
+
+    Chaque scénario est un dict : texte, statut (200 par défaut), delai avant la réponse (s),
+    morceaux du flux, pause entre deux morceaux (s), tronque (flux coupé avant [DONE]) et
+    brut (corps renvoyé tel quel, hors JSON).
+    Les scénarios ajoutés sont servis dans l'ordre, puis le scénario par défaut.
+    """
+
+    def __init__(self):
+        self.scenarios: deque = deque()
+        self.par_defaut: Dict[str, Any] = {"texte": TEXTE_PAR_DEFAUT}
+        self.requetes: List[Dict] = []
+        self.connexions = 0
+        self._verrou = threading.Lock()
+        serveur = self
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with serveur._verrou:
+                    serveur.connexions += 1
+
+            def do_POST(self):
+                try:
+                    serveur._repondre(self)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client parti (délai dépassé) : rien à renvoyer
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Gestionnaire)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/api/v1/chat/completions"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def ajouter(self, *scenarios: Dict[str, Any]) -> None:
+        """Programme les prochaines réponses"""
+        with self._verrou:
+            self.scenarios.extend(scenarios)
+
+    @property
+    def nb_requetes(self) -> int:
+        with self._verrou:
+            return len(self.requetes)
+
+    def _repondre(self, gestionnaire: BaseHTTPRequestHandler) -> None:
+        """Sert le prochain scénario"""
+        longueur = int(gestionnaire.headers.get("Content-Length", 0))
+        corps = json.loads(gestionnaire.rfile.read(longueur) or b"{}")
+        with self._verrou:
+            self.requetes.append(corps)
+            scenario = self.scenarios.popleft() if self.scenarios else self.par_defaut
+
+        time.sleep(scenario.get("delai", 0))
+        statut = scenario.get("statut", 200)
+        texte = scenario.get("texte", TEXTE_PAR_DEFAUT)
+
+        if "brut" in scenario:
+            self._envoyer(gestionnaire, statut, "text/html", scenario["brut"].encode("utf-8"))
+        elif statut != 200:
+            self._envoyer_json(gestionnaire, statut, {"error": {"message": f"Erreur simulée {statut}"}})
+        elif corps.get("stream"):
+            self._envoyer_flux(gestionnaire, scenario, texte)
+        else:
+            self._envoyer_json(gestionnaire, 200, {
+                "choices": [{"message": {"role": "assistant", "content": texte}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": len(texte.split())}
+            })
+
+    @staticmethod
+    def _envoyer_json(gestionnaire: BaseHTTPRequestHandler, statut: int, donnees: Dict) -> None:
+        """Réponse JSON à longueur connue (la connexion reste ouverte)"""
+        ServeurBouchon._envoyer(gestionnaire, statut, "application/json", json.dumps(donnees).encode("utf-8"))
+
+    @staticmethod
+    def _envoyer(gestionnaire: BaseHTTPRequestHandler, statut: int, type_contenu: str, contenu: bytes) -> None:
+        """Réponse à longueur connue (la connexion reste ouverte)"""
+        gestionnaire.send_response(statut)
+        gestionnaire.send_header("Content-Type", type_contenu)
+        gestionnaire.send_header("Content-Length", str(len(contenu)))
+        gestionnaire.end_headers()
+        gestionnaire.wfile.write(contenu)
+
+    @staticmethod
+    def _envoyer_flux(gestionnaire: BaseHTTPRequestHandler, scenario: Dict, texte: str) -> None:
+        """Flux SSE terminé par [DONE] (sauf tronque) ; la fermeture de la connexion marque sa fin"""
+        morceaux = scenario.get("morceaux") or [mot + " " for mot in texte.split()]
+        gestionnaire.send_response(200)
+        gestionnaire.send_header("Content-Type", "text/event-stream")
+        gestionnaire.send_header("Connection", "close")
+        gestionnaire.end_headers()
+        gestionnaire.close_connection = True
+
+        gestionnaire.wfile.write(b": maintien de connexion\n\n")
+        for morceau in morceaux:
+            evenement = {"choices": [{"delta": {"content": morceau}}]}
+            gestionnaire.wfile.write(f"data: {json.dumps(evenement)}\n\n".encode("utf-8"))
+            gestionnaire.wfile.flush()
+            time.sleep(scenario.get("pause", 0))
+        if not scenario.get("tronque"):
+            usage = {"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": len(morceaux)}}
+            gestionnaire.wfile.write(f"data: {json.dumps(usage)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        gestionnaire.wfile.flush()
+
+    def arreter(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def serveur():
+    """Serveur bouchon démarré sur un port libre de 127.0.0.1"""
+    bouchon = ServeurBouchon()
+    yield bouchon
+    bouchon.arreter()
+
+
+@pytest.fixture
+def secrets(tmp_path) -> Dict[str, Dict[str, Any]]:
+    """Secrets de test : clé factice, fichiers dans tmp_path, débit large et disjoncteur réactif"""
+    return {
+        "openrouter": {"api_key": "cle-de-test"},
+        "cache": {"chemin": str(tmp_path / "reponses.sqlite3")},
+        "http": {"taille_pool": 4, "timeout_connexion": 1, "timeout_lecture": 2},
+        "debit": {"requetes_par_minute": 6000, "rafale": 100},
+        "disjoncteur": {"taille_fenetre": 4, "appels_minimum": 2, "seuil_taux_echec": 0.5,
+                        "refroidissement": 0.5},
+    }
+
+
+@pytest.fixture
+def interface(serveur, secrets, monkeypatch):
+    """LLMInterface isolée : secrets de test, singletons neufs, API pointée sur le serveur bouchon"""
+    monkeypatch.setattr(llm_interface.st, "secrets", secrets)
+    for module, nom in SINGLETONS:
+        monkeypatch.setattr(module, nom, None)
+
+    instance = llm_interface.LLMInterface(version_kb="version-test")
+    instance.base_url = serveur.url
+    yield instance
+    instance.client_http.fermer()
@@ -0,0 +1,45 @@
+"""
+API HTTP : clé d'API exigée par les routes déclenchant des appels facturés à l'IA
+"""
+
+import threading
+
+import pytest
+import requests
+
+from api_http import ENTETE_CLE_API, ServeurAPI, ServiceRecommandation
+from knowledge_base_loader import KnowledgeBaseLoader
+from recommendation_logic_student import RecommendationEngine
+
+PROFIL = {"serie_bac": "D", "carriere_envisagee": "Médecin"}
+
+
+@pytest.fixture
+def api(interface):
+    """API servie sur un port libre de 127.0.0.1, analyses protégées par une clé"""
+    kb_loader = KnowledgeBaseLoader()
+    service = ServiceRecommandation(kb_loader, RecommendationEngine(kb_loader), interface, cle_api="cle-partenaire")
+    serveur = ServeurAPI(("127.0.0.1", 0), service, nb_travailleurs=2)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{serveur.server_address[1]}/v1"
+    serveur.shutdown()
+    serveur.server_close()
+
+
+def test_analyses_refusees_sans_cle(serveur, api):
+    for entetes in ({}, {ENTETE_CLE_API: "mauvaise-cle"}):
+        reponse = requests.post(f"{api}/analyses", json=PROFIL, headers=entetes, timeout=5)
+        assert reponse.status_code == 401
+    assert serveur.nb_requetes == 0
+
+
+def test_analyses_servies_avec_cle(serveur, api):
+    reponse = requests.post(f"{api}/analyses", json=PROFIL, headers={ENTETE_CLE_API: "cle-partenaire"}, timeout=10)
+    assert reponse.status_code == 200
+    assert reponse.json()["analyse"] == "Réponse du serveur bouchon."
+    assert serveur.nb_requetes == 1
+
+
+def test_routes_de_la_base_sans_cle(api):
+    assert requests.post(f"{api}/recommandations", json=PROFIL, timeout=10).status_code == 200
+    assert requests.get(f"{api}/sante", timeout=5).status_code == 200
@@ -0,0 +1,96 @@
+"""
+Client HTTP partagé : réutilisation des connexions keep-alive et délais de connexion / lecture
+"""
+
+import socket
+import sys
+import time
+
+import pytest
+import requests
+
+from client_http import ClientHTTP, obtenir_client_http
+
+
+def _port_ferme() -> int:
+    """Port local sur lequel personne n'écoute"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_connexion_reutilisee_entre_requetes(serveur):
+    client = ClientHTTP(taille_pool=2)
+    for _ in range(5):
+        reponse = client.post(serveur.url, json={"messages": []})
+        assert reponse.status_code == 200
+        assert reponse.json()["choices"][0]["message"]["content"]
+
+    assert serveur.connexions == 1
+    metriques = client.metriques()
+    assert metriques["requetes"] == 5
+    assert metriques["connexions_ouvertes_http1"] == 1
+    assert metriques["connexions_reutilisees_http1"] == 4
+    assert metriques["taux_reutilisation_http1"] == 0.8
+    client.fermer()
+
+
+def test_client_partage_entre_appelants(monkeypatch):
+    import client_http
+    monkeypatch.setattr(client_http, "_client_partage", None)
+    assert obtenir_client_http(taille_pool=3) is obtenir_client_http()
+    assert obtenir_client_http().taille_pool == 3
+
+
+def test_delai_de_lecture_par_defaut(serveur):
+    serveur.ajouter({"delai": 1.0})
+    client = ClientHTTP(timeout_connexion=1, timeout_lecture=0.2)
+
+    debut = time.monotonic()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.post(serveur.url, json={})
+    assert time.monotonic() - debut < 0.9
+
+    # La connexion abandonnée est remplacée : le pool reste utilisable
+    assert client.post(serveur.url, json={}).status_code == 200
+    client.fermer()
+
+
+def test_delai_explicite_prioritaire(serveur):
+    serveur.ajouter({"delai": 0.4})
+    client = ClientHTTP(timeout_connexion=1, timeout_lecture=0.1)
+    assert client.post(serveur.url, json={}, timeout=(1, 2)).status_code == 200
+    client.fermer()
+
+
+def test_connexion_refusee():
+    client = ClientHTTP(timeout_connexion=0.5)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.post(f"http://127.0.0.1:{_port_ferme()}/", json={})
+    client.fermer()
+
+
+def test_http2_sans_httpx_repli_http1(serveur, monkeypatch):
+    # httpx absent : le client repasse en HTTP/1.1 keep-alive
+    monkeypatch.setitem(sys.modules, "httpx", None)
+    client = ClientHTTP(http2=True)
+    assert not client.http2
+    assert client.post(serveur.url, json={}).status_code == 200
+    assert client.metriques()["versions_http"] == {"HTTP/1.1": 1}
+    client.fermer()
+
+
+def test_interface_reessaie_apres_delai_depasse(serveur, interface):
+    # Première tentative trop lente (lecture 2 s), seconde servie normalement
+    serveur.ajouter({"delai": 2.5}, {"texte": "Réponse après nouvelle tentative"})
+    assert interface._appeler_api("prompt", utiliser_cache=False) == "Réponse après nouvelle tentative"
+    assert serveur.nb_requetes == 2
+    assert interface.disjoncteur.metriques()["echecs"] == 1
+
+
+def test_budget_de_latence_borne_les_tentatives(serveur, interface):
+    serveur.par_defaut = {"delai": 2.0}
+    debut = time.monotonic()
+    with pytest.raises(Exception):
+        interface._appeler_api("prompt", utiliser_cache=False, budget_latence=0.5)
+    assert time.monotonic() - debut < 1.5
@@ -0,0 +1,131 @@
+"""
+Regroupement des requêtes identiques en vol (threads et processus) ; les clés différentes ne s'attendent pas
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from coalescence import CoalesceurRequetes
+
+DUREE_REPONSE = 0.5
+
+
+def _tenir_verrou(dossier: str, cle: str, duree: float, pret) -> None:
+    """Processus fils : tient le verrou de la clé pendant la durée indiquée"""
+    with CoalesceurRequetes(dossier).verrou_processus(cle):
+        pret.set()
+        time.sleep(duree)
+
+
+@pytest.fixture
+def processus_detenteur(tmp_path):
+    """Lance un autre processus tenant le verrou d'une clé"""
+    contexte = multiprocessing.get_context("fork")
+    processus = []
+
+    def lancer(cle: str, duree: float) -> None:
+        pret = contexte.Event()
+        fils = contexte.Process(target=_tenir_verrou, args=(str(tmp_path), cle, duree, pret))
+        fils.start()
+        assert pret.wait(5)
+        processus.append(fils)
+
+    yield lancer
+    for fils in processus:
+        fils.join(5)
+
+
+def _en_parallele(fonction, arguments):
+    """Appels simultanés de fonction (un thread par argument), résultats dans l'ordre"""
+    with ThreadPoolExecutor(max_workers=len(arguments)) as executeur:
+        return list(executeur.map(fonction, arguments))
+
+
+def test_requetes_identiques_un_seul_appel(serveur, interface):
+    serveur.par_defaut = {"texte": "Réponse partagée", "delai": DUREE_REPONSE}
+    resultats = _en_parallele(lambda _: interface._appeler_api("même prompt"), range(5))
+
+    assert resultats == ["Réponse partagée"] * 5
+    assert serveur.nb_requetes == 1
+    assert interface.coalesceur.statistiques()["suiveurs"] == 4
+
+
+def test_requetes_differentes_en_parallele(serveur, interface):
+    serveur.par_defaut = {"delai": DUREE_REPONSE}
+    debut = time.monotonic()
+    _en_parallele(lambda numero: interface._appeler_api(f"prompt {numero}"), range(3))
+
+    assert time.monotonic() - debut < 2 * DUREE_REPONSE
+    assert serveur.nb_requetes == 3
+
+
+def test_flux_partage_avec_les_suiveurs(serveur, interface):
+    serveur.ajouter({"morceaux": ["Réponse ", "diffusée ", "en ", "flux."], "pause": 0.2})
+    flux = interface._appeler_api_flux("prompt")
+    premier = next(flux)
+
+    # Requête identique pendant la diffusion : réponse complète d'un seul bloc
+    suiveur = ThreadPoolExecutor(max_workers=1).submit(lambda: list(interface._appeler_api_flux("prompt")))
+    time.sleep(0.1)
+    meneur = premier + "".join(flux)
+
+    assert meneur == "Réponse diffusée en flux."
+    assert suiveur.result(5) == [meneur]
+    assert serveur.nb_requetes == 1
+
+
+def test_flux_tronque_transmet_l_erreur_aux_suiveurs(serveur, interface):
+    serveur.ajouter({"morceaux": ["Réponse ", "incomplète"], "pause": 0.2, "tronque": True})
+    flux = interface._appeler_api_flux("prompt")
+    next(flux)
+
+    suiveur = ThreadPoolExecutor(max_workers=1).submit(lambda: list(interface._appeler_api_flux("prompt")))
+    time.sleep(0.1)
+    with pytest.raises(Exception, match="Flux interrompu"):
+        list(flux)
+
+    # Le suiveur reçoit l'erreur, jamais le texte partiel
+    with pytest.raises(Exception, match="Flux interrompu"):
+        suiveur.result(5)
+    assert serveur.nb_requetes == 1
+
+
+def test_verrous_par_cle_entre_processus(tmp_path, processus_detenteur):
+    processus_detenteur("cle-a", 1.0)
+    coalesceur = CoalesceurRequetes(str(tmp_path))
+
+    # Autre clé : aucune attente
+    debut = time.monotonic()
+    with coalesceur.verrou_processus("cle-b") as a_attendu:
+        assert not a_attendu
+    assert time.monotonic() - debut < 0.2
+
+    # Même clé : attente bornée par le budget de l'appelant
+    debut = time.monotonic()
+    with coalesceur.verrou_processus("cle-a", delai=0.3) as a_attendu:
+        assert a_attendu
+    assert 0.3 <= time.monotonic() - debut < 0.8
+
+
+def test_attente_d_un_autre_processus_puis_relecture(tmp_path, processus_detenteur):
+    processus_detenteur("cle", 0.3)
+    coalesceur = CoalesceurRequetes(str(tmp_path))
+
+    def appel():
+        raise AssertionError("requête déjà traitée par l'autre processus")
+
+    assert coalesceur.executer("cle", appel, relire=lambda: "réponse en cache") == "réponse en cache"
+    assert coalesceur.statistiques()["attentes_inter_processus"] == 1
+
+
+def test_fichiers_de_verrou_supprimes(tmp_path):
+    coalesceur = CoalesceurRequetes(str(tmp_path))
+    _en_parallele(lambda numero: coalesceur.executer(f"cle-{numero % 3}", lambda: "ok"), range(9))
+    with coalesceur.verrou_processus("cle-0"):
+        pass
+
+    assert os.listdir(tmp_path) == []
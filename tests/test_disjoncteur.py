@@ -0,0 +1,139 @@
+"""
+Disjoncteur : fermé -> ouvert -> semi-ouvert -> fermé, analyse de base servie pendant l'ouverture
+"""
+
+import time
+
+import pytest
+
+from disjoncteur import Disjoncteur, CircuitOuvert, FERME, OUVERT, SEMI_OUVERT
+from llm_interface import BudgetLatenceEpuise, RepliAnalyse
+
+PROFIL = {"statut": "Élève (Futur Bachelier)", "serie_bac": "C", "carriere_envisagee": "Médecin"}
+RECOMMANDATIONS = {}
+REFROIDISSEMENT = 0.5
+
+
+@pytest.fixture
+def interface_sans_reprise(interface):
+    """Une seule tentative par appel : chaque appel compte pour un résultat du disjoncteur"""
+    interface.max_retries = 1
+    return interface
+
+
+def test_transitions_du_disjoncteur():
+    disjoncteur = Disjoncteur(taille_fenetre=4, appels_minimum=2, seuil_taux_echec=0.5,
+                              refroidissement=REFROIDISSEMENT)
+    disjoncteur.succes()
+    disjoncteur.echec()
+    assert disjoncteur.etat == OUVERT
+    assert not disjoncteur.disponible()
+    assert not disjoncteur.autoriser()
+
+    time.sleep(REFROIDISSEMENT + 0.1)
+    assert disjoncteur.etat == SEMI_OUVERT
+    assert disjoncteur.autoriser()
+    # Un seul appel d'essai à la fois
+    assert not disjoncteur.autoriser()
+    disjoncteur.succes()
+    assert disjoncteur.etat == FERME
+    assert disjoncteur.metriques()["refus"] == 2
+
+
+def test_essai_en_echec_rouvre_le_circuit():
+    disjoncteur = Disjoncteur(appels_minimum=1, refroidissement=REFROIDISSEMENT)
+    disjoncteur.echec()
+    time.sleep(REFROIDISSEMENT + 0.1)
+    assert disjoncteur.autoriser()
+    disjoncteur.echec()
+    assert disjoncteur.etat == OUVERT
+    assert disjoncteur.metriques()["ouvertures"] == 2
+
+
+def test_repli_pendant_ouverture_puis_reprise(serveur, interface_sans_reprise):
+    interface = interface_sans_reprise
+    analyse_de_base = interface._fallback_analyse(PROFIL, RECOMMANDATIONS)
+
+    # Fermé : les erreurs serveur sont comptées, l'analyse de base est servie
+    serveur.ajouter({"statut": 500}, {"statut": 503})
+    assert interface.analyser_profil(PROFIL, RECOMMANDATIONS) == analyse_de_base
+    assert interface.disjoncteur.etat == FERME
+    assert interface.analyser_profil(PROFIL, RECOMMANDATIONS) == analyse_de_base
+    assert interface.disjoncteur.etat == OUVERT
+    assert serveur.nb_requetes == 2
+
+    # Ouvert : repli immédiat, sans appel au serveur
+    debut = time.monotonic()
+    assert interface.analyser_profil(PROFIL, RECOMMANDATIONS) == analyse_de_base
+    morceaux = list(interface.analyser_profil_flux(PROFIL, RECOMMANDATIONS))
+    assert morceaux == [analyse_de_base] and isinstance(morceaux[0], RepliAnalyse)
+    with pytest.raises(CircuitOuvert):
+        interface._appeler_api("autre prompt", utiliser_cache=False)
+    assert time.monotonic() - debut < REFROIDISSEMENT
+    assert serveur.nb_requetes == 2
+
+    # Après le refroidissement : un appel d'essai réussi referme le circuit
+    time.sleep(REFROIDISSEMENT + 0.1)
+    assert interface.disjoncteur.etat == SEMI_OUVERT
+    serveur.ajouter({"texte": "Analyse de l'IA"})
+    assert interface.analyser_profil(PROFIL, RECOMMANDATIONS) == "Analyse de l'IA"
+    assert interface.disjoncteur.etat == FERME
+    assert serveur.nb_requetes == 3
+
+
+def test_reponses_en_cache_servies_circuit_ouvert(serveur, interface_sans_reprise):
+    interface = interface_sans_reprise
+    serveur.ajouter({"texte": "Analyse mise en cache"})
+    assert interface.analyser_profil(PROFIL, RECOMMANDATIONS) == "Analyse mise en cache"
+
+    # Un succès puis un échec : taux d'échec de 50 %, le circuit s'ouvre
+    serveur.par_defaut = {"statut": 500}
+    with pytest.raises(Exception):
+        interface._appeler_api("autre prompt", utiliser_cache=False)
+    assert interface.disjoncteur.etat == OUVERT
+
+    assert interface.analyser_profil(PROFIL, RECOMMANDATIONS) == "Analyse mise en cache"
+    assert serveur.nb_requetes == 2
+
+
+def test_essai_en_echec_garde_le_repli(serveur, interface_sans_reprise):
+    interface = interface_sans_reprise
+    serveur.par_defaut = {"statut": 502}
+    analyse_de_base = interface._fallback_analyse(PROFIL, RECOMMANDATIONS)
+    for _ in range(2):
+        interface.analyser_profil(PROFIL, RECOMMANDATIONS)
+    assert interface.disjoncteur.etat == OUVERT
+
+    time.sleep(REFROIDISSEMENT + 0.1)
+    assert interface.analyser_profil(PROFIL, RECOMMANDATIONS) == analyse_de_base
+    assert interface.disjoncteur.etat == OUVERT
+    assert serveur.nb_requetes == 3
+
+
+def test_budget_epuise_ne_reserve_pas_l_essai(serveur, interface_sans_reprise, monkeypatch):
+    interface = interface_sans_reprise
+    serveur.par_defaut = {"statut": 500}
+    for _ in range(2):
+        interface.analyser_profil(PROFIL, RECOMMANDATIONS)
+    time.sleep(REFROIDISSEMENT + 0.1)
+
+    # Budget écoulé pendant l'attente dans la file : aucune requête, l'essai reste libre
+    acquerir = interface.limiteur.acquerir
+    monkeypatch.setattr(interface.limiteur, "acquerir", lambda *args: (time.sleep(0.2), acquerir(*args))[1])
+    with pytest.raises(BudgetLatenceEpuise):
+        interface._appeler_api("prompt", utiliser_cache=False, budget_latence=0.1)
+    assert interface.disjoncteur.disponible()
+    assert serveur.nb_requetes == 2
+
+    monkeypatch.setattr(interface.limiteur, "acquerir", acquerir)
+    serveur.par_defaut = {"texte": "Reprise"}
+    assert interface._appeler_api("prompt", utiliser_cache=False) == "Reprise"
+    assert interface.disjoncteur.etat == FERME
+
+
+def test_reponse_illisible_comptee_en_echec(serveur, interface_sans_reprise):
+    interface = interface_sans_reprise
+    serveur.ajouter({"brut": "<html>Passerelle indisponible</html>"})
+    with pytest.raises(Exception, match="JSON illisible"):
+        interface._appeler_api("prompt", utiliser_cache=False)
+    assert interface.disjoncteur.metriques()["echecs"] == 1
@@ -0,0 +1,75 @@
+"""
+Réponses en flux (SSE) : tokens au fil de l'eau, mise en cache des seules réponses complètes
+"""
+
+import pytest
+
+from llm_interface import RepliAnalyse
+
+PROFIL = {"statut": "Étudiant Universitaire", "filiere_actuelle": "Biologie", "carriere_envisagee": "Médecin"}
+RECOMMANDATIONS = {}
+
+
+def test_flux_complet_produit_les_tokens_puis_en_cache(serveur, interface):
+    serveur.ajouter({"morceaux": ["Bonne ", "orientation ", "vers la médecine."], "pause": 0.05})
+    morceaux = list(interface._appeler_api_flux("prompt"))
+
+    assert morceaux == ["Bonne ", "orientation ", "vers la médecine."]
+    assert interface.dernier_temps_premier_token is not None
+    assert interface.disjoncteur.metriques()["succes"] == 1
+    assert serveur.requetes[0]["stream"] is True
+
+    # Réponse complète : servie par le cache, d'un seul bloc, sans nouvelle requête
+    assert list(interface._appeler_api_flux("prompt")) == ["Bonne orientation vers la médecine."]
+    assert interface._appeler_api("prompt") == "Bonne orientation vers la médecine."
+    assert serveur.nb_requetes == 1
+
+
+def test_flux_tronque_est_un_echec(serveur, interface):
+    # Circuit maintenu fermé pour relancer la requête juste après l'échec
+    interface.disjoncteur.appels_minimum = 5
+    serveur.ajouter({"morceaux": ["Début ", "de ", "réponse"], "tronque": True})
+    flux = interface._appeler_api_flux("prompt")
+
+    assert [next(flux) for _ in range(3)] == ["Début ", "de ", "réponse"]
+    with pytest.raises(Exception, match="Flux interrompu"):
+        next(flux)
+    assert interface.disjoncteur.metriques()["echecs"] == 1
+
+    # Rien en cache : la même requête repart vers l'API
+    _, payload = interface._construire_requete("prompt")
+    assert interface._lire_cache(payload)[1] is None
+    assert "".join(interface._appeler_api_flux("prompt")) == "Réponse du serveur bouchon. "
+    assert serveur.nb_requetes == 2
+
+
+def test_flux_tronque_remplace_par_analyse_de_base(serveur, interface):
+    serveur.ajouter({"texte": "Analyse coupée en", "tronque": True})
+    morceaux = list(interface.analyser_profil_flux(PROFIL, RECOMMANDATIONS))
+
+    # Texte partiel relayé, puis remplacé par l'analyse de base
+    assert "".join(morceaux[:-1]) == "Analyse coupée en "
+    assert isinstance(morceaux[-1], RepliAnalyse)
+    assert morceaux[-1] == interface._fallback_analyse(PROFIL, RECOMMANDATIONS)
+
+
+def test_flux_anticipe_par_le_controle_d_admission(serveur, interface):
+    serveur.ajouter({"texte": "Analyse anticipée complète", "pause": 0.02})
+    morceaux = list(interface.analyser_profil_flux(PROFIL, RECOMMANDATIONS, anticiper=True, locataire="nav"))
+
+    assert "".join(morceaux) == "Analyse anticipée complète "
+    assert not any(isinstance(morceau, RepliAnalyse) for morceau in morceaux)
+    assert interface.derniere_tache is not None
+
+
+
+@pytest.mark.parametrize("statut", [400, 503])
+def test_erreur_en_flux_garde_le_corps(serveur, interface, statut):
+    serveur.ajouter({"statut": statut, "brut": "Quota dépassé. " + "x" * 10000})
+    with pytest.raises(Exception) as erreur:
+        list(interface._appeler_api_flux("prompt"))
+
+    # Début du corps repris dans le message, borné
+    message = str(erreur.value)
+    assert message.startswith(f"Erreur API {statut}: Quota dépassé.")
+    assert len(message) < 600
@@ -0,0 +1,77 @@
+"""
+Graphe des parcours : compétences techniques exigées reliées à leurs métiers, coûts pris en compte par les recherches
+"""
+
+import threading
+
+import pytest
+
+from graphe_parcours import ANNEES_PAR_COMPETENCE_MANQUANTE, GrapheParcours
+from knowledge_base_loader import KnowledgeBaseLoader
+
+IA = ("competence", "intelligence artificielle")
+INGENIEUR_IA = ("metier", "ingénieur en intelligence artificielle")
+COMPLEMENT_IA = 3 * ANNEES_PAR_COMPETENCE_MANQUANTE  # Machine Learning, Deep Learning, Python
+
+
+@pytest.fixture(scope="module")
+def graphe():
+    return GrapheParcours(KnowledgeBaseLoader())
+
+
+def test_competences_techniques_reliees_aux_metiers(graphe):
+    assert (INGENIEUR_IA, COMPLEMENT_IA) in graphe.adjacence[IA]
+    # Compétence transversale (commune à tous les métiers) : aucun accès direct
+    assert all(voisin[0] != "metier" for voisin, _ in graphe.adjacence.get(("competence", "communication"), []))
+
+
+def test_metier_atteint_par_sa_competence(graphe):
+    # Aucune filière ne vise ce métier : seul l'arc de compétence y mène
+    assert all(origine[0] == "competence" for origine, _ in graphe.adjacence_inverse[INGENIEUR_IA])
+
+    cout, chemin = graphe._dijkstra(("bac", "C"), INGENIEUR_IA)
+    assert chemin[-2:] == [IA, INGENIEUR_IA]
+    assert cout == graphe.durees[chemin[1]] + COMPLEMENT_IA
+
+    # Précalcul et calcul à la demande donnent le même coût
+    assert INGENIEUR_IA in graphe.vers_cible
+    assert graphe.plus_court_chemin(("bac", "C"), INGENIEUR_IA)[0] == cout
+    etapes = graphe.decrire_etapes(chemin)
+    assert "Machine Learning, Deep Learning, Python" in etapes[2]
+
+
+def test_passerelle_etudiant_compte_le_complement(graphe):
+    cout, chemin = graphe.passerelle_etudiant("Intelligence Artificielle", "Ingénieur en Intelligence Artificielle")
+    assert chemin[1:] == [IA, INGENIEUR_IA]
+    assert cout == COMPLEMENT_IA
+
+
+def test_filiere_visant_le_metier_reste_preferee(graphe):
+    cout, chemin = graphe.parcours_lyceen("C", "Développeur d'applications")[0]
+    assert cout == 3 and len(chemin) == 3
+
+
+def test_demandes_ramenees_aux_metiers_du_graphe(graphe):
+    demandes = {"medecin ": 2, "Médecin": 2, "Data Analyst": 3, "Carrière inconnue": 10}
+    cibles = graphe._cibles_frequentes(demandes)
+    assert cibles[:2] == [("metier", "médecin"), ("metier", "data analyst")]
+    assert graphe.trouver_noeud_metier("MEDECIN") == ("metier", "médecin")
+
+
+def test_ajustement_en_arriere_plan(monkeypatch):
+    graphe = GrapheParcours(KnowledgeBaseLoader())
+    precalcul = graphe.vers_cible
+    libere = threading.Event()
+    precalculer = graphe._precalculer_cibles_frequentes
+    monkeypatch.setattr(graphe, "_precalculer_cibles_frequentes",
+                        lambda demandes: (libere.wait(5), precalculer(demandes)))
+
+    # Retour immédiat, un seul recalcul à la fois
+    assert graphe.ajuster_cibles_frequentes({"data analyst": 5})
+    assert not graphe.ajuster_cibles_frequentes({"comptable": 5})
+    assert graphe.vers_cible is precalcul
+
+    libere.set()
+    graphe._recalcul.join(30)
+    assert graphe.vers_cible is not precalcul
+    assert next(iter(graphe.vers_cible)) == ("metier", "data analyst")